@@ -0,0 +1,130 @@
+"""
+End-to-end bootstrap benchmark against a FakeCluster.
+
+Times run_bootstrap for each requested node count and writes the results
+as JSON, including the time spent in each bootstrap phase, so scaling
+regressions show up as a diff between two result files:
+
+    python -m benchmarks.bootstrap_benchmark --nodes 1 3 5 --repeat 3 \
+        --output bootstrap.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+
+from benchmarks.fake_cluster import FakeCluster, Latencies
+from drydock_runner import tracing
+
+
+def run_once(node_count: int, latencies: Latencies, subnet: str) -> dict:
+    """
+    Bootstrap a fresh fake cluster once. Returns the wall time, whether it
+    succeeded, and seconds per phase.
+    """
+    tracer = tracing.start_tracing()
+    output = io.StringIO()
+
+    try:
+        with FakeCluster(node_count, subnet=subnet, latencies=latencies) as cluster:
+            with contextlib.redirect_stdout(output):
+                started = time.perf_counter()
+                result = cluster.bootstrap(tempfile.mkdtemp(prefix="drydock-bench-"))
+                seconds = time.perf_counter() - started
+    finally:
+        tracing.stop_tracing()
+
+    phases = {
+        name: round(total, 4)
+        for category, name, _, total in tracer.summary()
+        if category == tracing.PHASE
+    }
+
+    return {
+        "seconds": round(seconds, 4),
+        "success": bool(result.success),
+        "phases": phases,
+    }
+
+
+def run_benchmark(node_counts, repeat: int, latencies: Latencies, subnet: str) -> dict:
+    results = []
+
+    for node_count in node_counts:
+        runs = [run_once(node_count, latencies, subnet) for _ in range(repeat)]
+        seconds = [run["seconds"] for run in runs]
+
+        results.append(
+            {
+                "nodes": node_count,
+                "runs": runs,
+                "median_seconds": round(statistics.median(seconds), 4),
+                "min_seconds": min(seconds),
+                "max_seconds": max(seconds),
+            }
+        )
+        print(
+            f"[INFO] {node_count} node(s): median "
+            f"{results[-1]['median_seconds']:.2f}s over {repeat} run(s)",
+            file=sys.stderr,
+        )
+
+    return {
+        "benchmark": "bootstrap",
+        "python": platform.python_version(),
+        "latencies": asdict(latencies),
+        "results": results,
+    }
+
+
+def parse_args(argv=None):
+    defaults = Latencies()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--subnet", default="127.0.77.0/24")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+
+    for field_name, default in asdict(defaults).items():
+        parser.add_argument(
+            f"--{field_name.replace('_', '-')}-latency",
+            dest=field_name,
+            type=float,
+            default=default,
+            help=f"Simulated {field_name} latency in seconds (default {default})",
+        )
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    latencies = Latencies(**{name: getattr(args, name) for name in asdict(Latencies())})
+
+    report = run_benchmark(args.nodes, args.repeat, latencies, args.subnet)
+    document = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
+
+    failed = [
+        result["nodes"]
+        for result in report["results"]
+        if not all(run["success"] for run in result["runs"])
+    ]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
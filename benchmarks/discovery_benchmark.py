@@ -0,0 +1,259 @@
+"""
+Microbenchmark for the discovery scanner over a simulated network.
+
+SubnetScanner is driven through its connect_func with SimulatedNetwork,
+which decides per address whether it is a live SSH host, refuses the
+connection, or is blackholed (never answers), with configurable latency
+and packet loss. For each subnet size and host density the benchmark
+reports time to first host, probes per second, peak open sockets and how
+many addresses the next round re-probes:
+
+    python -m benchmarks.discovery_benchmark --prefixes 28 24 22 20 \
+        --output discovery.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import ipaddress
+import json
+import platform
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+
+from drydock_runner.ip_discovery import SubnetScanner
+
+LIVE = "live"
+REFUSING = "refusing"
+BLACKHOLED = "blackholed"
+
+BANNER = b"SSH-2.0-OpenSSH_9.6p1 drydock-simulated\r\n"
+
+
+@dataclass
+class Density:
+    name: str
+    live: float
+    refusing: float
+    # Whatever is neither live nor refusing is blackholed.
+
+
+DENSITIES = [
+    Density("sparse", live=0.0, refusing=0.0),
+    Density("typical", live=0.05, refusing=0.2),
+    Density("dense", live=0.5, refusing=0.4),
+]
+
+
+class _Reader:
+    def __init__(self, data):
+        self._data = data
+
+    async def read(self, n):
+        data, self._data = self._data[:n], self._data[n:]
+        return data
+
+
+class _Writer:
+    def __init__(self, network):
+        self._network = network
+        self._closed = False
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._network.open_sockets -= 1
+
+    async def wait_closed(self):
+        pass
+
+
+class SimulatedNetwork:
+    """
+    An asyncio.open_connection stand-in for a subnet whose addresses have
+    been assigned LIVE, REFUSING or BLACKHOLED.
+
+    Every connect takes latency seconds, plus up to jitter. A live host
+    drops the connect (behaves as blackholed) with probability loss.
+    Counts probes and tracks the number of sockets open at once.
+    """
+
+    def __init__(self, kinds: dict, latency=0.001, jitter=0.0, loss=0.0, seed=0):
+        self.kinds = kinds
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.random = random.Random(seed)
+        self.probes = 0
+        self.open_sockets = 0
+        self.peak_open_sockets = 0
+
+    @classmethod
+    def for_subnet(cls, cidr, density: Density, seed=0, **kwargs):
+        """
+        Scatter density.live live hosts (at least one) and density.refusing
+        refusing addresses at random over cidr.
+        """
+        rng = random.Random(seed)
+        hosts = [str(ip) for ip in ipaddress.ip_network(cidr).hosts()]
+        rng.shuffle(hosts)
+
+        live = max(1, round(len(hosts) * density.live))
+        refusing = round(len(hosts) * density.refusing)
+
+        kinds = {ip: BLACKHOLED for ip in hosts}
+        kinds.update({ip: LIVE for ip in hosts[:live]})
+        kinds.update({ip: REFUSING for ip in hosts[live : live + refusing]})
+
+        return cls(kinds, seed=seed, **kwargs)
+
+    async def open_connection(self, host, port):
+        kind = self.kinds.get(host, BLACKHOLED)
+        if kind == LIVE and self.loss and self.random.random() < self.loss:
+            kind = BLACKHOLED
+
+        self.probes += 1
+        self.open_sockets += 1
+        self.peak_open_sockets = max(self.peak_open_sockets, self.open_sockets)
+
+        try:
+            await asyncio.sleep(self.latency + self.random.random() * self.jitter)
+
+            if kind == REFUSING:
+                raise ConnectionRefusedError(host)
+            if kind == BLACKHOLED:
+                await asyncio.sleep(3600)
+        except BaseException:
+            self.open_sockets -= 1
+            raise
+
+        return _Reader(BANNER), _Writer(self)
+
+
+async def _measure(cidr, network, scan_timeout, max_concurrency) -> dict:
+    scanner = SubnetScanner(
+        cidr,
+        scan_timeout=scan_timeout,
+        max_concurrency=max_concurrency,
+        connect_func=network.open_connection,
+        candidate_sources=(),
+    )
+
+    started = time.perf_counter()
+    first_host = None
+    found = 0
+
+    async for _ in scanner.scan_round():
+        found += 1
+        if first_host is None:
+            first_host = time.perf_counter() - started
+
+    round_seconds = time.perf_counter() - started
+    probes = network.probes
+
+    # The next round only re-probes addresses that are due again.
+    due_next_round = len(scanner.state.due(time.time() + scanner.retry_interval))
+
+    return {
+        "addresses": len(scanner.state),
+        "hosts_found": found,
+        "time_to_first_host": round(first_host, 4) if first_host else None,
+        "round_seconds": round(round_seconds, 4),
+        "probes": probes,
+        "probes_per_second": round(probes / round_seconds, 1),
+        "peak_open_sockets": network.peak_open_sockets,
+        "due_next_round": due_next_round,
+    }
+
+
+def run_case(prefix, density, base="10.20.0.0", seed=0, **settings) -> dict:
+    cidr = f"{ipaddress.ip_network(f'{base}/{prefix}', strict=False)}"
+    network = SimulatedNetwork.for_subnet(
+        cidr,
+        density,
+        seed=seed,
+        latency=settings["latency"],
+        jitter=settings["jitter"],
+        loss=settings["loss"],
+    )
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = asyncio.run(
+            _measure(
+                cidr, network, settings["scan_timeout"], settings["max_concurrency"]
+            )
+        )
+
+    return {"cidr": cidr, "density": density.name, **result}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+
+    parser.add_argument("--prefixes", type=int, nargs="+", default=[28, 24, 22, 20])
+    parser.add_argument(
+        "--densities",
+        nargs="+",
+        choices=[d.name for d in DENSITIES],
+        default=[d.name for d in DENSITIES],
+    )
+    parser.add_argument("--scan-timeout", type=float, default=0.3)
+    parser.add_argument("--max-concurrency", type=int, default=256)
+    parser.add_argument("--latency", type=float, default=0.001)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    settings = {
+        "scan_timeout": args.scan_timeout,
+        "max_concurrency": args.max_concurrency,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "loss": args.loss,
+    }
+    densities = [d for d in DENSITIES if d.name in args.densities]
+    results = []
+
+    for prefix in args.prefixes:
+        for density in densities:
+            result = run_case(prefix, density, seed=args.seed, **settings)
+            results.append(result)
+            print(
+                f"[INFO] {result['cidr']} {density.name}: first host "
+                f"{result['time_to_first_host']}s, "
+                f"{result['probes_per_second']} probes/s, "
+                f"peak {result['peak_open_sockets']} sockets",
+                file=sys.stderr,
+            )
+
+    document = json.dumps(
+        {
+            "benchmark": "discovery",
+            "python": platform.python_version(),
+            "settings": settings,
+            "densities": [asdict(d) for d in densities],
+            "results": results,
+        },
+        indent=2,
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
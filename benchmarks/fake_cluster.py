@@ -0,0 +1,441 @@
+"""
+A simulated cluster on loopback for exercising run_bootstrap end to end.
+
+Every fake node is an SSH banner responder on its own 127.x.y.z address
+(the whole of 127.0.0.0/8 is routed to lo on Linux, so no interface
+configuration is needed). Discovery and the readiness waits talk to the
+responders over real TCP. The SSH protocol itself is simulated by
+FakeSSHConnections, which stands in for ssh_session.SSHConnectionManager
+and moves a node to its static address when netplan is applied.
+
+git, ansible-galaxy, ansible-playbook and kubectl are replaced by the
+stand-ins in features/fixtures/bin, with configurable latency.
+"""
+
+import asyncio
+import contextlib
+import io
+import ipaddress
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+
+from drydock_runner.ansible_runner import (
+    real_ansible_playbook,
+    real_ansible_requirements,
+)
+from drydock_runner.cluster_build import run_bootstrap
+from drydock_runner.config import (
+    ClusterLayout,
+    ControllerLayout,
+    RepositoryPaths,
+    RepositorySource,
+    WorkerLayout,
+)
+from drydock_runner.git_runner import clone_repositories
+from drydock_runner.ip_discovery import discover_inaugural_ip, iter_ssh_hosts
+from drydock_runner.kubectl_runner import real_kubectl_apply
+from drydock_runner.ssh_session import SSHSessionError
+from drydock_runner.static_ip_assigner import StaticIPAssigner
+
+FAKE_BIN = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "features", "fixtures", "bin")
+)
+
+BANNER = b"SSH-2.0-OpenSSH_9.6p1 drydock-fake-node\r\n"
+
+KUBECONFIG = """\
+apiVersion: v1
+kind: Config
+clusters:
+- name: kubernetes
+  cluster:
+    server: https://127.0.0.1:6443
+"""
+
+
+@dataclass
+class Latencies:
+    """
+    Simulated latencies, in seconds.
+    """
+
+    ssh: float = 0.005
+    reboot: float = 0.2
+    git: float = 0.2
+    playbook_task: float = 0.1
+    kubectl: float = 0.1
+
+
+class FakeNetwork:
+    """
+    SSH banner responders on loopback addresses, served by an asyncio loop
+    on a background thread. Every address listens on the same port.
+    """
+
+    def __init__(self, port: int = 0):
+        self.port = port
+        self._servers = {}
+        self._greetings = set()
+        self._timers = []
+        self._stopping = False
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="fake-network", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop every server and finish every open connection before closing
+        the loop, so no task is left pending on it.
+        """
+        self._stopping = True
+        for timer in self._timers:
+            timer.cancel()
+
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _shutdown(self):
+        servers = list(self._servers.values())
+        self._servers.clear()
+
+        for server in servers:
+            server.close()
+        for server in servers:
+            await server.wait_closed()
+
+        greetings = list(self._greetings)
+        for task in greetings:
+            task.cancel()
+        await asyncio.gather(*greetings, return_exceptions=True)
+
+    async def _greet(self, reader, writer):
+        task = asyncio.current_task()
+        self._greetings.add(task)
+        writer.write(BANNER)
+        try:
+            await writer.drain()
+            await reader.read(256)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+            self._greetings.discard(task)
+
+    async def _listen(self, ip):
+        server = await asyncio.start_server(self._greet, ip, self.port)
+        if self.port == 0:
+            self.port = server.sockets[0].getsockname()[1]
+        return server
+
+    def listen(self, ip):
+        if self._stopping:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._listen(ip), self._loop)
+        self._servers[ip] = future.result()
+
+    def unlisten(self, ip):
+        server = self._servers.pop(ip, None)
+        if server is None:
+            return
+
+        async def close():
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(close(), self._loop).result()
+
+    def move(self, old_ip, new_ip, delay):
+        """
+        Stop answering on old_ip now and start on new_ip after delay, as a
+        node does when netplan moves it to its static address.
+        """
+        self.unlisten(old_ip)
+        timer = threading.Timer(delay, self.listen, args=(new_ip,))
+        timer.daemon = True
+        self._timers.append(timer)
+        timer.start()
+
+    def is_listening(self, ip) -> bool:
+        return ip in self._servers
+
+
+class _Output(io.BytesIO):
+    class _Channel:
+        def recv_exit_status(self):
+            return 0
+
+    channel = _Channel()
+
+
+class _Upload(io.StringIO):
+    def __init__(self, on_close):
+        super().__init__()
+        self._on_close = on_close
+
+    def close(self):
+        if not self.closed:
+            self._on_close(self.getvalue())
+        super().close()
+
+
+class _FakeClient:
+    def __init__(self, connections, host):
+        self._connections = connections
+        self._host = host
+
+    def exec_command(self, command):
+        return self._connections._exec_command(self._host, command)
+
+
+class FakeSSHConnections:
+    """
+    Stands in for SSHConnectionManager against a FakeNetwork.
+
+    A node must be listening for a connection to succeed. Each command
+    takes latencies.ssh. Writing a netplan file and then running netplan
+    apply moves the node to the address in the file after latencies.reboot.
+    """
+
+    def __init__(self, network: FakeNetwork, hostnames: dict, latencies: Latencies):
+        self.network = network
+        self.hostnames = hostnames
+        self.latencies = latencies
+        self._netplan = {}
+        self._lock = threading.Lock()
+
+    def connect(self, host):
+        time.sleep(self.latencies.ssh)
+        if not self.network.is_listening(host):
+            raise SSHSessionError(f"SSH connection to {host} failed: refused")
+        return _FakeClient(self, host)
+
+    def get(self, host):
+        return _FakeClient(self, host) if self.network.is_listening(host) else None
+
+    def _exec_command(self, host, command):
+        time.sleep(self.latencies.ssh)
+        output = b""
+
+        if command == "hostname":
+            output = self.hostnames.get(host, "node").encode()
+        elif command.startswith("sudo netplan apply"):
+            with self._lock:
+                netplan = self._netplan.pop(host, "")
+            match = re.search(r"addresses: \[([0-9.]+)/", netplan)
+            if match:
+                self.network.move(host, match.group(1), self.latencies.reboot)
+                self.hostnames[match.group(1)] = self.hostnames.get(host)
+
+        return None, _Output(output), _Output()
+
+    def exec(self, host, command):
+        _, stdout, stderr = self.connect(host).exec_command(command)
+        return 0, stdout.read().decode(), stderr.read().decode()
+
+    def sftp(self, host):
+        self.connect(host)
+        return _FakeSFTP(self, host)
+
+    def close(self, host=None):
+        pass
+
+
+class _FakeSFTP:
+    def __init__(self, connections, host):
+        self._connections = connections
+        self._host = host
+
+    def open(self, path, mode="r"):
+        time.sleep(self._connections.latencies.ssh)
+
+        if "w" not in mode:
+            return io.BytesIO(KUBECONFIG.encode())
+
+        def uploaded(content):
+            with self._connections._lock:
+                self._connections._netplan[self._host] = content
+
+        return _Upload(uploaded)
+
+
+@contextlib.contextmanager
+def fake_tools(latencies: Latencies, log_dir: str):
+    """
+    Put the stand-in executables first on PATH for the duration.
+    """
+    overrides = {
+        "PATH": f"{FAKE_BIN}:{os.environ.get('PATH', '')}",
+        "FAKE_GIT_SECONDS": str(latencies.git),
+        "FAKE_KUBECTL_SECONDS": str(latencies.kubectl),
+        "FAKE_PLAYBOOK_TASK_SECONDS": str(latencies.playbook_task),
+        "FAKE_GALAXY_LOG": os.path.join(log_dir, "galaxy.log"),
+        "FAKE_SSH_LOG": os.path.join(log_dir, "ssh.log"),
+    }
+    previous = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+class FakeCluster:
+    """
+    node_count fake nodes waiting for their static IPs on subnet.
+
+    Use as a context manager, then call bootstrap() to run the real
+    run_bootstrap against them. One node is bootstrapped as a single
+    inaugural node; more use a cluster layout of up to three controllers
+    and the rest workers.
+    """
+
+    def __init__(
+        self,
+        node_count: int = 1,
+        subnet: str = "127.0.77.0/24",
+        latencies: Latencies = None,
+    ):
+        self.node_count = node_count
+        self.latencies = latencies or Latencies()
+        self.network_cidr = ipaddress.ip_network(subnet)
+
+        hosts = list(self.network_cidr.hosts())
+        self.gateway = str(hosts[0])
+        self.dhcp_ips = [str(ip) for ip in hosts[9 : 9 + node_count]]
+        self.static_ip = str(hosts[99])
+        self.hostnames = {ip: f"node-{i}" for i, ip in enumerate(self.dhcp_ips)}
+
+        self.network = FakeNetwork()
+        self.connections = FakeSSHConnections(
+            self.network, self.hostnames, self.latencies
+        )
+
+    def __enter__(self):
+        self.network.start()
+        for ip in self.dhcp_ips:
+            self.network.listen(ip)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.network.stop()
+
+    def layout(self):
+        if self.node_count == 1:
+            return None
+
+        controllers = 1 if self.node_count < 3 else 3
+        return ClusterLayout(
+            controllers=ControllerLayout(count=controllers),
+            workers=WorkerLayout(maxCount=self.node_count - controllers),
+        )
+
+    def _workspace(self, work_dir):
+        ansible_dir = os.path.join(work_dir, "ansible")
+        os.makedirs(ansible_dir, exist_ok=True)
+
+        inputs = {}
+        for name in ("playbook.yaml", "kubeadm.yaml", "argocd.yaml", "values.yaml"):
+            path = os.path.join(ansible_dir, name)
+            with open(path, "w") as f:
+                f.write("---\n")
+            inputs[name] = path
+
+        with open(os.path.join(ansible_dir, "requirements.yml"), "w") as f:
+            f.write("roles: []\ncollections: []\n")
+
+        return ansible_dir, inputs
+
+    def bootstrap(self, work_dir: str = None, control_masters=None, **overrides):
+        """
+        Run run_bootstrap against the fake nodes and return its result.
+        Keyword arguments override those passed to run_bootstrap.
+
+        With control_masters, the playbook and run_bootstrap use them; the
+        stand-in ssh logs its connections to work_dir/ssh.log.
+        """
+        work_dir = work_dir or tempfile.mkdtemp(prefix="drydock-fake-cluster-")
+        ansible_dir, inputs = self._workspace(work_dir)
+        port = self.network.port
+        cidr = str(self.network_cidr)
+
+        playbook_args = {
+            "kubeadm_config_src": inputs["kubeadm.yaml"],
+            "argocd_manifest": inputs["argocd.yaml"],
+            "argocd_values": inputs["values.yaml"],
+            "ansible_dir": ansible_dir,
+        }
+        if control_masters is not None:
+            playbook_args["control_masters"] = control_masters
+        repos = {
+            "config": RepositorySource(
+                url="https://git.invalid/config.git",
+                paths=RepositoryPaths(kubeadmConfig="kubeadm.yaml"),
+            )
+        }
+        tmp_dir = os.path.join(work_dir, "run")
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        arguments = {
+            "static_ip": self.static_ip,
+            "gateway": self.gateway,
+            "cidr": cidr,
+            "nameservers": [self.gateway],
+            "hostname": self.hostnames[self.dhcp_ips[0]],
+            "tmp_dir": tmp_dir,
+            "ansible_playbook_func": lambda ip: real_ansible_playbook(
+                ip_address=ip, **playbook_args
+            ),
+            "ansible_cluster_playbook_func": lambda nodes: real_ansible_playbook(
+                nodes=nodes, **playbook_args
+            ),
+            "ansible_install_func": lambda: real_ansible_requirements(
+                requirements_path=os.path.join(ansible_dir, "requirements.yml"),
+                cache_dir=os.path.join(work_dir, "galaxy-cache"),
+            ),
+            "clone_func": lambda: clone_repositories(repos, base_dir=tmp_dir),
+            "kubectl_apply_func": real_kubectl_apply,
+            "discovery_func": lambda cidr: discover_inaugural_ip(
+                cidr,
+                port=port,
+                scan_timeout=0.05,
+                retry_interval=0.2,
+                total_timeout=10,
+            ),
+            "node_discovery_func": lambda cidr, stop=None: iter_ssh_hosts(
+                cidr,
+                port=port,
+                scan_timeout=0.05,
+                retry_interval=0.2,
+                total_timeout=10,
+                stop=stop,
+            ),
+            "static_ip_assigner_func": lambda **kwargs: StaticIPAssigner(
+                port=port, timeout=10, **kwargs
+            ),
+            "cluster_layout": self.layout(),
+            "connection_manager": self.connections,
+            "control_masters": control_masters,
+        }
+        arguments.update(overrides)
+
+        with fake_tools(self.latencies, work_dir):
+            return run_bootstrap(**arguments)
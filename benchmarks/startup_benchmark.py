@@ -0,0 +1,264 @@
+"""
+Startup-time regression benchmark for the drydock CLI.
+
+Each case runs a fresh interpreter with -X importtime and reports its wall
+time, the time spent importing and the heaviest imports. A case fails if
+it imports a module it should not (paramiko, for example, is only for the
+bootstrap itself) or if its median import time is over its budget:
+
+    python -m benchmarks.startup_benchmark --repeat 5 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Anything that takes more than a few milliseconds to import and that the
+# fast paths have no use for.
+HEAVY = ("paramiko", "cryptography", "pydantic", "yaml", "asyncio", "ssl")
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+# A configuration that validates, written as JSON (which YAML loaders
+# read) so the benchmark itself imports no YAML library.
+CONFIG = {
+    "apiVersion": "drydock.evoteum.com/v1alpha1",
+    "kind": "BootstrapConfig",
+    "metadata": {"name": "startup-benchmark", "namespace": "drydock"},
+    "spec": {
+        "network": {
+            "vlanID": 20,
+            "cidr": "192.168.20.0/24",
+            "gateway": "192.168.20.1",
+            "staticIP": {
+                "address": "192.168.20.10",
+                "gateway": "192.168.20.1",
+                "nameservers": ["192.168.20.1"],
+            },
+        },
+        "discovery": {"timeoutSeconds": 120},
+        "inauguralNode": {"sshPassword": "bootstrap", "hostname": "lab-1"},
+        "bootstrapSources": {
+            "repositories": {
+                "config": {"url": "https://git.invalid/config.git", "paths": {}}
+            }
+        },
+    },
+}
+
+
+@dataclass
+class Case:
+    name: str
+    args: list
+    # Modules that must not be imported at all on this path.
+    forbidden: tuple = ()
+    # Most milliseconds the median run may spend importing, if limited.
+    budget_ms: float = None
+    description: str = ""
+
+
+def cases(config_path: str) -> list:
+    return [
+        Case(
+            "import",
+            ["-c", "import drydock_runner"],
+            forbidden=HEAVY,
+            budget_ms=25,
+            description="import the package",
+        ),
+        Case(
+            "help",
+            ["-m", "drydock_runner", "--help"],
+            forbidden=HEAVY,
+            budget_ms=60,
+            description="drydock --help",
+        ),
+        Case(
+            "discover",
+            ["-m", "drydock_runner", "discover", "--cidr", "127.0.0.1/32"]
+            + ["--timeout", "0"],
+            forbidden=("paramiko", "cryptography", "pydantic", "yaml"),
+            budget_ms=120,
+            description="drydock discover, for no time",
+        ),
+        Case(
+            "validate",
+            ["-m", "drydock_runner", "validate", "--config", config_path],
+            forbidden=("paramiko", "cryptography", "asyncio"),
+            description="drydock validate",
+        ),
+        Case(
+            "validate-schema",
+            ["-m", "drydock_runner", "validate", "--schema-only"]
+            + ["--config", config_path],
+            forbidden=("paramiko", "cryptography", "asyncio", "pydantic"),
+            budget_ms=80,
+            description="drydock validate --schema-only",
+        ),
+        Case(
+            "bootstrap-workflow",
+            ["-c", "import drydock_runner.cluster_build"],
+            forbidden=("paramiko", "cryptography"),
+            description="import the bootstrap workflow, before any node "
+            "is connected to",
+        ),
+    ]
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Parse -X importtime output into (module, self µs, cumulative µs,
+    depth) tuples, in the order the imports finished.
+    """
+    imports = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            depth = (len(indent) - 1) // 2
+            imports.append((module, int(own), int(cumulative), depth))
+    return imports
+
+
+def run_once(case: Case, environment: dict) -> dict:
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *case.args],
+        cwd=REPO_ROOT,
+        env={**os.environ, **environment},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+    imports = parse_importtime(result.stderr)
+
+    return {
+        "returncode": result.returncode,
+        "wall_ms": wall * 1000,
+        "import_ms": sum(c for _, _, c, depth in imports if depth == 0) / 1000,
+        "imports": imports,
+    }
+
+
+def run_case(case: Case, repeat: int, scale: float = 1.0, environment=None) -> dict:
+    runs = [run_once(case, environment or {}) for _ in range(repeat)]
+    last = runs[-1]
+    modules = {module for module, _, _, _ in last["imports"]}
+    heaviest = sorted(
+        (i for i in last["imports"] if i[3] <= 1), key=lambda i: i[2], reverse=True
+    )[:5]
+
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    problems = [
+        f"imports {module}"
+        for module in case.forbidden
+        if module in modules or any(m.startswith(f"{module}.") for m in modules)
+    ]
+    if any(run["returncode"] != 0 for run in runs):
+        problems.append(f"exited with status {last['returncode']}")
+    if case.budget_ms is not None and import_ms > case.budget_ms * scale:
+        problems.append(
+            f"imports take {import_ms:.1f}ms, over {case.budget_ms * scale:g}ms"
+        )
+
+    return {
+        "case": case.name,
+        "description": case.description,
+        "median_wall_ms": round(statistics.median(r["wall_ms"] for r in runs), 1),
+        "median_import_ms": round(import_ms, 1),
+        "budget_ms": case.budget_ms and case.budget_ms * scale,
+        "modules_imported": len(modules),
+        "heaviest_imports": [
+            {"module": module, "cumulative_ms": round(cumulative / 1000, 1)}
+            for module, _, cumulative, _ in heaviest
+        ],
+        "problems": problems,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--cases", nargs="+", help="Only run these cases (default: all)"
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiply every budget by this, for slower machines",
+    )
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="drydock-startup-") as work_dir:
+        config_path = os.path.join(work_dir, "config.yaml")
+        with open(config_path, "w") as f:
+            json.dump(CONFIG, f)
+        os.chmod(config_path, 0o600)
+
+        selected = [
+            case
+            for case in cases(config_path)
+            if not args.cases or case.name in args.cases
+        ]
+        results = []
+
+        for case in selected:
+            # validate caches the model it builds; keep that out of the
+            # operator's cache.
+            result = run_case(
+                case,
+                args.repeat,
+                args.scale,
+                {"DRYDOCK_CACHE_DIR": os.path.join(work_dir, "cache")},
+            )
+            results.append(result)
+            print(
+                f"[{'WARN' if result['problems'] else 'INFO'}] {case.name}: "
+                f"{result['median_wall_ms']}ms wall, "
+                f"{result['median_import_ms']}ms importing"
+                + "".join(f"; {problem}" for problem in result["problems"]),
+                file=sys.stderr,
+            )
+
+    document = json.dumps(
+        {
+            "benchmark": "startup",
+            "python": platform.python_version(),
+            "repeat": args.repeat,
+            "scale": args.scale,
+            "results": results,
+        },
+        indent=2,
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
+
+    return 1 if any(result["problems"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+DOCUMENTATION = """
+    name: drydock_events
+    type: notification
+    short_description: Stream playbook events to Drydock as JSON lines
+    description:
+      - Writes one JSON object per line for each play, task start, task
+        result and the final stats, to the file descriptor named by
+        DRYDOCK_ANSIBLE_EVENTS_FD. Does nothing if it is not set.
+      - Each event records which section of the play (pre_tasks, roles,
+        tasks, post_tasks or handlers) the task came from.
+    requirements:
+      - enable in configuration
+"""
+
+import json
+import os
+import time
+
+from ansible.plugins.callback import CallbackBase
+
+SECTIONS = ("pre_tasks", "roles", "tasks", "post_tasks", "handlers")
+
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = "notification"
+    CALLBACK_NAME = "drydock_events"
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self):
+        super().__init__()
+
+        fd = os.environ.get("DRYDOCK_ANSIBLE_EVENTS_FD")
+        self._stream = os.fdopen(int(fd), "w", buffering=1) if fd else None
+        self._sections = {}
+        self._started = {}
+
+    def _emit(self, event, **fields):
+        if self._stream is None:
+            return
+
+        fields["event"] = event
+        fields["time"] = time.time()
+        self._stream.write(json.dumps(fields, default=str) + "\n")
+
+    def _index(self, blocks, section):
+        for block in blocks or []:
+            self._sections[block._uuid] = section
+
+            for attr in ("block", "rescue", "always"):
+                for item in getattr(block, attr, None) or []:
+                    if hasattr(item, "block"):
+                        self._index([item], section)
+                    else:
+                        self._sections[item._uuid] = section
+
+    def _section(self, task):
+        node = task
+        while node is not None:
+            section = self._sections.get(getattr(node, "_uuid", None))
+            if section is not None:
+                return section
+            node = getattr(node, "_parent", None)
+
+        return "roles" if getattr(task, "_role", None) else "unknown"
+
+    def _result(self, result, status, **fields):
+        host = result._host.get_name()
+        task = result._task
+        started = self._started.pop((host, task._uuid), None)
+        now = time.time()
+
+        self._emit(
+            "task_result",
+            host=host,
+            task=task.get_name(),
+            uuid=task._uuid,
+            section=self._section(task),
+            status=status,
+            duration=None if started is None else now - started,
+            **fields,
+        )
+
+    def v2_playbook_on_start(self, playbook):
+        self._emit("playbook_start", playbook=playbook._file_name)
+
+    def v2_playbook_on_play_start(self, play):
+        for section in SECTIONS:
+            if section != "roles":
+                self._index(getattr(play, section, None), section)
+
+        self._emit("play_start", play=play.get_name())
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self._emit(
+            "task_start",
+            task=task.get_name(),
+            uuid=task._uuid,
+            section=self._section(task),
+        )
+
+    def v2_playbook_on_handler_task_start(self, task):
+        self._emit(
+            "task_start", task=task.get_name(), uuid=task._uuid, section="handlers"
+        )
+
+    def v2_runner_on_start(self, host, task):
+        self._started[(host.get_name(), task._uuid)] = time.time()
+
+    def v2_runner_on_ok(self, result):
+        changed = result._result.get("changed", False)
+        self._result(result, "changed" if changed else "ok")
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._result(
+            result,
+            "ignored" if ignore_errors else "failed",
+            msg=result._result.get("msg"),
+        )
+
+    def v2_runner_on_skipped(self, result):
+        self._result(result, "skipped")
+
+    def v2_runner_on_unreachable(self, result):
+        self._result(result, "unreachable", msg=result._result.get("msg"))
+
+    def v2_playbook_on_stats(self, stats):
+        hosts = {host: stats.summarize(host) for host in sorted(stats.processed)}
+        self._emit("playbook_stats", hosts=hosts)
@@ -1,2 +1,26 @@
-from .cluster_build import run_bootstrap, BootstrapResult, BootstrapConfigurationError
-from .clean import run_cleanup
+import importlib
+
+# Exported names and the submodule each comes from. They are imported on
+# first use, so importing drydock_runner (or any one submodule, or running
+# the CLI) does not import the whole bootstrap workflow.
+_EXPORTS = {
+    "run_bootstrap": "cluster_build",
+    "BootstrapResult": "cluster_build",
+    "BootstrapConfigurationError": "cluster_build",
+    "run_cleanup": "clean",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *__all__})
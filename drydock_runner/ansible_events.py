@@ -0,0 +1,119 @@
+import json
+from dataclasses import dataclass, field
+
+# Name of the callback plugin in drydock_node_config/callback_plugins.
+EVENTS_CALLBACK = "drydock_events"
+
+# Environment variable naming the file descriptor the plugin writes to.
+EVENTS_FD_ENV = "DRYDOCK_ANSIBLE_EVENTS_FD"
+
+FAILED_STATUSES = ("failed", "unreachable")
+
+
+@dataclass
+class TaskTiming:
+    task: str
+    section: str
+    host: str
+    status: str
+    duration: float
+    msg: str = None
+
+
+@dataclass
+class PlaybookReport:
+    """
+    Everything the drydock_events callback reported about one playbook run.
+
+    record() is fed the events as they arrive, so the report can be
+    inspected while the playbook is still running.
+    """
+
+    results: list = field(default_factory=list)
+    host_stats: dict = field(default_factory=dict)
+    started: float = None
+    finished: float = None
+
+    def record(self, event: dict) -> None:
+        kind = event.get("event")
+
+        if self.started is None:
+            self.started = event.get("time")
+        self.finished = event.get("time")
+
+        if kind == "task_result":
+            self.results.append(
+                TaskTiming(
+                    task=event.get("task"),
+                    section=event.get("section"),
+                    host=event.get("host"),
+                    status=event.get("status"),
+                    duration=event.get("duration") or 0.0,
+                    msg=event.get("msg"),
+                )
+            )
+        elif kind == "playbook_stats":
+            self.host_stats = event.get("hosts", {})
+
+    @property
+    def wall_time(self) -> float:
+        if self.started is None:
+            return 0.0
+        return self.finished - self.started
+
+    def failures(self) -> list:
+        return [r for r in self.results if r.status in FAILED_STATUSES]
+
+    def task_durations(self) -> list:
+        """
+        (section, task, seconds) for each task in run order, where seconds
+        is the slowest host's time on that task.
+        """
+        durations = {}
+
+        for result in self.results:
+            key = (result.section, result.task)
+            durations[key] = max(durations.get(key, 0.0), result.duration)
+
+        return [(section, task, secs) for (section, task), secs in durations.items()]
+
+    def section_totals(self) -> dict:
+        totals = {}
+
+        for section, _, seconds in self.task_durations():
+            totals[section] = totals.get(section, 0.0) + seconds
+
+        return totals
+
+    def format(self, slowest: int = 10) -> str:
+        """
+        Render a per-section and slowest-task timing table.
+        """
+        lines = [f"Playbook wall time: {self.wall_time:.1f}s", ""]
+
+        lines.append(f"{'SECTION':<12} {'SECONDS':>9}")
+        for section, seconds in self.section_totals().items():
+            lines.append(f"{section:<12} {seconds:>9.1f}")
+
+        lines.append("")
+        lines.append(f"{'SECTION':<12} {'SECONDS':>9}  TASK")
+        ranked = sorted(self.task_durations(), key=lambda row: row[2], reverse=True)
+        for section, task, seconds in ranked[:slowest]:
+            lines.append(f"{section:<12} {seconds:>9.1f}  {task}")
+
+        return "\n".join(lines)
+
+
+def read_events(stream):
+    """
+    Yield the JSON events written by the drydock_events callback, one per
+    line, as they arrive. Lines that are not JSON are ignored.
+    """
+    for line in stream:
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+
+        if isinstance(event, dict):
+            yield event
@@ -1,6 +1,24 @@
 import subprocess
+import collections
+import contextlib
+import hashlib
+import json
 import os
 import pathlib
+import shutil
+import tempfile
+
+import yaml
+
+from drydock_runner import tracing
+from drydock_runner.cache import default_cache_dir, file_lock
+from drydock_runner.ansible_events import (
+    EVENTS_CALLBACK,
+    EVENTS_FD_ENV,
+    PlaybookReport,
+    read_events,
+)
+from drydock_runner.node_assignment import CONTROLLER
 
 
 class AnsibleExecutionError(Exception):
@@ -11,19 +29,18 @@ class AnsibleRequirementsError(Exception):
     pass
 
 
-def real_ansible_requirements(
-    requirements_path: str = "bootstrap_node_config/requirements.yml",
-) -> None:
+REQUIREMENTS_STAMP = ".drydock-requirements"
 
-    requirements_path_normalised = pathlib.Path(requirements_path)
+# Ansible's own default; cluster runs raise it to one fork per node.
+DEFAULT_FORKS = 5
 
-    if not requirements_path_normalised.exists():
-        raise AnsibleRequirementsError(
-            f"Requirements file not found: {requirements_path_normalised}"
-        )
+# Cached facts older than this are gathered again regardless.
+FACT_CACHE_TIMEOUT = 86400
 
+
+def _galaxy_version() -> str:
     try:
-        subprocess.run(
+        result = tracing.run(
             ["ansible-galaxy", "--version"],
             check=True,
             stdout=subprocess.PIPE,
@@ -35,18 +52,236 @@ def real_ansible_requirements(
             "ansible-galaxy is not available or failed to execute"
         ) from exc
 
-    result = subprocess.run(
-        ["ansible-galaxy", "install", "-r", str(requirements_path_normalised)],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-    )
+    return result.stdout.splitlines()[0].strip() if result.stdout else ""
+
+
+def requirements_cache_key(requirements_path, galaxy_version: str) -> str:
+    """
+    Identify an installed set of roles and collections by the content of
+    requirements.yml and the ansible-galaxy version that installed it.
+    """
+    digest = hashlib.sha256()
+    digest.update(pathlib.Path(requirements_path).read_bytes())
+    digest.update(b"\0")
+    digest.update(galaxy_version.encode())
+    return digest.hexdigest()[:16]
+
+
+def _read_stamp(directory) -> str | None:
+    try:
+        return (pathlib.Path(directory) / REQUIREMENTS_STAMP).read_text().strip()
+    except OSError:
+        return None
+
+
+def _write_stamp(directory, key: str) -> None:
+    (pathlib.Path(directory) / REQUIREMENTS_STAMP).write_text(f"{key}\n")
+
+
+def _galaxy_install(requirements_path, target) -> None:
+    """
+    Install the roles and collections in requirements_path under target,
+    as target/roles and target/collections.
+    """
+    commands = [
+        ["role", "install", "-r", str(requirements_path), "-p", f"{target}/roles"],
+        [
+            "collection",
+            "install",
+            "-r",
+            str(requirements_path),
+            "-p",
+            f"{target}/collections",
+        ],
+    ]
+
+    for command in commands:
+        result = tracing.run(
+            ["ansible-galaxy", *command],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+
+        if result.returncode != 0:
+            raise AnsibleRequirementsError(
+                f"Ansible requirements installation failed:\n{result.stderr}"
+            )
 
-    if result.returncode != 0:
+    for subdir in ("roles", "collections"):
+        (pathlib.Path(target) / subdir).mkdir(parents=True, exist_ok=True)
+
+
+def real_ansible_requirements(
+    requirements_path: str = "bootstrap_node_config/requirements.yml",
+    install_dir: str = None,
+    cache_dir: str = None,
+) -> None:
+    """
+    Make the roles and collections in requirements.yml available under
+    install_dir/roles and install_dir/collections, which is where
+    ansible.cfg looks for them. install_dir defaults to the directory
+    holding requirements.yml.
+
+    Installs are keyed by requirements_cache_key():
+
+      1. If install_dir already holds the installation for this key,
+         nothing is done.
+      2. Otherwise, if cache_dir holds it, it is copied from there, with
+         no network access.
+      3. Otherwise, ansible-galaxy installs it into cache_dir first.
+    """
+
+    requirements_path_normalised = pathlib.Path(requirements_path)
+
+    if not requirements_path_normalised.exists():
         raise AnsibleRequirementsError(
-            f"Ansible requirements installation failed:\n{result.stderr}"
+            f"Requirements file not found: {requirements_path_normalised}"
         )
 
+    if install_dir is None:
+        install_dir = requirements_path_normalised.parent
+    if cache_dir is None:
+        cache_dir = default_cache_dir("galaxy")
+
+    install_dir = pathlib.Path(install_dir)
+    key = requirements_cache_key(requirements_path_normalised, _galaxy_version())
+
+    if _read_stamp(install_dir) == key and all(
+        (install_dir / subdir).is_dir() for subdir in ("roles", "collections")
+    ):
+        print("[INFO] Ansible requirements already installed.")
+        return
+
+    cached = pathlib.Path(cache_dir) / key
+
+    with file_lock(f"{cached}.lock"):
+        if _read_stamp(cached) != key:
+            print("[INFO] Installing Ansible requirements into the cache...")
+            shutil.rmtree(cached, ignore_errors=True)
+            _galaxy_install(requirements_path_normalised, cached)
+            _write_stamp(cached, key)
+        else:
+            print("[INFO] Installing Ansible requirements from the cache...")
+
+        for subdir in ("roles", "collections"):
+            shutil.rmtree(install_dir / subdir, ignore_errors=True)
+            shutil.copytree(cached / subdir, install_dir / subdir, symlinks=True)
+
+    _write_stamp(install_dir, key)
+
+
+class FactCache:
+    """
+    A jsonfile fact cache for one cluster, kept between runs so that
+    ansible-playbook (with gathering=smart) only gathers facts for nodes it
+    does not already know.
+
+    Ansible keys the cache by inventory host, which is the node's static
+    IP. Alongside it, the hostname each node had when its facts were
+    gathered is recorded, and invalidate_changed() drops a node's facts
+    when its static IP or hostname has changed since.
+    """
+
+    NODES_FILE = ".drydock-nodes.json"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def env(self) -> dict:
+        return {
+            "ANSIBLE_GATHERING": "smart",
+            "ANSIBLE_CACHE_PLUGIN": "jsonfile",
+            "ANSIBLE_CACHE_PLUGIN_CONNECTION": self.directory,
+            "ANSIBLE_CACHE_PLUGIN_TIMEOUT": str(FACT_CACHE_TIMEOUT),
+        }
+
+    def _nodes_path(self):
+        return os.path.join(self.directory, self.NODES_FILE)
+
+    def _load(self) -> dict:
+        try:
+            with open(self._nodes_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def invalidate_changed(self, nodes: dict) -> list:
+        """
+        nodes maps the static IP of each node about to be provisioned to its
+        hostname, or None if unknown. Drops the cached facts of every node
+        whose hostname at that IP has changed, and of any IP a node has
+        moved away from. A node without a hostname unique among nodes cannot
+        be told apart from another, so its facts are never reused.
+
+        Returns the IPs whose cached facts were dropped.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        hostnames = collections.Counter(h for h in nodes.values() if h)
+        known = {ip: h for ip, h in nodes.items() if h and hostnames[h] == 1}
+
+        with file_lock(os.path.join(self.directory, ".lock")):
+            recorded = self._load()
+            stale = {
+                ip for ip in nodes if ip not in known or recorded.get(ip) != known[ip]
+            }
+            stale |= {
+                ip
+                for ip, hostname in recorded.items()
+                if ip not in nodes and hostname in hostnames
+            }
+
+            dropped = []
+            for ip in sorted(stale):
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(os.path.join(self.directory, ip))
+                    dropped.append(ip)
+
+            recorded = {ip: h for ip, h in recorded.items() if ip not in stale}
+            recorded.update(known)
+
+            partial = f"{self._nodes_path()}.tmp"
+            with open(partial, "w") as f:
+                json.dump(recorded, f, indent=2, sort_keys=True)
+            os.replace(partial, self._nodes_path())
+
+        return dropped
+
+
+def build_inventory(nodes) -> dict:
+    """
+    Build a YAML inventory for a cluster run from node assignments
+    (node_assignment.NodeAssignment or anything with static_ip and role).
+
+    Hosts are named by their static IP and placed in the controllers or
+    workers group. The first controller is also in the inaugural group,
+    which is where the playbook initialises the control plane.
+    """
+    groups = {"inaugural": {}, "controllers": {}, "workers": {}}
+
+    for node in nodes:
+        group = "controllers" if node.role == CONTROLLER else "workers"
+        groups[group][node.static_ip] = {"ansible_host": node.static_ip}
+
+    if groups["controllers"]:
+        first = next(iter(groups["controllers"]))
+        groups["inaugural"][first] = {}
+
+    return {
+        "all": {
+            "children": {
+                name: {"hosts": hosts} for name, hosts in groups.items() if hosts
+            }
+        }
+    }
+
+
+def _failure_summary(report: PlaybookReport) -> str:
+    return "; ".join(
+        f"'{failure.task}' on {failure.host}: {failure.msg}"
+        for failure in report.failures()
+    )
+
 
 def real_ansible_playbook(
     kubeadm_config_src: str,
@@ -54,25 +289,52 @@ def real_ansible_playbook(
     argocd_values: str,
     ip_address: str = None,
     ansible_dir: str = "bootstrap_node_config",
-) -> None:
+    event_handler=None,
+    nodes=None,
+    extra_vars_file: str = None,
+    hostname: str = None,
+    fact_cache_dir: str = None,
+    control_masters=None,
+) -> PlaybookReport:
     """
     Run the Ansible playbook on the given IP address, passing in the
     correct configuration paths required for kubeadm init, Cilium,
     and ArgoCD installation.
 
+    Pass nodes (a list of node assignments) instead of ip_address to
+    provision a whole cluster in one run. A controllers/workers inventory
+    is generated with build_inventory(), and ansible-playbook forks one
+    worker per node so every node is prepared in parallel. Per-host
+    outcomes are in the returned report.
+
+    extra_vars_file, if given, is a YAML file of further playbook
+    variables, such as those artifact_cache writes.
+
+    With fact_cache_dir, facts are cached there between runs (see
+    FactCache) and only gathered for nodes that are new or have changed.
+    hostname is the single node's hostname, if known; in a cluster run,
+    each node assignment's is used.
+
+    With control_masters (ssh_control.SSHControlMasters), Ansible connects
+    through the run's SSH control masters rather than its own.
+
+    The drydock_events callback plugin streams task events over a pipe
+    while the playbook runs. Each event is passed to event_handler, if
+    given, as soon as it arrives. A per-task timing report is printed at
+    the end and returned; on failure it is attached to the
+    AnsibleExecutionError as .report.
+
     This function is dependency-injected into the bootstrap workflow so it
     can be replaced with a mock in tests.
     """
-    if ip_address is None:
-        raise AnsibleRequirementsError("ip_address is required")
+    if ip_address is None and not nodes:
+        raise AnsibleRequirementsError("ip_address or nodes is required")
 
     playbook_file = pathlib.Path(ansible_dir) / "playbook.yaml"
     playbook_file = playbook_file.resolve()
     if not os.path.exists(playbook_file):
         raise AnsibleExecutionError(f"playbook.yaml not found in: {ansible_dir}")
 
-    inventory = f"{ip_address},"
-
     for required_file in [kubeadm_config_src, argocd_manifest, argocd_values]:
         if not os.path.exists(required_file):
             raise AnsibleExecutionError(
@@ -87,23 +349,115 @@ def real_ansible_playbook(
         "ansible_ssh_pass=bootstrap",
     ]
 
+    if extra_vars_file:
+        extra_vars.append(f"@{extra_vars_file}")
+
     extra_vars_args = []
     for var in extra_vars:
         extra_vars_args.extend(["--extra-vars", var])
 
+    inventory_file = None
+    forks_args = []
+
+    if nodes:
+        inventory_file = tempfile.NamedTemporaryFile(
+            "w", prefix="drydock-inventory-", suffix=".yaml", delete=False
+        )
+        with inventory_file:
+            yaml.safe_dump(build_inventory(nodes), inventory_file)
+
+        inventory = inventory_file.name
+        forks_args = ["--forks", str(max(DEFAULT_FORKS, len(nodes)))]
+    else:
+        inventory = f"{ip_address},"
+
+    env = {}
+    if fact_cache_dir:
+        fact_cache = FactCache(fact_cache_dir)
+        if nodes:
+            node_hostnames = {n.static_ip: getattr(n, "hostname", None) for n in nodes}
+        else:
+            node_hostnames = {ip_address: hostname}
+        for ip in fact_cache.invalidate_changed(node_hostnames):
+            print(f"[INFO] Cached facts for {ip} are out of date.")
+        env = fact_cache.env()
+
+    if control_masters is not None:
+        env.update(control_masters.ansible_env())
+
     try:
-        subprocess.run(
-            [
-                "ansible-playbook",
-                "-i",
-                inventory,
-                playbook_file,
-                *extra_vars_args,
-            ],
-            check=True,
+        return _run_playbook(
+            ["-i", inventory, *forks_args, str(playbook_file), *extra_vars_args],
+            playbook_file,
+            ansible_dir,
+            event_handler,
+            env,
+        )
+    finally:
+        if inventory_file is not None:
+            os.unlink(inventory_file.name)
+
+
+def _run_playbook(
+    args, playbook_file, ansible_dir, event_handler, env=None
+) -> PlaybookReport:
+    """
+    Run ansible-playbook with args, and env added to the environment,
+    collecting drydock_events into a report.
+    """
+    with tracing.span("ansible-playbook", tracing.SUBPROCESS):
+        return _run_traced_playbook(
+            args, playbook_file, ansible_dir, event_handler, env or {}
+        )
+
+
+def _run_traced_playbook(args, playbook_file, ansible_dir, event_handler, extra_env):
+    read_fd, write_fd = os.pipe()
+    env = {**os.environ, **extra_env}
+    env[EVENTS_FD_ENV] = str(write_fd)
+    env["ANSIBLE_CALLBACK_PLUGINS"] = str(playbook_file.parent / "callback_plugins")
+    env["ANSIBLE_CALLBACKS_ENABLED"] = EVENTS_CALLBACK
+
+    try:
+        process = subprocess.Popen(
+            ["ansible-playbook", *args],
             cwd=ansible_dir,
+            env=env,
+            pass_fds=(write_fd,),
         )
-    except subprocess.CalledProcessError as exc:
+    except OSError as exc:
+        os.close(read_fd)
         raise AnsibleExecutionError(
             f"ansible-playbook execution failed: {exc}"
         ) from exc
+    finally:
+        os.close(write_fd)
+
+    report = PlaybookReport()
+
+    try:
+        with os.fdopen(read_fd) as events:
+            for event in read_events(events):
+                report.record(event)
+                if event_handler is not None:
+                    event_handler(event)
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+
+    returncode = process.wait()
+
+    if report.results:
+        print(report.format())
+
+    if returncode != 0:
+        message = f"ansible-playbook exited with status {returncode}"
+        if report.failures():
+            message += f": {_failure_summary(report)}"
+
+        error = AnsibleExecutionError(f"ansible-playbook execution failed: {message}")
+        error.report = report
+        raise error
+
+    return report
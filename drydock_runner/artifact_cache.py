@@ -0,0 +1,375 @@
+import functools
+import hashlib
+import itertools
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+from drydock_runner import tracing
+from drydock_runner.cache import default_cache_dir, file_lock
+
+KUBERNETES_APT_REPOSITORY = "https://pkgs.k8s.io/core:/stable:/v1.30/deb/"
+KUBERNETES_PACKAGES = ("kubelet", "kubeadm", "kubectl")
+
+
+class ArtifactCacheError(Exception):
+    pass
+
+
+def fetch_url(url: str, dest: str, timeout=60) -> None:
+    """
+    Download url (http, https or file) to dest.
+    """
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            with open(dest, "wb") as f:
+                shutil.copyfileobj(response, f)
+    except OSError as exc:
+        raise ArtifactCacheError(f"Failed to download {url}: {exc}") from exc
+
+
+def real_image_fetch(image: str, dest: str, architecture: str) -> None:
+    """
+    Save a container image for architecture as a docker-archive tarball,
+    which ctr can import, using skopeo.
+    """
+    try:
+        tracing.run(
+            [
+                "skopeo",
+                "copy",
+                "--override-os",
+                "linux",
+                "--override-arch",
+                architecture,
+                f"docker://{image}",
+                f"docker-archive:{dest}:{image}",
+            ],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as exc:
+        raise ArtifactCacheError(f"Failed to fetch image {image}: {exc}") from exc
+
+
+def parse_packages_index(text: str) -> list:
+    """
+    Parse an apt Packages index into one dict of fields per package.
+    """
+    stanzas = []
+
+    for block in re.split(r"\n[ \t]*\n", text.strip()):
+        fields = {}
+        key = None
+
+        for line in block.splitlines():
+            if line[:1] in (" ", "\t") and key:
+                fields[key] += "\n" + line.strip()
+                continue
+            key, _, value = line.partition(":")
+            fields[key] = value.strip()
+
+        if fields.get("Package"):
+            stanzas.append(fields)
+
+    return stanzas
+
+
+def _order(char: str) -> int:
+    if char == "~":
+        return -1
+    if not char:
+        return 0
+    if char.isalpha():
+        return ord(char)
+    return ord(char) + 256
+
+
+def _compare_fragment(a: str, b: str) -> int:
+    while a or b:
+        text_a = re.match(r"\D*", a).group()
+        text_b = re.match(r"\D*", b).group()
+
+        for char_a, char_b in itertools.zip_longest(text_a, text_b, fillvalue=""):
+            if _order(char_a) != _order(char_b):
+                return _order(char_a) - _order(char_b)
+
+        a, b = a[len(text_a) :], b[len(text_b) :]
+        digits_a = re.match(r"\d*", a).group()
+        digits_b = re.match(r"\d*", b).group()
+
+        if int(digits_a or 0) != int(digits_b or 0):
+            return int(digits_a or 0) - int(digits_b or 0)
+
+        a, b = a[len(digits_a) :], b[len(digits_b) :]
+
+    return 0
+
+
+def compare_versions(a: str, b: str) -> int:
+    """
+    Compare two Debian package versions the way dpkg does. Negative if a
+    is older than b, zero if equal, positive if newer.
+    """
+
+    def split(version):
+        epoch, _, rest = (
+            version.rpartition(":") if ":" in version else ("0", "", version)
+        )
+        upstream, _, revision = rest.rpartition("-") if "-" in rest else (rest, "", "")
+        return int(epoch or 0), upstream, revision
+
+    epoch_a, upstream_a, revision_a = split(a)
+    epoch_b, upstream_b, revision_b = split(b)
+
+    if epoch_a != epoch_b:
+        return epoch_a - epoch_b
+
+    return _compare_fragment(upstream_a, upstream_b) or _compare_fragment(
+        revision_a, revision_b
+    )
+
+
+def _dependency_names(depends: str) -> list:
+    """
+    The package names in a Depends field, one per dependency; of a set of
+    alternatives, the first is taken.
+    """
+    names = []
+    for dependency in filter(None, (d.strip() for d in depends.split(","))):
+        first = dependency.split("|")[0]
+        names.append(re.split(r"[\s(:]", first.strip(), maxsplit=1)[0])
+    return names
+
+
+def select_packages(index: list, packages, architecture: str) -> list:
+    """
+    Choose the stanzas to download for packages (each "name" or
+    "name=version") on architecture: the newest version of each, unless
+    pinned, plus whatever they depend on that the same repository has.
+    Dependencies the repository does not have are left to the node's own
+    package sources.
+    """
+    by_name = {}
+    for stanza in index:
+        if stanza.get("Architecture") in (architecture, "all"):
+            by_name.setdefault(stanza["Package"], []).append(stanza)
+
+    newest = functools.cmp_to_key(compare_versions)
+    chosen = {}
+    pending = list(packages)
+
+    while pending:
+        name, _, version = pending.pop(0).partition("=")
+        if name in chosen:
+            continue
+
+        candidates = [
+            stanza
+            for stanza in by_name.get(name, [])
+            if not version or stanza["Version"] == version
+        ]
+        if not candidates:
+            if name in packages or f"{name}={version}" in packages:
+                raise ArtifactCacheError(
+                    f"Package {name}{'=' + version if version else ''} is not "
+                    f"available for {architecture}"
+                )
+            continue
+
+        stanza = max(candidates, key=lambda s: newest(s["Version"]))
+        chosen[name] = stanza
+        pending.extend(
+            dependency
+            for dependency in _dependency_names(stanza.get("Depends", ""))
+            if dependency in by_name
+        )
+
+    return list(chosen.values())
+
+
+def _safe_name(reference: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", reference)
+
+
+class ArtifactCache:
+    """
+    Node packages and container images, downloaded once on the operator's
+    machine and copied to every node over the LAN by the playbook.
+
+    Debs are kept under cache_dir/apt (a flat mirror of the packages that
+    were asked for) and images under cache_dir/images/<architecture>, as
+    tarballs. Both persist between runs; an artifact already in the cache
+    is never downloaded again, and every download is written to a
+    temporary file and renamed into place only once it is complete (and,
+    for debs, its SHA256 matches the index).
+
+    fetch_func and image_fetch_func are dependency-injected so tests can
+    point them at a local directory.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = None,
+        fetch_func=fetch_url,
+        image_fetch_func=real_image_fetch,
+        max_workers: int = 4,
+    ):
+        self.cache_dir = cache_dir or default_cache_dir("artifacts")
+        self.fetch_func = fetch_func
+        self.image_fetch_func = image_fetch_func
+        self.max_workers = max_workers
+        self.downloaded = []
+        self.reused = []
+        self._stanzas = {}
+
+    def _index(self, repository: str) -> list:
+        """
+        Fetch the repository's Packages index, falling back to the copy
+        from the last run if the repository cannot be reached.
+        """
+        key = hashlib.sha256(repository.encode()).hexdigest()[:16]
+        path = os.path.join(self.cache_dir, "apt", "indexes", f"{key}.Packages")
+
+        try:
+            self._download(f"{repository.rstrip('/')}/Packages", path)
+        except ArtifactCacheError as exc:
+            if not os.path.exists(path):
+                raise
+            print(f"[WARN] Using the cached package index for {repository}: {exc}")
+
+        with open(path) as f:
+            return parse_packages_index(f.read())
+
+    def _download(self, url: str, dest: str, sha256: str = None) -> None:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        fd, partial = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=".partial-")
+        os.close(fd)
+
+        try:
+            self.fetch_func(url, partial)
+
+            if sha256:
+                with open(partial, "rb") as f:
+                    actual = hashlib.file_digest(f, "sha256").hexdigest()
+                if actual != sha256:
+                    raise ArtifactCacheError(
+                        f"Checksum mismatch for {url}: expected {sha256}, "
+                        f"got {actual}"
+                    )
+
+            os.replace(partial, dest)
+        finally:
+            if os.path.exists(partial):
+                os.unlink(partial)
+
+    def _stage(self, dest: str, fetch) -> str:
+        if os.path.exists(dest):
+            self.reused.append(dest)
+        else:
+            fetch()
+            self.downloaded.append(dest)
+        return dest
+
+    def _stage_package(self, repository: str, filename: str) -> str:
+        stanza = self._stanzas[filename]
+        dest = os.path.join(self.cache_dir, "apt", "pool", os.path.basename(filename))
+
+        return self._stage(
+            dest,
+            lambda: self._download(
+                f"{repository.rstrip('/')}/{filename}", dest, stanza.get("SHA256")
+            ),
+        )
+
+    def _stage_image(self, image: str, architecture: str) -> str:
+        dest = os.path.join(
+            self.cache_dir, "images", architecture, f"{_safe_name(image)}.tar"
+        )
+
+        def fetch():
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            partial = os.path.join(
+                os.path.dirname(dest), f".partial-{os.path.basename(dest)}"
+            )
+            try:
+                self.image_fetch_func(image, partial, architecture)
+                os.replace(partial, dest)
+            finally:
+                if os.path.exists(partial):
+                    os.unlink(partial)
+
+        return self._stage(dest, fetch)
+
+    def prepare(
+        self,
+        architectures,
+        repository: str = KUBERNETES_APT_REPOSITORY,
+        packages=KUBERNETES_PACKAGES,
+        images=(),
+    ) -> dict:
+        """
+        Make sure every package and image is in the cache for each of
+        architectures, downloading what is missing concurrently.
+
+        Returns the playbook variables pointing at them:
+        drydock_debs and drydock_images, each a mapping of architecture
+        (as Debian names it) to local file paths.
+        """
+        playbook_vars = {
+            "drydock_debs": {architecture: [] for architecture in architectures},
+            "drydock_images": {architecture: [] for architecture in architectures},
+        }
+
+        with tracing.span("artifact cache", tracing.PHASE):
+            with file_lock(os.path.join(self.cache_dir, ".lock")):
+                index = self._index(repository) if packages else []
+                self._stanzas = {stanza["Filename"]: stanza for stanza in index}
+                # (variable, architecture, job): an "all" architecture deb
+                # is wanted for every architecture but staged only once.
+                wanted = []
+
+                for architecture in architectures:
+                    for stanza in select_packages(index, packages, architecture):
+                        job = (self._stage_package, repository, stanza["Filename"])
+                        wanted.append(("drydock_debs", architecture, job))
+                    for image in images:
+                        job = (self._stage_image, image, architecture)
+                        wanted.append(("drydock_images", architecture, job))
+
+                with ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="drydock-artifacts",
+                ) as executor:
+                    futures = {}
+                    for _, _, (stage, *args) in wanted:
+                        if (stage, *args) not in futures:
+                            futures[(stage, *args)] = executor.submit(stage, *args)
+
+                    for name, architecture, job in wanted:
+                        path = os.path.abspath(futures[job].result())
+                        playbook_vars[name][architecture].append(path)
+
+        print(
+            f"[INFO] Artifact cache: {len(self.downloaded)} downloaded, "
+            f"{len(self.reused)} already cached."
+        )
+        return playbook_vars
+
+
+def write_playbook_vars(playbook_vars: dict, path: str) -> str:
+    """
+    Write playbook variables as YAML, for ansible-playbook --extra-vars @path.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        yaml.safe_dump(playbook_vars, f, default_flow_style=False)
+    return path
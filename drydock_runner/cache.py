@@ -0,0 +1,57 @@
+import contextlib
+import fcntl
+import os
+
+
+def default_cache_dir(*parts: str) -> str:
+    """
+    Return Drydock's persistent cache directory, or a subdirectory of it.
+
+    Honours DRYDOCK_CACHE_DIR, then XDG_CACHE_HOME, then ~/.cache.
+    """
+    base = os.environ.get("DRYDOCK_CACHE_DIR")
+
+    if not base:
+        xdg = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        base = os.path.join(xdg, "drydock")
+
+    return os.path.join(base, *parts)
+
+
+@contextlib.contextmanager
+def file_lock(path: str, shared: bool = False, blocking: bool = True):
+    """
+    Hold an advisory flock on path for the duration of the block.
+
+    Shared locks may be held by many processes at once; an exclusive lock
+    excludes every other lock. With blocking=False, BlockingIOError is
+    raised if the lock is already held.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    if not blocking:
+        operation |= fcntl.LOCK_NB
+
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def directory_size(path: str) -> int:
+    """
+    Total size in bytes of the regular files under path.
+    """
+    total = 0
+
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+
+    return total
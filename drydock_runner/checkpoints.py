@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+
+def fingerprint(*inputs) -> str:
+    """
+    Hash the inputs of a phase into a short, stable fingerprint. Inputs
+    must be JSON-serialisable.
+    """
+    encoded = json.dumps(inputs, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class CheckpointStore:
+    """
+    Records which bootstrap phases have completed, so that a re-run after
+    a late failure can skip them.
+
+    Each phase is stored with the fingerprint of its inputs and its result
+    in a JSON file at path. A checkpoint only counts if the fingerprint
+    still matches; the caller is expected to also check the phase's
+    post-conditions on the node before trusting it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path) as f:
+                phases = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        return phases if isinstance(phases, dict) else {}
+
+    def _save(self, phases: dict) -> None:
+        parent = os.path.dirname(self.path) or "."
+        os.makedirs(parent, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=parent, prefix=".checkpoints-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(phases, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def get(self, phase: str, phase_fingerprint: str):
+        """
+        Return the recorded result of phase, or None if it has not completed
+        with these inputs.
+        """
+        entry = self._load().get(phase)
+
+        if not entry or entry.get("fingerprint") != phase_fingerprint:
+            return None
+
+        return entry.get("result")
+
+    def record(self, phase: str, phase_fingerprint: str, result) -> None:
+        phases = self._load()
+        phases[phase] = {
+            "fingerprint": phase_fingerprint,
+            "result": result,
+            "completed_at": time.time(),
+        }
+        self._save(phases)
+
+    def invalidate(self, *phases: str) -> None:
+        """
+        Forget phases, or every phase if none are named.
+        """
+        if not phases:
+            stored = {}
+        else:
+            stored = self._load()
+            for phase in phases:
+                stored.pop(phase, None)
+
+        self._save(stored)
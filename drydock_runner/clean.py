@@ -18,7 +18,7 @@ class CleanupResult:
     success: bool
 
 
-def run_cleanup(tmp_dir: str) -> CleanupResult:
+def run_cleanup(tmp_dir: str, control_masters=None) -> CleanupResult:
     """
     Clean up the temporary working directory produced during bootstrap.
 
@@ -34,8 +34,13 @@ def run_cleanup(tmp_dir: str) -> CleanupResult:
 
     3. Always return CleanupResult on success.
 
+    If control_masters (ssh_control.SSHControlMasters) is given, its SSH
+    master connections are closed first; their sockets are usually in
+    tmp_dir, so if it does not exist there is nothing to close either.
+
     Args:
         tmp_dir: The temporary directory path to clean.
+        control_masters: The run's SSH control masters, if any.
 
     Returns:
         CleanupResult(success=True) on success.
@@ -46,6 +51,9 @@ def run_cleanup(tmp_dir: str) -> CleanupResult:
     if not os.path.isdir(tmp_dir):
         return CleanupResult(success=True)
 
+    if control_masters is not None:
+        control_masters.close()
+
     try:
         shutil.rmtree(tmp_dir)
     except Exception:
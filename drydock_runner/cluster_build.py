@@ -1,16 +1,34 @@
 import os
-from drydock_runner.ip_discovery import discover_inaugural_ip
+import threading
+from dataclasses import asdict
+
+from drydock_runner import tracing
+from drydock_runner.checkpoints import fingerprint
+from drydock_runner.git_runner import repository_revision
+from drydock_runner.ip_discovery import discover_inaugural_ip, iter_ssh_hosts
 from drydock_runner.environment import (
     EnvironmentValidationError,
 )
 from drydock_runner.orchestration import (
     run_orchestration,
+    run_cluster_orchestration,
     OrchestrationResult,
     OrchestrationError,
 )
 from drydock_runner.kubectl_runner import real_kubectl_apply
-from drydock_runner.kubeconfig_fetcher import real_fetch_kubeconfig
+from drydock_runner.kubeconfig_fetcher import (
+    REMOTE_KUBECONFIG_PATH,
+    real_fetch_kubeconfig,
+)
 from drydock_runner.static_ip_assigner import StaticIPAssigner
+from drydock_runner.ssh_session import SSHConnectionManager
+from drydock_runner.scheduler import PhaseScheduler
+from drydock_runner.node_assignment import (
+    AddressPool,
+    CONTROLLER,
+    NodeAssignment,
+    assign_cluster_nodes,
+)
 import ipaddress
 
 
@@ -38,57 +56,377 @@ def run_bootstrap(
     static_ip_assigner_func=StaticIPAssigner,
     ssh_user="ubuntu",
     ssh_password="bootstrap",
+    cluster_layout=None,
+    node_discovery_func=iter_ssh_hosts,
+    address_pool=None,
+    connection_manager=None,
+    ansible_cluster_playbook_func=None,
+    checkpoints=None,
+    config_fingerprint: str = "",
+    readiness_func=None,
+    artifact_func=None,
+    control_masters=None,
 ) -> OrchestrationResult:
     """
     Full bootstrap workflow.
+
+    The workflow is a graph of phases run by scheduler.PhaseScheduler:
+    cloning, the Ansible Galaxy install and node discovery/static IP
+    assignment run at the same time, then the playbook, then the kubeconfig
+    fetch and root Application apply.
+
+    If cluster_layout is given and no node IP is supplied, every node the
+    layout asks for is discovered and given a static IP concurrently from
+    address_pool (by default, consecutive addresses from static_ip). The
+    node called hostname, if given, or else the first controller becomes
+    the inaugural node.
+
+    Every SSH step shares one connection_manager, so each node keeps a
+    single authenticated session for the whole run. One is created (and
+    closed at the end) if not supplied.
+
+    With ansible_cluster_playbook_func, every assigned node is provisioned
+    by one multi-host playbook run; the inaugural node's outcome is the
+    returned result, and each node's is in its node_results. Otherwise only
+    the inaugural node is provisioned, with ansible_playbook_func.
+
+    If checkpoints (a checkpoints.CheckpointStore) is given, the network
+    phase (discovery and static IPs) and the provision phase (the playbook)
+    are recorded as they complete, fingerprinted by their inputs:
+    config_fingerprint, the network settings, the cloned repository
+    revisions and the node IPs. On a re-run, a phase with a matching
+    fingerprint is skipped if its post-conditions still hold on the nodes,
+    so recovering from a late failure does not re-provision the cluster.
+
+    If artifact_func is given, it runs alongside the other early phases and
+    must finish before the playbook starts; it stages the packages and
+    images the playbook copies to the nodes (see artifact_cache).
+
+    If readiness_func is given (such as kube_wait.wait_for_cluster_ready),
+    it is called after the root Application is applied, with the kubeconfig
+    path, the manifest path and the number of provisioned nodes, and waits
+    until the cluster is ready. What it returns is the result's readiness.
+
+    If control_masters (ssh_control.SSHControlMasters) is given, an SSH
+    master connection is opened to each node as soon as it has its static
+    IP, so the OpenSSH steps that follow (the playbook among them) skip the
+    handshake however long they wait for the other phases. Closing them is
+    left to the caller, with clean.run_cleanup.
     """
 
     if clone_func is None:
         raise OrchestrationError("clone_func dependency has not been provided")
 
-    try:
-        repos = clone_func()
-        config_repo_path = repos["config"]
-    except Exception as exc:
-        raise OrchestrationError(f"Failed to clone repositories: {exc}") from exc
-
     if ansible_install_func is None:
         raise OrchestrationError(
             "ansible_install_func dependency has not been provided"
         )
 
-    try:
-        ansible_install_func()
-    except Exception as exc:
-        raise OrchestrationError(
-            f"Failed to install Ansible Galaxy requirements: {exc}"
-        ) from exc
+    if kubectl_apply_func is None:
+        raise OrchestrationError("kubectl_apply_func dependency has not been provided")
 
-    try:
-        if node_ip_address is None:
-            print("[INFO] No IP supplied. Running automatic discovery...")
-            dhcp_ip = discovery_func(cidr=cidr)
-            print(f"[INFO] Discovered inaugural node at DHCP IP {dhcp_ip}")
-        else:
-            dhcp_ip = node_ip_address
+    owns_connections = connection_manager is None
+    if owns_connections:
+        connection_manager = SSHConnectionManager(
+            ssh_user=ssh_user, ssh_password=ssh_password
+        )
 
-        assigner = static_ip_assigner_func(
-            ssh_user=ssh_user,
-            ssh_password=ssh_password,
+    network_fingerprint = fingerprint(
+        config_fingerprint,
+        static_ip,
+        cidr,
+        gateway,
+        list(nameservers),
+        hostname,
+        node_ip_address,
+        cluster_layout.model_dump() if cluster_layout is not None else None,
+    )
+
+    def clone_phase():
+        try:
+            repos = clone_func()
+            if "config" not in repos:
+                raise KeyError("config")
+        except Exception as exc:
+            raise OrchestrationError(f"Failed to clone repositories: {exc}") from exc
+
+        return repos
+
+    def galaxy_phase():
+        try:
+            ansible_install_func()
+        except Exception as exc:
+            raise OrchestrationError(
+                f"Failed to install Ansible Galaxy requirements: {exc}"
+            ) from exc
+
+    def network_phase():
+        network = _completed_phase(
+            checkpoints,
+            "network",
+            network_fingerprint,
+            lambda result: all(
+                _node_answers(connection_manager, ip)
+                for ip in _network_node_ips(result)
+            ),
         )
 
-        print(f"[INFO] Assigning static IP {static_ip}")
+        if network is not None:
+            print("[INFO] Static IPs already assigned. Skipping discovery.")
+            _open_control_masters(control_masters, _network_node_ips(network))
+            return network["node_ip_address"], [
+                NodeAssignment(**assignment)
+                for assignment in network["node_assignments"]
+            ]
 
-        assigner.assign(
-            dhcp_ip=dhcp_ip,
+        inaugural_ip, node_assignments = _assign_network(
             static_ip=static_ip,
             gateway=gateway,
+            cidr=cidr,
             nameservers=nameservers,
             hostname=hostname,
-            mask=ipaddress.ip_network(cidr, strict=False).prefixlen,
+            node_ip_address=node_ip_address,
+            discovery_func=discovery_func,
+            static_ip_assigner_func=static_ip_assigner_func,
+            ssh_user=ssh_user,
+            ssh_password=ssh_password,
+            cluster_layout=cluster_layout,
+            node_discovery_func=node_discovery_func,
+            address_pool=address_pool,
+            connection_manager=connection_manager,
+        )
+        network = {
+            "node_ip_address": inaugural_ip,
+            "node_assignments": [asdict(a) for a in node_assignments],
+        }
+        _record_phase(checkpoints, "network", network_fingerprint, network)
+        _open_control_masters(control_masters, _network_node_ips(network))
+
+        return inaugural_ip, node_assignments
+
+    def provision_phase(clone, network):
+        inaugural_ip, node_assignments = network
+        provisioned_nodes = [a for a in node_assignments if a.success]
+        provision_fingerprint = fingerprint(
+            network_fingerprint,
+            {name: repository_revision(path) for name, path in clone.items()},
+            inaugural_ip,
+            sorted(a.static_ip for a in provisioned_nodes),
+            ansible_cluster_playbook_func is not None,
+        )
+        node_results = {}
+
+        provisioned = _completed_phase(
+            checkpoints,
+            "provision",
+            provision_fingerprint,
+            lambda result: _kubeconfig_present(connection_manager, inaugural_ip),
         )
 
-        node_ip_address = static_ip
+        try:
+            if provisioned is not None:
+                print("[INFO] Nodes already provisioned. Skipping the playbook.")
+                provision_result = OrchestrationResult(
+                    success=True, machine_ip=inaugural_ip, ip_prompted=True
+                )
+                node_results = {
+                    ip: OrchestrationResult(success=True, machine_ip=ip)
+                    for ip in provisioned["node_ips"]
+                }
+            elif provisioned_nodes and ansible_cluster_playbook_func is not None:
+                node_results = run_cluster_orchestration(
+                    nodes=provisioned_nodes,
+                    ansible_func=ansible_cluster_playbook_func,
+                )
+                provision_result = node_results[inaugural_ip]
+
+                for ip, result in node_results.items():
+                    if not result.success:
+                        print(
+                            f"[WARN] Provisioning failed on {ip}: "
+                            f"{result.error_message}"
+                        )
+            else:
+                provision_result = run_orchestration(
+                    node_ip_address=inaugural_ip,
+                    ansible_func=ansible_playbook_func,
+                )
+        except Exception as exc:
+            raise OrchestrationError(f"Provisioning failed: {exc}") from exc
+
+        if provisioned is None and provision_result.success:
+            if all(result.success for result in node_results.values()):
+                _record_phase(
+                    checkpoints,
+                    "provision",
+                    provision_fingerprint,
+                    {"node_ips": sorted(node_results)},
+                )
+
+        provision_result.node_assignments = node_assignments
+        provision_result.node_results = node_results
+        return provision_result
+
+    def apply_phase(clone, provision):
+        node_ip = provision.machine_ip
+
+        try:
+            local_kubeconfig_dir = os.path.join(tmp_dir, "kubeconfig")
+            os.makedirs(local_kubeconfig_dir, exist_ok=True)
+            local_kubeconfig_path = os.path.join(local_kubeconfig_dir, "config")
+
+            real_fetch_kubeconfig(
+                machine_ip=node_ip,
+                local_output_path=local_kubeconfig_path,
+                user=ssh_user,
+                password=ssh_password,
+                connection_manager=connection_manager,
+                server_address=node_ip,
+            )
+
+            root_app_path = os.path.join(
+                clone["config"], "clusters", "kubernetes-lab", "root-application.yaml"
+            )
+
+            kubectl_apply_func(
+                kubeconfig_path=local_kubeconfig_path,
+                manifest_path=root_app_path,
+            )
+
+        except Exception as exc:
+            raise OrchestrationError(
+                f"Failed to apply ArgoCD root Application: {exc}"
+            ) from exc
+
+        if readiness_func is None or not provision.success:
+            return None
+
+        node_count = sum(r.success for r in provision.node_results.values())
+
+        try:
+            return readiness_func(
+                kubeconfig_path=local_kubeconfig_path,
+                manifest_path=root_app_path,
+                node_count=max(node_count, 1),
+            )
+        except Exception as exc:
+            raise OrchestrationError(f"Cluster did not become ready: {exc}") from exc
+
+    def artifacts_phase():
+        try:
+            return artifact_func()
+        except Exception as exc:
+            raise OrchestrationError(f"Failed to stage node artifacts: {exc}") from exc
+
+    # Cloning, the galaxy install, staging artifacts and finding the nodes
+    # are independent, so they run at the same time; the playbook needs all
+    # of them.
+    scheduler = PhaseScheduler()
+    scheduler.add("clone", clone_phase)
+    scheduler.add("galaxy", galaxy_phase)
+    scheduler.add("network", network_phase)
+    provision_depends_on = ["clone", "galaxy", "network"]
+    if artifact_func is not None:
+        scheduler.add("artifacts", artifacts_phase)
+        provision_depends_on.append("artifacts")
+    scheduler.add("provision", provision_phase, provision_depends_on)
+    scheduler.add("apply", apply_phase, ["clone", "provision"])
+
+    try:
+        results = scheduler.run()
+    finally:
+        if owns_connections:
+            connection_manager.close()
+
+    provision_result = results["provision"]
+    provision_result.readiness = results["apply"]
+    provision_result.discovery_warning = False
+    provision_result.ip_prompted = True
+
+    return provision_result
+
+
+def _assign_network(
+    static_ip,
+    gateway,
+    cidr,
+    nameservers,
+    hostname,
+    node_ip_address,
+    discovery_func,
+    static_ip_assigner_func,
+    ssh_user,
+    ssh_password,
+    cluster_layout,
+    node_discovery_func,
+    address_pool,
+    connection_manager,
+):
+    """
+    Discover the node(s) and give them static IPs.
+
+    Returns (inaugural node IP, node assignments). The assignments are
+    empty outside cluster mode.
+    """
+    node_assignments = []
+    mask = ipaddress.ip_network(cidr, strict=False).prefixlen
+
+    try:
+        if node_ip_address is None and cluster_layout is not None:
+            if address_pool is None:
+                address_pool = AddressPool(
+                    cidr, start=static_ip, reserved=[gateway, *nameservers]
+                )
+
+            print("[INFO] No IP supplied. Discovering cluster nodes...")
+
+            # Set by assign_cluster_nodes once the layout is full, which
+            # ends discovery.
+            stop = threading.Event()
+            node_assignments = assign_cluster_nodes(
+                hosts=(host.ip for host in node_discovery_func(cidr=cidr, stop=stop)),
+                layout=cluster_layout,
+                pool=address_pool,
+                assigner_factory=lambda: static_ip_assigner_func(
+                    ssh_user=ssh_user,
+                    ssh_password=ssh_password,
+                    connection_manager=connection_manager,
+                ),
+                gateway=gateway,
+                nameservers=nameservers,
+                mask=mask,
+                inaugural_hostname=hostname,
+                stop=stop,
+            )
+            node_ip_address = _inaugural_node_ip(node_assignments, hostname)
+        else:
+            if node_ip_address is None:
+                print("[INFO] No IP supplied. Running automatic discovery...")
+                with tracing.span("discover inaugural node"):
+                    dhcp_ip = discovery_func(cidr=cidr)
+                print(f"[INFO] Discovered inaugural node at DHCP IP {dhcp_ip}")
+            else:
+                dhcp_ip = node_ip_address
+
+            assigner = static_ip_assigner_func(
+                ssh_user=ssh_user,
+                ssh_password=ssh_password,
+                connection_manager=connection_manager,
+            )
+
+            print(f"[INFO] Assigning static IP {static_ip}")
+
+            assigner.assign(
+                dhcp_ip=dhcp_ip,
+                static_ip=static_ip,
+                gateway=gateway,
+                nameservers=nameservers,
+                hostname=hostname,
+                mask=mask,
+            )
+
+            node_ip_address = static_ip
+
         print(f"[INFO] Host now reachable at static IP {node_ip_address}")
 
     except Exception as exc:
@@ -96,44 +434,87 @@ def run_bootstrap(
             f"Failure during IP discovery or static IP assignment: {exc}"
         ) from exc
 
+    return node_ip_address, node_assignments
+
+
+def _completed_phase(checkpoints, phase, phase_fingerprint, postcondition):
+    """
+    Return the checkpointed result of phase if it completed with the same
+    inputs and postcondition(result) still holds; otherwise None.
+    """
+    if checkpoints is None:
+        return None
+
+    result = checkpoints.get(phase, phase_fingerprint)
+    if result is None:
+        return None
+
     try:
-        provision_result = run_orchestration(
-            node_ip_address=node_ip_address,
-            ansible_func=ansible_playbook_func,
-        )
+        if postcondition(result):
+            return result
     except Exception as exc:
-        raise OrchestrationError(f"Provisioning failed: {exc}") from exc
+        print(f"[WARN] Could not verify completed phase '{phase}': {exc}")
 
-    try:
-        local_kubeconfig_dir = os.path.join(tmp_dir, "kubeconfig")
-        os.makedirs(local_kubeconfig_dir, exist_ok=True)
-        local_kubeconfig_path = os.path.join(local_kubeconfig_dir, "config")
+    print(f"[INFO] Phase '{phase}' no longer holds on the nodes. Re-running it.")
+    checkpoints.invalidate(phase)
+    return None
 
-        real_fetch_kubeconfig(
-            machine_ip=node_ip_address,
-            local_output_path=local_kubeconfig_path,
-        )
 
-        root_app_path = os.path.join(
-            config_repo_path, "clusters", "kubernetes-lab", "root-application.yaml"
-        )
+def _record_phase(checkpoints, phase, phase_fingerprint, result):
+    if checkpoints is not None:
+        checkpoints.record(phase, phase_fingerprint, result)
 
-        if kubectl_apply_func is None:
-            raise OrchestrationError(
-                "kubectl_apply_func dependency has not been provided"
-            )
 
-        kubectl_apply_func(
-            kubeconfig_path=local_kubeconfig_path,
-            manifest_path=root_app_path,
-        )
+def _network_node_ips(network):
+    ips = [network["node_ip_address"]]
 
-    except Exception as exc:
-        raise OrchestrationError(
-            f"Failed to apply ArgoCD root Application: {exc}"
-        ) from exc
+    for assignment in network["node_assignments"]:
+        if assignment["success"] and assignment["static_ip"] not in ips:
+            ips.append(assignment["static_ip"])
 
-    provision_result.discovery_warning = False
-    provision_result.ip_prompted = True
+    return ips
 
-    return provision_result
+
+def _open_control_masters(control_masters, ips):
+    if control_masters is None:
+        return
+
+    # A node without a master is still provisioned; its SSH steps just
+    # connect on their own.
+    for error in control_masters.open_all(ips).values():
+        print(f"[WARN] {error}")
+
+
+def _node_answers(connection_manager, ip) -> bool:
+    status, _, _ = connection_manager.exec(ip, "true")
+    return status == 0
+
+
+def _kubeconfig_present(connection_manager, ip) -> bool:
+    status, _, _ = connection_manager.exec(ip, f"test -s {REMOTE_KUBECONFIG_PATH}")
+    return status == 0
+
+
+def _inaugural_node_ip(node_assignments, hostname=None):
+    """
+    Pick the first successfully assigned controller as the inaugural node,
+    reporting any other nodes that failed. If hostname is given, that must
+    be the inaugural node's.
+    """
+    for assignment in node_assignments:
+        if not assignment.success:
+            print(
+                f"[WARN] Static IP assignment failed for {assignment.dhcp_ip}: "
+                f"{assignment.error_message}"
+            )
+
+    for assignment in node_assignments:
+        if assignment.role == CONTROLLER and assignment.success:
+            if hostname and assignment.hostname != hostname:
+                raise OrchestrationError(
+                    f"Inaugural node '{hostname}' was not discovered or could "
+                    "not be assigned a static IP"
+                )
+            return assignment.static_ip
+
+    raise OrchestrationError("No controller node could be assigned a static IP")
@@ -8,17 +8,43 @@ class StaticIP(BaseModel):
     nameservers: List[str]
 
 
+class AddressPool(BaseModel):
+    start: str
+    end: Optional[str] = None
+
+
 class Network(BaseModel):
     vlanID: int
     staticIP: StaticIP
     cidr: str
     gateway: str
+    addressPool: Optional[AddressPool] = None
 
 
 class Discovery(BaseModel):
     enabled: bool = True
     method: str = Field("dhcp-scan", pattern="^dhcp-scan$")
     timeoutSeconds: int = 120
+    # Cluster discovery also ends once no new node has answered for this
+    # long, so a layout without workers.maxCount need not wait it out.
+    quietSeconds: int = 30
+
+
+class ControllerLayout(BaseModel):
+    count: int = Field(3, ge=1)
+    architecture: Optional[str] = None
+    strategy: str = Field("first-available", pattern="^first-available$")
+
+
+class WorkerLayout(BaseModel):
+    architecture: Optional[str] = None
+    strategy: str = Field("assign-remaining", pattern="^assign-remaining$")
+    maxCount: Optional[int] = Field(None, ge=0)
+
+
+class ClusterLayout(BaseModel):
+    controllers: ControllerLayout
+    workers: Optional[WorkerLayout] = None
 
 
 class InauguralNode(BaseModel):
@@ -44,11 +70,21 @@ class BootstrapSources(BaseModel):
     repositories: Dict[str, RepositorySource]
 
 
+class ArtifactCache(BaseModel):
+    enabled: bool = False
+    aptRepository: str = "https://pkgs.k8s.io/core:/stable:/v1.30/deb/"
+    packages: List[str] = ["kubelet", "kubeadm", "kubectl"]
+    images: List[str] = []
+    architectures: List[str] = []
+
+
 class BootstrapSpec(BaseModel):
     network: Network
     discovery: Discovery
+    clusterLayout: Optional[ClusterLayout] = None
     inauguralNode: InauguralNode
     bootstrapSources: BootstrapSources
+    artifactCache: ArtifactCache = ArtifactCache()
 
 
 class Metadata(BaseModel):
@@ -1,17 +1,269 @@
+import contextlib
+import hashlib
 import os
+import shutil
 import subprocess
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from drydock_runner import tracing
+from drydock_runner.cache import default_cache_dir, directory_size, file_lock
+
+# run_bootstrap reads clusters/<cluster>/root-application.yaml from the
+# config repository, which is not listed in RepositoryPaths.
+ALWAYS_CHECKED_OUT = ("clusters/",)
+
+
+def sparse_checkout_patterns(repo) -> list[str]:
+    """
+    Return the non-cone sparse-checkout patterns for a repository: every
+    path configured in its RepositoryPaths, plus ALWAYS_CHECKED_OUT.
+    """
+    paths = [path for path in vars(repo.paths).values() if path]
+    patterns = []
+
+    for path in [*paths, *ALWAYS_CHECKED_OUT]:
+        pattern = "/" + path.lstrip("/")
+        if pattern not in patterns:
+            patterns.append(pattern)
+
+    return patterns
+
+
+class RepositoryCache:
+    """
+    Persistent cache of bare mirrors of the bootstrap source repositories.
+
+    Mirrors live under cache_dir, one per URL, named by a hash of the URL.
+    The first run clones the mirror; later runs only fetch new objects.
+    Working copies are then local clones of the mirror, which hardlink its
+    object files where they share a filesystem and copy them otherwise.
+    They do not borrow objects through alternates ("git clone --shared"),
+    so evicting a mirror never breaks a working copy made from it.
+
+    Each mirror has a lock file. Updating a mirror takes it exclusively and
+    cloning from it takes it shared, so concurrent runs are safe. evict()
+    skips any mirror that is in use.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | None = None,
+        max_age_days: float = 30,
+        max_size_bytes: int = 2 * 1024**3,
+    ):
+        if cache_dir is None:
+            cache_dir = default_cache_dir("git")
+
+        self.cache_dir = cache_dir
+        self.max_age_days = max_age_days
+        self.max_size_bytes = max_size_bytes
+
+    def mirror_path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{key}.git")
+
+    def _lock_path(self, mirror: str) -> str:
+        return f"{mirror}.lock"
+
+    def update(self, url: str) -> str:
+        """
+        Bring the mirror of url up to date, creating it if needed, and
+        return its path.
+        """
+        mirror = self.mirror_path(url)
+
+        with file_lock(self._lock_path(mirror)):
+            if os.path.isdir(mirror):
+                tracing.run(
+                    ["git", "-C", mirror, "fetch", "--quiet", "--prune", "origin"],
+                    check=True,
+                )
+            else:
+                partial = tempfile.mkdtemp(dir=self.cache_dir, prefix=".partial-")
+                try:
+                    tracing.run(
+                        ["git", "clone", "--quiet", "--mirror", url, partial],
+                        check=True,
+                    )
+                    os.rename(partial, mirror)
+                except BaseException:
+                    shutil.rmtree(partial, ignore_errors=True)
+                    raise
+
+            # Used by evict() to find stale mirrors.
+            os.utime(mirror)
+
+        return mirror
+
+    @contextlib.contextmanager
+    def reading(self, url: str):
+        """
+        Hold the mirror of url shared while a working copy is made from it.
+        """
+        mirror = self.mirror_path(url)
+
+        with file_lock(self._lock_path(mirror), shared=True):
+            yield mirror
+
+    def evict(self) -> list[str]:
+        """
+        Remove mirrors unused for max_age_days, then the least recently
+        used mirrors until the cache fits in max_size_bytes.
+
+        Returns the paths of the removed mirrors.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+
+        mirrors = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".git") and entry.is_dir():
+                mirrors.append((entry.stat().st_mtime, entry.path))
+
+        mirrors.sort()
+        sizes = {path: directory_size(path) for _, path in mirrors}
+        total = sum(sizes.values())
+        cutoff = time.time() - self.max_age_days * 86400
+        removed = []
+
+        for last_used, path in mirrors:
+            if last_used >= cutoff and total <= self.max_size_bytes:
+                break
+
+            try:
+                with file_lock(self._lock_path(path), blocking=False):
+                    shutil.rmtree(path)
+            except BlockingIOError:
+                continue
+
+            total -= sizes[path]
+            removed.append(path)
+
+        return removed
+
+
+def _clone_from_mirror(cache: RepositoryCache, url, branch, repo_path):
+    mirror = cache.update(url)
+
+    with cache.reading(url):
+        tracing.run(
+            [
+                "git",
+                "clone",
+                "--quiet",
+                "--local",
+                "--sparse",
+                "--branch",
+                branch,
+                mirror,
+                repo_path,
+            ],
+            check=True,
+        )
+
+    tracing.run(
+        ["git", "-C", repo_path, "remote", "set-url", "origin", url], check=True
+    )
+
+
+def _clone_from_remote(url, branch, repo_path):
+    tracing.run(
+        [
+            "git",
+            "clone",
+            "--quiet",
+            "--depth",
+            "1",
+            "--filter=blob:none",
+            "--sparse",
+            "--branch",
+            branch,
+            url,
+            repo_path,
+        ],
+        check=True,
+    )
+
+
+def clone_repository(
+    name: str, repo, repo_path: str, cache: RepositoryCache | None = None
+) -> str:
+    """
+    Clone a single repository into repo_path.
+
+    Without a cache, the clone is shallow (--depth 1) and blobless
+    (--filter=blob:none). With a cache, the repository's mirror is updated
+    and the working copy is a local clone of it. Either way, only the
+    configured paths are checked out.
+    """
+    url = str(repo.url)
+    branch = repo.branch or "main"
+
+    print(f"[INFO] Cloning '{name}' from {url} @ {branch}")
+
+    try:
+        if cache is None:
+            _clone_from_remote(url, branch, repo_path)
+        else:
+            _clone_from_mirror(cache, url, branch, repo_path)
+
+        tracing.run(
+            [
+                "git",
+                "-C",
+                repo_path,
+                "sparse-checkout",
+                "set",
+                "--no-cone",
+                *sparse_checkout_patterns(repo),
+            ],
+            check=True,
+        )
+    except subprocess.CalledProcessError as exc:
+        raise RuntimeError(f"Failed to clone repository {name}: {exc}") from exc
+
+    return repo_path
+
+
+def repository_revision(repo_path: str) -> str | None:
+    """
+    Return the commit checked out at repo_path, or None if it is not a git
+    working copy.
+    """
+    try:
+        result = tracing.run(
+            ["git", "-C", repo_path, "rev-parse", "HEAD"],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return result.stdout.strip()
 
 
 def clone_repositories(
-    repos: dict[str, any], base_dir: str | None = None
+    repos: dict[str, any],
+    base_dir: str | None = None,
+    max_workers: int = 4,
+    cache: RepositoryCache | None = None,
 ) -> dict[str, str]:
     """
     Clone all repositories defined in bootstrapSources.repositories.
 
+    Repositories are cloned concurrently, so the total time is close to
+    that of the slowest single clone.
+
     Args:
         repos: Mapping from repository logical name to Repository model.
         base_dir: Optional parent directory where repos should be cloned.
+        max_workers: Maximum number of clones to run at once.
+        cache: Optional RepositoryCache to clone through. The cache is
+            evicted once all clones have finished.
 
     Returns:
         dict mapping logical repository names -> local checkout path
@@ -19,22 +271,22 @@ def clone_repositories(
     if base_dir is None:
         base_dir = tempfile.mkdtemp(prefix="drydock-repos-")
 
-    results = {}
-
-    for name, repo in repos.items():
-        repo_path = os.path.join(base_dir, name)
-        os.makedirs(repo_path, exist_ok=True)
+    futures = {}
 
-        print(f"[INFO] Cloning '{name}' from {repo.url} @ {repo.branch}")
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="drydock-clone"
+    ) as executor:
+        for name, repo in repos.items():
+            repo_path = os.path.join(base_dir, name)
+            os.makedirs(repo_path, exist_ok=True)
 
-        try:
-            subprocess.run(
-                ["git", "clone", "--branch", repo.branch, repo.url, repo_path],
-                check=True,
+            futures[name] = executor.submit(
+                clone_repository, name, repo, repo_path, cache
             )
-        except subprocess.CalledProcessError as exc:
-            raise RuntimeError(f"Failed to clone repository {name}: {exc}") from exc
 
-        results[name] = repo_path
+    results = {name: future.result() for name, future in futures.items()}
+
+    if cache is not None:
+        cache.evict()
 
     return results
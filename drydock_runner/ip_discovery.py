@@ -1,54 +1,574 @@
+import asyncio
 import ipaddress
-import socket
+import queue
+import threading
 import time
+from dataclasses import dataclass
+
+from drydock_runner.ssh_probe import SSH_PORT, ProbeOutcome, classify_banner
 
 
 class DiscoveryError(Exception):
     pass
 
 
+PROC_NET_ARP = "/proc/net/arp"
+
+# /proc/net/arp flag for an entry whose hardware address has resolved.
+ATF_COM = 0x2
+
+
+@dataclass
+class AddressState:
+    outcome: ProbeOutcome = None
+    misses: int = 0
+    next_probe: float = 0.0
+
+
+class SubnetScanState:
+    """
+    Remembers what each address did in earlier discovery rounds, so later
+    rounds only re-probe the addresses whose answer could plausibly change.
+
+      - Refused addresses are live hosts whose sshd may still be starting,
+        so they are probed again every round.
+      - Silent addresses back off exponentially, from twice the retry
+        interval up to max_backoff, so they sit out at least the next round.
+      - Addresses that answered with a banner, SSH or not, are settled and
+        only re-checked at max_backoff.
+    """
+
+    def __init__(self, hosts, retry_interval=2, max_backoff=30):
+        self.retry_interval = retry_interval
+        self.max_backoff = max_backoff
+        self.addresses = {str(ip): AddressState() for ip in hosts}
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def due(self, now):
+        return [
+            ip_str
+            for ip_str, state in self.addresses.items()
+            if state.next_probe <= now
+        ]
+
+    def record(self, ip_str, outcome, now):
+        state = self.addresses[ip_str]
+        state.outcome = outcome
+
+        if outcome == ProbeOutcome.SILENT:
+            state.misses += 1
+            delay = min(self.retry_interval * 2**state.misses, self.max_backoff)
+        elif outcome in (ProbeOutcome.NON_SSH, ProbeOutcome.SSH):
+            state.misses = 0
+            delay = self.max_backoff
+        else:
+            state.misses = 0
+            delay = self.retry_interval
+
+        state.next_probe = now + delay
+
+
+class NeighbourTableSource:
+    """
+    Candidate source backed by the kernel neighbour table.
+
+    Reads /proc/net/arp and yields the addresses on the network that have a
+    resolved hardware address, i.e. hosts that have recently been seen on
+    the VLAN. Incomplete entries are ignored.
+    """
+
+    def __init__(self, path=PROC_NET_ARP):
+        self.path = path
+
+    def candidates(self, network):
+        try:
+            with open(self.path) as f:
+                lines = f.read().splitlines()[1:]
+        except OSError:
+            return []
+
+        found = []
+
+        for line in lines:
+            fields = line.split()
+            if len(fields) < 4:
+                continue
+
+            ip_str, _, flags, hw_address = fields[:4]
+
+            try:
+                resolved = int(flags, 16) & ATF_COM
+            except ValueError:
+                continue
+
+            if not resolved or hw_address == "00:00:00:00:00:00":
+                continue
+
+            found.append(ip_str)
+
+        return _within(network, found)
+
+
+class DhcpLeaseSource:
+    """
+    Candidate source backed by a DHCP lease file.
+
+    Understands both dnsmasq leases (one "expiry mac ip hostname client-id"
+    entry per line) and ISC dhcpd leases ("lease 192.168.8.12 { ... }").
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def candidates(self, network):
+        try:
+            with open(self.path) as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return []
+
+        found = []
+
+        for line in lines:
+            fields = line.split()
+
+            if len(fields) >= 3 and fields[0] == "lease":
+                found.append(fields[1])
+            elif len(fields) >= 4 and fields[0].isdigit():
+                found.append(fields[2])
+
+        return _within(network, found)
+
+
+def _within(network, addresses):
+    """
+    Return the unique addresses that are usable hosts on network, in the
+    order they were first seen.
+    """
+    hosts = []
+
+    for ip_str in addresses:
+        try:
+            ip = ipaddress.ip_address(ip_str)
+        except ValueError:
+            continue
+
+        if ip not in network:
+            continue
+
+        if network.num_addresses > 2 and ip in (
+            network.network_address,
+            network.broadcast_address,
+        ):
+            continue
+
+        if str(ip) not in hosts:
+            hosts.append(str(ip))
+
+    return hosts
+
+
+def gather_candidates(candidate_sources, network):
+    """
+    Ask every candidate source for addresses on network, most trusted first.
+    """
+    candidates = []
+
+    for source in candidate_sources:
+        for ip_str in source.candidates(network):
+            if ip_str not in candidates:
+                candidates.append(ip_str)
+
+    return candidates
+
+
+async def _probe_banner(
+    ip_str,
+    port,
+    scan_timeout,
+    banner_timeout,
+    semaphore,
+    connect_func,
+):
+    """
+    Open a TCP connection to ip_str:port and read the server banner.
+
+    Returns a (ProbeOutcome, banner) tuple. The banner is None unless
+    something was read from the socket.
+    """
+    async with semaphore:
+        try:
+            reader, writer = await asyncio.wait_for(
+                connect_func(ip_str, port), timeout=scan_timeout
+            )
+        except (ConnectionRefusedError, ConnectionResetError):
+            return ProbeOutcome.REFUSED, None
+        except (asyncio.TimeoutError, OSError):
+            return ProbeOutcome.SILENT, None
+
+        try:
+            raw = await asyncio.wait_for(reader.read(1024), timeout=banner_timeout)
+        except ConnectionResetError:
+            return ProbeOutcome.REFUSED, None
+        except (asyncio.TimeoutError, OSError):
+            return ProbeOutcome.SILENT, None
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    return classify_banner(raw)
+
+
+async def probe_addresses(
+    hosts,
+    port=SSH_PORT,
+    scan_timeout=0.3,
+    banner_timeout=None,
+    max_concurrency=256,
+    connect_func=asyncio.open_connection,
+):
+    """
+    Probe every address in hosts concurrently.
+
+    At most max_concurrency connects are in flight at once, so a full
+    /24 completes in roughly one scan_timeout rather than one per host.
+
+    Returns a dict mapping each address to its (ProbeOutcome, banner),
+    in the order the addresses were given.
+    """
+    if banner_timeout is None:
+        banner_timeout = scan_timeout
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    addresses = [str(ip) for ip in hosts]
+
+    results = await asyncio.gather(
+        *(
+            _probe_banner(
+                ip_str, port, scan_timeout, banner_timeout, semaphore, connect_func
+            )
+            for ip_str in addresses
+        )
+    )
+
+    return dict(zip(addresses, results))
+
+
+async def scan_for_ssh_hosts(hosts, **probe_kwargs):
+    """
+    Probe every address in hosts concurrently and return those that
+    present an SSH banner, in the order they were given.
+    """
+    results = await probe_addresses(hosts, **probe_kwargs)
+
+    return [
+        ip_str
+        for ip_str, (outcome, _) in results.items()
+        if outcome == ProbeOutcome.SSH
+    ]
+
+
+def parse_ssh_version(banner):
+    """
+    Return the protocol version from an SSH identification string, e.g.
+    "2.0" for "SSH-2.0-OpenSSH_9.6p1 Ubuntu-3ubuntu13", or None if the
+    banner does not follow RFC 4253.
+    """
+    for line in banner.splitlines():
+        if line.startswith("SSH-"):
+            parts = line.split("-", 2)
+            if len(parts) == 3 and parts[1]:
+                return parts[1]
+
+    return None
+
+
+@dataclass(frozen=True)
+class DiscoveredHost:
+    ip: str
+    banner: str
+    ssh_version: str
+    first_seen: float
+
+
+class SubnetScanner:
+    """
+    Scans a subnet for SSH servers, one round at a time, keeping
+    per-address state between rounds in a SubnetScanState.
+
+    scan_round() and stream() are async generators that yield a
+    DiscoveredHost as soon as each SSH banner is confirmed, rather than
+    waiting for the whole round to finish.
+    """
+
+    def __init__(
+        self,
+        cidr: str,
+        scan_timeout=0.3,
+        retry_interval=2,
+        banner_timeout=None,
+        max_concurrency=256,
+        max_backoff=30,
+        port=SSH_PORT,
+        connect_func=asyncio.open_connection,
+        candidate_sources=None,
+    ):
+        if banner_timeout is None:
+            banner_timeout = scan_timeout
+
+        if candidate_sources is None:
+            candidate_sources = (NeighbourTableSource(),)
+
+        self.cidr = cidr
+        self.network = ipaddress.ip_network(cidr)
+        self.scan_timeout = scan_timeout
+        self.retry_interval = retry_interval
+        self.banner_timeout = banner_timeout
+        self.max_concurrency = max_concurrency
+        self.port = port
+        self.connect_func = connect_func
+        self.candidate_sources = candidate_sources
+        self.state = SubnetScanState(
+            self.network.hosts(),
+            retry_interval=retry_interval,
+            max_backoff=max_backoff,
+        )
+
+    async def _probe(self, addresses, semaphore):
+        tasks = [
+            asyncio.ensure_future(self._probe_one(ip_str, semaphore))
+            for ip_str in addresses
+        ]
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                ip_str, outcome, banner = await next_done
+                self.state.record(ip_str, outcome, time.time())
+
+                if outcome == ProbeOutcome.SSH:
+                    yield DiscoveredHost(
+                        ip=ip_str,
+                        banner=banner.strip(),
+                        ssh_version=parse_ssh_version(banner),
+                        first_seen=time.time(),
+                    )
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _probe_one(self, ip_str, semaphore):
+        outcome, banner = await _probe_banner(
+            ip_str,
+            self.port,
+            self.scan_timeout,
+            self.banner_timeout,
+            semaphore,
+            self.connect_func,
+        )
+        return ip_str, outcome, banner
+
+    async def scan_round(self, complete=False):
+        """
+        Run one discovery round.
+
+        Addresses offered by the candidate sources are probed first, then
+        the due addresses in the rest of the subnet. The candidates only
+        decide the order: a host missing from the neighbour table or the
+        leases is still found by the sweep.
+
+        If complete is set and the round finds any SSH host, the addresses
+        that were not due (those backing off) are probed as well, so a
+        round that reports hosts has looked at the whole subnet.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        preferred = gather_candidates(self.candidate_sources, self.network)
+        found = False
+
+        async for host in self._probe(preferred, semaphore):
+            found = True
+            yield host
+
+        due = [
+            ip_str for ip_str in self.state.due(time.time()) if ip_str not in preferred
+        ]
+        print(
+            f"Scanning subnet for inaugural host "
+            f"({len(due)} of {len(self.state)} addresses)..."
+        )
+
+        async for host in self._probe(due, semaphore):
+            found = True
+            yield host
+
+        if not (found and complete):
+            return
+
+        probed = set(preferred).union(due)
+        rest = [ip_str for ip_str in self.state.addresses if ip_str not in probed]
+
+        async for host in self._probe(rest, semaphore):
+            yield host
+
+    async def stream(self, total_timeout=90):
+        """
+        Yield every SSH host on the subnet once, as soon as it is found,
+        until total_timeout expires.
+        """
+        deadline = time.time() + total_timeout
+        reported = set()
+
+        while time.time() < deadline:
+            async for host in self.scan_round():
+                if host.ip not in reported:
+                    reported.add(host.ip)
+                    yield host
+
+            await asyncio.sleep(min(self.retry_interval, deadline - time.time()))
+
+
+_STREAM_END = object()
+
+# How often iter_ssh_hosts checks for a stop or a quiet period.
+_STOP_POLL_INTERVAL = 0.1
+
+
+def iter_ssh_hosts(
+    cidr: str, total_timeout=90, quiet_timeout=None, stop=None, **scanner_kwargs
+):
+    """
+    Synchronous generator over SubnetScanner.stream().
+
+    The scan runs on its own event loop in a background thread, so it
+    keeps going while the caller works on the hosts found so far.
+    Closing the generator stops the scan.
+
+    With quiet_timeout, the scan also ends once a host has been found
+    and no new one has turned up for that many seconds. With stop (a
+    threading.Event), it ends as soon as the event is set, even while
+    waiting for the next host.
+    """
+    scanner = SubnetScanner(cidr, **scanner_kwargs)
+    found = queue.Queue()
+    loop = asyncio.new_event_loop()
+
+    async def produce():
+        async for host in scanner.stream(total_timeout):
+            found.put(host)
+
+    task = loop.create_task(produce())
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as exc:
+            found.put(exc)
+        finally:
+            loop.close()
+            found.put(_STREAM_END)
+
+    thread = threading.Thread(target=run, name="drydock-discovery", daemon=True)
+    thread.start()
+
+    # Only poll when there is something to notice besides the next host.
+    poll = _STOP_POLL_INTERVAL if quiet_timeout or stop is not None else None
+    last_found = None
+
+    try:
+        while stop is None or not stop.is_set():
+            try:
+                item = found.get(timeout=poll)
+            except queue.Empty:
+                if (
+                    quiet_timeout
+                    and last_found is not None
+                    and time.monotonic() - last_found >= quiet_timeout
+                ):
+                    return
+                continue
+
+            if item is _STREAM_END:
+                return
+
+            if isinstance(item, Exception):
+                raise item
+
+            last_found = time.monotonic()
+            yield item
+    finally:
+        if thread.is_alive():
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass
+            thread.join()
+
+
 def discover_inaugural_ip(
     cidr: str,
     scan_timeout=0.3,  # TCP connect timeout per IP
-    retry_interval=2,  # seconds between full subnet scans
+    retry_interval=2,  # seconds between discovery rounds
     total_timeout=90,  # bail out after this many seconds
+    banner_timeout=None,  # banner read deadline per IP, defaults to scan_timeout
+    max_concurrency=256,  # maximum in-flight connects
+    max_backoff=30,  # longest wait before re-probing a dead address
+    port=SSH_PORT,
+    connect_func=asyncio.open_connection,
+    candidate_sources=None,  # defaults to the kernel neighbour table
 ):
     """
     Discover the inaugural host by scanning for exactly one SSH server
     on the target subnet. Retries until total_timeout.
-    """
-    network = ipaddress.ip_network(cidr)
-    deadline = time.time() + total_timeout
 
-    while time.time() < deadline:
-        print("Scanning subnet for inaugural host...")
+    This is a thin consumer of SubnetScanner.scan_round(): the first round
+    with any SSH hosts decides the result, and more than one is an error.
+    That round always covers the whole subnet, so a second SSH host is
+    never missed because the first was found quickly.
+    See SubnetScanner for how rounds are scheduled.
+    """
+    scanner = SubnetScanner(
+        cidr,
+        scan_timeout=scan_timeout,
+        retry_interval=retry_interval,
+        banner_timeout=banner_timeout,
+        max_concurrency=max_concurrency,
+        max_backoff=max_backoff,
+        port=port,
+        connect_func=connect_func,
+        candidate_sources=candidate_sources,
+    )
 
-        candidates = []
+    async def first_round_with_hosts():
+        deadline = time.time() + total_timeout
 
-        for ip in network.hosts():
-            ip_str = str(ip)
+        while time.time() < deadline:
+            found = [host.ip async for host in scanner.scan_round(complete=True)]
 
-            try:
-                with socket.create_connection((ip_str, 22), timeout=scan_timeout) as s:
-                    banner = s.recv(1024).decode(errors="ignore").lower()
+            if found:
+                return found
 
-                    if "ssh" in banner:
-                        candidates.append(ip_str)
+            print(f"⏳ No host found, retrying in {retry_interval}s...")
+            await asyncio.sleep(retry_interval)
 
-            except (socket.timeout, ConnectionRefusedError, OSError):
-                continue
+        return []
 
-        if len(candidates) == 1:
-            return candidates[0]
+    candidates = asyncio.run(first_round_with_hosts())
 
-        if len(candidates) > 1:
-            raise DiscoveryError(
-                f"Multiple SSH hosts detected: {candidates}. "
-                "Please isolate the inaugural node."
-            )
+    if len(candidates) == 1:
+        return candidates[0]
 
-        print(f"⏳ No host found, retrying in {retry_interval}s...")
-        time.sleep(retry_interval)
+    if len(candidates) > 1:
+        candidates.sort(key=ipaddress.ip_address)
+        raise DiscoveryError(
+            f"Multiple SSH hosts detected: {candidates}. "
+            "Please isolate the inaugural node."
+        )
 
     raise DiscoveryError(
         f"No inaugural host found on subnet {cidr} after {total_timeout} seconds."
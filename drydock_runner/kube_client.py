@@ -0,0 +1,537 @@
+import base64
+import contextlib
+import http.client
+import json
+import os
+import ssl
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+import yaml
+
+from drydock_runner import tracing
+
+FIELD_MANAGER = "drydock"
+
+# Applied in an earlier batch than everything else, so the objects that
+# live in them (or are of their kinds) can be applied afterwards.
+FIRST_BATCH_KINDS = ("Namespace", "CustomResourceDefinition")
+
+MANIFEST_SUFFIXES = (".yaml", ".yml", ".json")
+
+
+class KubeClientError(Exception):
+    pass
+
+
+class InvalidManifestError(KubeClientError, ValueError):
+    pass
+
+
+class KubeAPIError(KubeClientError):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Kubernetes API returned {status}: {message}")
+        self.status = status
+
+
+def _api_error(status: int, data: bytes) -> KubeAPIError:
+    try:
+        message = json.loads(data).get("message") or data.decode()
+    except (ValueError, AttributeError):
+        message = data.decode(errors="replace")
+    return KubeAPIError(status, message)
+
+
+def _kubeconfig_entry(entries, name, key):
+    for entry in entries or []:
+        if entry.get("name") == name:
+            return entry.get(key) or {}
+    raise KubeClientError(f"Kubeconfig has no {key} named '{name}'")
+
+
+def _resolve(base_dir, path):
+    return path if os.path.isabs(path) else os.path.join(base_dir, path)
+
+
+def _ssl_context(cluster: dict, user: dict, base_dir: str) -> ssl.SSLContext:
+    context = ssl.create_default_context()
+
+    if cluster.get("insecure-skip-tls-verify"):
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    elif cluster.get("certificate-authority-data"):
+        cadata = base64.b64decode(cluster["certificate-authority-data"]).decode()
+        context.load_verify_locations(cadata=cadata)
+    elif cluster.get("certificate-authority"):
+        context.load_verify_locations(
+            cafile=_resolve(base_dir, cluster["certificate-authority"])
+        )
+
+    if user.get("client-certificate-data") and user.get("client-key-data"):
+        # load_cert_chain only reads files; they are removed straight after.
+        with tempfile.TemporaryDirectory(prefix="drydock-kube-") as tmp:
+            cert = os.path.join(tmp, "client.crt")
+            key = os.path.join(tmp, "client.key")
+            for path, field in (
+                (cert, "client-certificate-data"),
+                (key, "client-key-data"),
+            ):
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(base64.b64decode(user[field]))
+            context.load_cert_chain(cert, key)
+    elif user.get("client-certificate") and user.get("client-key"):
+        context.load_cert_chain(
+            _resolve(base_dir, user["client-certificate"]),
+            _resolve(base_dir, user["client-key"]),
+        )
+
+    return context
+
+
+class _ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to one API server, shared by threads.
+    """
+
+    def __init__(self, server: str, ssl_context=None, size=4, timeout=30):
+        url = urlsplit(server)
+        self.scheme = url.scheme
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == "https" else 80)
+        self.base_path = url.path.rstrip("/")
+        self.ssl_context = ssl_context
+        self.size = size
+        self.timeout = timeout
+        self.created = 0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _new(self):
+        self.created += 1
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout, context=self.ssl_context
+            )
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    @contextlib.contextmanager
+    def connection(self, fresh=False, timeout=None):
+        conn = None
+        if not fresh:
+            with self._lock:
+                if self._idle:
+                    conn = self._idle.pop()
+
+        reused = conn is not None
+        if conn is None:
+            conn = self._new()
+
+        conn.timeout = timeout or self.timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(conn.timeout)
+
+        try:
+            yield conn, reused
+        except BaseException:
+            conn.close()
+            raise
+
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class KubeClient:
+    """
+    A small in-process Kubernetes API client for applying manifests.
+
+    Connections to the API server are pooled and kept alive, and API
+    discovery (which resource serves each apiVersion and kind) is fetched
+    once per group/version and cached for the client's lifetime. Objects
+    are applied with server-side apply, so no client-side diff or
+    last-applied annotation is needed.
+    """
+
+    def __init__(
+        self,
+        server: str,
+        ssl_context=None,
+        headers=None,
+        namespace="default",
+        pool_size=4,
+        timeout=30,
+    ):
+        self.server = server
+        self.headers = dict(headers or {})
+        self.namespace = namespace
+        self.pool_size = pool_size
+        self.pool = _ConnectionPool(server, ssl_context, pool_size, timeout)
+        self._discovery = {}
+        self._discovering = {}
+        self._discovery_lock = threading.Lock()
+
+    @classmethod
+    def from_kubeconfig(cls, path: str, context_name: str = None, **kwargs):
+        """
+        Build a client from the current (or named) context of a kubeconfig,
+        such as the one written by kubeconfig_fetcher.
+        """
+        try:
+            with open(path) as f:
+                config = yaml.safe_load(f) or {}
+        except (OSError, yaml.YAMLError) as exc:
+            raise KubeClientError(f"Cannot read kubeconfig {path}: {exc}") from exc
+
+        context_name = context_name or config.get("current-context")
+        if not context_name:
+            contexts = config.get("contexts") or []
+            if not contexts:
+                raise KubeClientError(f"Kubeconfig {path} has no contexts")
+            context_name = contexts[0]["name"]
+
+        context = _kubeconfig_entry(config.get("contexts"), context_name, "context")
+        cluster = _kubeconfig_entry(
+            config.get("clusters"), context["cluster"], "cluster"
+        )
+        user = {}
+        if context.get("user"):
+            user = _kubeconfig_entry(config.get("users"), context["user"], "user")
+
+        headers = {}
+        if user.get("token"):
+            headers["Authorization"] = f"Bearer {user['token']}"
+
+        base_dir = os.path.dirname(os.path.abspath(path))
+        ssl_context = None
+        if cluster["server"].startswith("https:"):
+            ssl_context = _ssl_context(cluster, user, base_dir)
+
+        return cls(
+            cluster["server"],
+            ssl_context=ssl_context,
+            headers=headers,
+            namespace=context.get("namespace") or "default",
+            **kwargs,
+        )
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _send(self, conn, method, path, body, headers):
+        conn.request(method, path, body=body, headers=headers)
+        return conn.getresponse()
+
+    def request(
+        self, method, path, body=None, content_type="application/json", query=None
+    ):
+        """
+        Send one request and return the decoded JSON response.
+
+        A kept-alive connection the server has since closed is replaced
+        and the request retried once.
+        """
+        url = f"{self.pool.base_path}{path}"
+        if query:
+            url += f"?{urlencode(query)}"
+
+        headers = {"Accept": "application/json", **self.headers}
+        if body is not None:
+            headers["Content-Type"] = content_type
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode()
+
+        for attempt in range(2):
+            reused = False
+            try:
+                with self.pool.connection(fresh=attempt > 0) as (conn, reused):
+                    response = self._send(conn, method, url, body, headers)
+                    data = response.read()
+            except (
+                http.client.RemoteDisconnected,
+                ConnectionResetError,
+                BrokenPipeError,
+            ) as exc:
+                if reused and attempt == 0:
+                    continue
+                raise KubeClientError(
+                    f"Request to {self.server} failed: {exc}"
+                ) from exc
+            except (OSError, http.client.HTTPException) as exc:
+                raise KubeClientError(
+                    f"Request to {self.server} failed: {exc}"
+                ) from exc
+
+            break
+
+        if response.status >= 400:
+            raise _api_error(response.status, data)
+
+        return json.loads(data) if data else {}
+
+    def watch(self, path, query=None, timeout=60):
+        """
+        Yield the events of a watch on path, decoded, until the server ends
+        the stream or nothing arrives for timeout seconds.
+
+        A watch holds its connection for as long as it runs, so it gets a
+        connection of its own rather than one from the pool.
+        """
+        url = f"{self.pool.base_path}{path}?" + urlencode(
+            {**(query or {}), "watch": "1"}
+        )
+        headers = {"Accept": "application/json", **self.headers}
+        conn = self.pool._new()
+        conn.timeout = timeout
+
+        try:
+            response = self._send(conn, "GET", url, None, headers)
+            if response.status >= 400:
+                raise _api_error(response.status, response.read())
+
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+        except TimeoutError:
+            return
+        except (OSError, http.client.HTTPException) as exc:
+            raise KubeClientError(f"Watch on {path} failed: {exc}") from exc
+        finally:
+            conn.close()
+
+    def collection_path(self, api_version, kind, namespace=None) -> str:
+        """
+        Return the path listing a kind, within namespace if it is namespaced.
+        """
+        plural, namespaced = self.resource_for(api_version, kind)
+        base = self._group_version_path(api_version)
+
+        if namespaced and namespace:
+            return f"{base}/namespaces/{namespace}/{plural}"
+
+        return f"{base}/{plural}"
+
+    def _group_version_path(self, api_version):
+        if "/" in api_version:
+            return f"/apis/{api_version}"
+        return f"/api/{api_version}"
+
+    def _discover(self, api_version) -> dict:
+        try:
+            listing = self.request("GET", self._group_version_path(api_version))
+        except KubeAPIError as exc:
+            if exc.status == 404:
+                return {}
+            raise
+
+        return {
+            resource["kind"]: (resource["name"], resource.get("namespaced", False))
+            for resource in listing.get("resources", [])
+            if "/" not in resource["name"]
+        }
+
+    def resource_for(self, api_version: str, kind: str):
+        """
+        Return (plural resource name, namespaced) for a kind, from the
+        discovery cache. A group/version is re-discovered once if the kind
+        is missing, as it will be just after its CRD has been applied.
+
+        Discovery is fetched without holding the cache lock, so a slow
+        group/version does not hold up the others. Threads missing the
+        same group/version wait for one fetch rather than each making
+        their own.
+        """
+        with self._discovery_lock:
+            resources = self._discovery.get(api_version)
+            fetching = self._discovering.setdefault(api_version, threading.Lock())
+
+        if resources is None or kind not in resources:
+            with fetching:
+                with self._discovery_lock:
+                    latest = self._discovery.get(api_version)
+
+                # Unchanged since it was looked up, so nobody has
+                # re-discovered it while this thread waited.
+                if latest is resources:
+                    latest = self._discover(api_version)
+                    with self._discovery_lock:
+                        self._discovery[api_version] = latest
+
+                resources = latest
+
+        if kind not in resources:
+            raise KubeClientError(f"The API server does not serve {api_version} {kind}")
+
+        return resources[kind]
+
+    def object_path(self, obj: dict) -> str:
+        api_version = obj.get("apiVersion")
+        kind = obj.get("kind")
+        name = (obj.get("metadata") or {}).get("name")
+
+        if not api_version or not kind or not name:
+            raise KubeClientError(
+                "Manifest object needs apiVersion, kind and metadata.name"
+            )
+
+        plural, namespaced = self.resource_for(api_version, kind)
+        base = self._group_version_path(api_version)
+
+        if namespaced:
+            namespace = obj["metadata"].get("namespace") or self.namespace
+            return f"{base}/namespaces/{namespace}/{plural}/{name}"
+
+        return f"{base}/{plural}/{name}"
+
+    def apply(self, obj: dict, field_manager: str = FIELD_MANAGER) -> dict:
+        """
+        Server-side apply a single object and return it as stored.
+        """
+        return self.request(
+            "PATCH",
+            self.object_path(obj),
+            body=obj,
+            content_type="application/apply-patch+yaml",
+            query={"fieldManager": field_manager, "force": "true"},
+        )
+
+    def apply_all(self, objects: list, field_manager: str = FIELD_MANAGER) -> list:
+        """
+        Apply objects in batches: Namespaces and CRDs first, then
+        everything else. The objects in a batch are applied concurrently
+        over the connection pool. If any fail, the batch is finished and
+        a KubeClientError naming every failure is raised.
+        """
+        batches = [
+            [obj for obj in objects if obj.get("kind") in FIRST_BATCH_KINDS],
+            [obj for obj in objects if obj.get("kind") not in FIRST_BATCH_KINDS],
+        ]
+        applied = []
+
+        with ThreadPoolExecutor(
+            max_workers=self.pool_size, thread_name_prefix="drydock-apply"
+        ) as executor:
+            for batch in batches:
+                futures = [
+                    (obj, executor.submit(self.apply, obj, field_manager))
+                    for obj in batch
+                ]
+                failures = []
+
+                for obj, future in futures:
+                    try:
+                        applied.append(future.result())
+                    except KubeClientError as exc:
+                        name = (obj.get("metadata") or {}).get("name")
+                        failures.append(f"{obj.get('kind')}/{name}: {exc}")
+
+                if failures:
+                    raise KubeClientError(
+                        "Server-side apply failed for " + "; ".join(failures)
+                    )
+
+        return applied
+
+
+def _check_object(document, path, number):
+    if not isinstance(document, dict):
+        raise InvalidManifestError(
+            f"Invalid manifest {path}: document {number} is a "
+            f"{type(document).__name__}, not a Kubernetes object"
+        )
+
+
+def load_manifests(manifest_path: str) -> list:
+    """
+    Read every object from a manifest file, or from the YAML and JSON files
+    in a directory (in name order). Lists are flattened and empty documents
+    skipped. A document (or List item) that is not a mapping raises
+    InvalidManifestError, a ValueError naming the file it came from.
+    """
+    if os.path.isdir(manifest_path):
+        paths = sorted(
+            os.path.join(manifest_path, name)
+            for name in os.listdir(manifest_path)
+            if name.endswith(MANIFEST_SUFFIXES)
+        )
+    elif os.path.exists(manifest_path):
+        paths = [manifest_path]
+    else:
+        raise KubeClientError(f"Manifest path not found: {manifest_path}")
+
+    objects = []
+
+    for path in paths:
+        try:
+            with open(path) as f:
+                documents = list(yaml.safe_load_all(f))
+        except yaml.YAMLError as exc:
+            raise InvalidManifestError(f"Invalid manifest {path}: {exc}") from exc
+
+        for number, document in enumerate(documents, start=1):
+            if not document:
+                continue
+            _check_object(document, path, number)
+
+            if document.get("kind", "").endswith("List") and "items" in document:
+                items = [item for item in document["items"] or [] if item]
+                for item in items:
+                    _check_object(item, path, number)
+                objects.extend(items)
+            else:
+                objects.append(document)
+
+    return objects
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def client_for(kubeconfig_path: str) -> KubeClient:
+    """
+    Return the process-wide client for a kubeconfig, so the file is read,
+    and connections and discovery are reused, across calls. A rewritten
+    kubeconfig gets a new client.
+    """
+    path = os.path.abspath(kubeconfig_path)
+    key = (path, os.stat(path).st_mtime_ns)
+
+    with _clients_lock:
+        client = _clients.get(path)
+        if client is None or client[0] != key:
+            if client is not None:
+                client[1].close()
+            client = (key, KubeClient.from_kubeconfig(path))
+            _clients[path] = client
+
+    return client[1]
+
+
+def server_side_apply(kubeconfig_path: str = None, manifest_path: str = None) -> list:
+    """
+    Apply a manifest file or directory with server-side apply, in-process.
+
+    A drop-in replacement for kubectl_runner.real_kubectl_apply, injected
+    into the bootstrap workflow in the same way.
+    """
+    objects = load_manifests(manifest_path)
+
+    with tracing.span("server-side apply", tracing.PHASE, objects=len(objects)):
+        return client_for(kubeconfig_path).apply_all(objects)
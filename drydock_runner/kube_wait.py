@@ -0,0 +1,241 @@
+import contextlib
+import time
+
+from drydock_runner import tracing
+from drydock_runner.kube_client import (
+    KubeAPIError,
+    KubeClientError,
+    client_for,
+    load_manifests,
+)
+from drydock_runner.readiness import ReadinessTimeoutError
+
+# Ends a watch request on the server so a stalled stream is noticed; the
+# watch is resumed from the last resourceVersion seen.
+MAX_WATCH_SECONDS = 60
+
+ARGOCD_SERVER = {
+    "apiVersion": "apps/v1",
+    "kind": "Deployment",
+    "metadata": {"name": "argocd-server", "namespace": "argocd"},
+}
+
+
+def deployment_available(deployment: dict) -> bool:
+    wanted = (deployment.get("spec") or {}).get("replicas", 1)
+    available = (deployment.get("status") or {}).get("availableReplicas") or 0
+    return available >= max(wanted, 1)
+
+
+def node_ready(node: dict) -> bool:
+    for condition in (node.get("status") or {}).get("conditions") or []:
+        if condition.get("type") == "Ready":
+            return condition.get("status") == "True"
+    return False
+
+
+def application_healthy(application: dict) -> bool:
+    health = (application.get("status") or {}).get("health") or {}
+    return health.get("status") == "Healthy"
+
+
+# What "ready" means for each kind that has a meaning for it. Objects of
+# other kinds are ready as soon as they have been applied.
+READY_CONDITIONS = {
+    "Deployment": deployment_available,
+    "Node": node_ready,
+    "Application": application_healthy,
+}
+
+
+def _object_name(obj: dict) -> str:
+    return (obj.get("metadata") or {}).get("name")
+
+
+def watch_until(
+    client,
+    collection_path: str,
+    predicate,
+    timeout: float,
+    description: str,
+    field_selector: str = None,
+) -> dict:
+    """
+    Wait until predicate holds for the objects in a collection, returning
+    them by name as soon as it does.
+
+    The collection is listed once, then watched from the list's
+    resourceVersion, so every change is seen as it happens rather than at
+    the next poll. A watch the server ends is resumed from the last
+    resourceVersion seen (bookmarks included); if the server no longer has
+    that version (410 Gone), the collection is listed again.
+
+    Raises readiness.ReadinessTimeoutError naming description if predicate
+    does not hold within timeout seconds.
+    """
+    deadline = time.monotonic() + timeout
+    query = {"fieldSelector": field_selector} if field_selector else {}
+    objects = {}
+    resource_version = None
+
+    while True:
+        if resource_version is None:
+            listing = client.request("GET", collection_path, query=query)
+            objects = {_object_name(item): item for item in listing.get("items", [])}
+            resource_version = listing.get("metadata", {}).get("resourceVersion")
+
+        if predicate(objects):
+            return objects
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ReadinessTimeoutError(
+                f"{description} was not ready within {timeout} seconds."
+            )
+
+        watch_query = {
+            **query,
+            "resourceVersion": resource_version,
+            "allowWatchBookmarks": "true",
+            "timeoutSeconds": str(max(1, int(min(remaining, MAX_WATCH_SECONDS)))),
+        }
+        events = client.watch(collection_path, query=watch_query, timeout=remaining)
+
+        try:
+            with contextlib.closing(events):
+                for event in events:
+                    obj = event.get("object") or {}
+
+                    if event.get("type") == "ERROR":
+                        if obj.get("code") == 410:
+                            resource_version = None
+                            break
+                        raise KubeClientError(
+                            f"Watch on {collection_path} failed: {obj.get('message')}"
+                        )
+
+                    resource_version = obj["metadata"]["resourceVersion"]
+
+                    if event.get("type") == "DELETED":
+                        objects.pop(_object_name(obj), None)
+                    elif event.get("type") != "BOOKMARK":
+                        objects[_object_name(obj)] = obj
+
+                    if predicate(objects):
+                        return objects
+
+                    if time.monotonic() >= deadline:
+                        break
+        except KubeAPIError as exc:
+            if exc.status != 410:
+                raise
+            resource_version = None
+
+
+def wait_for_object(
+    client,
+    api_version: str,
+    kind: str,
+    name: str,
+    namespace: str = None,
+    predicate=None,
+    timeout: float = 300,
+) -> dict:
+    """
+    Wait until the named object exists and predicate (by default the one
+    READY_CONDITIONS has for its kind) holds for it. Returns the object.
+    """
+    predicate = predicate or READY_CONDITIONS.get(kind, lambda obj: True)
+
+    if namespace is None and client.resource_for(api_version, kind)[1]:
+        namespace = client.namespace
+
+    objects = watch_until(
+        client,
+        client.collection_path(api_version, kind, namespace),
+        lambda objects: name in objects and predicate(objects[name]),
+        timeout,
+        f"{kind} {namespace + '/' if namespace else ''}{name}",
+        field_selector=f"metadata.name={name}",
+    )
+    return objects[name]
+
+
+def wait_for_nodes_ready(client, count: int, timeout: float = 300) -> list:
+    """
+    Wait until at least count Nodes are Ready. Returns their names.
+    """
+    objects = watch_until(
+        client,
+        "/api/v1/nodes",
+        lambda objects: sum(map(node_ready, objects.values())) >= count,
+        timeout,
+        f"{count} Ready node(s)",
+    )
+    return sorted(name for name, node in objects.items() if node_ready(node))
+
+
+def wait_for_manifests(client, objects: list, timeout: float = 300) -> dict:
+    """
+    Wait until every object of a kind in READY_CONDITIONS is ready, all
+    within one timeout. Returns {"Kind/namespace/name": seconds waited}.
+
+    The objects are waited for one after another, but as they share a
+    deadline the total is the time the slowest takes.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    waited = {}
+
+    for obj in objects:
+        kind = obj.get("kind")
+        if kind not in READY_CONDITIONS:
+            continue
+
+        name = _object_name(obj)
+        namespace = (obj.get("metadata") or {}).get("namespace")
+
+        wait_for_object(
+            client,
+            obj["apiVersion"],
+            kind,
+            name,
+            namespace=namespace,
+            timeout=max(deadline - time.monotonic(), 0),
+        )
+        waited["/".join(filter(None, (kind, namespace, name)))] = round(
+            time.monotonic() - started, 3
+        )
+
+    return waited
+
+
+def wait_for_cluster_ready(
+    kubeconfig_path: str = None,
+    manifest_path: str = None,
+    node_count: int = 1,
+    timeout: float = 900,
+) -> dict:
+    """
+    Wait until node_count Nodes are Ready, the ArgoCD server is available
+    and the objects in manifest_path (the root Application) are ready.
+
+    Injected into cluster_build.run_bootstrap as its readiness_func.
+    Returns {"Node" or "Kind/namespace/name": seconds until it was ready}.
+    """
+    client = client_for(kubeconfig_path)
+    objects = [ARGOCD_SERVER, *load_manifests(manifest_path)]
+    started = time.monotonic()
+
+    with tracing.span("wait for cluster ready", tracing.PHASE, nodes=node_count):
+        wait_for_nodes_ready(client, node_count, timeout=timeout)
+        nodes_seconds = round(time.monotonic() - started, 3)
+
+        waited = wait_for_manifests(
+            client, objects, timeout=max(timeout - nodes_seconds, 0)
+        )
+
+    return {
+        "Node": nodes_seconds,
+        **{key: round(nodes_seconds + s, 3) for key, s in waited.items()},
+    }
@@ -1,18 +1,79 @@
-import subprocess
 import os
 import stat
+import tempfile
+from urllib.parse import urlsplit, urlunsplit
+
+import yaml
+
+from drydock_runner import tracing
+from drydock_runner.ssh_session import SSHConnectionManager
 
 
 class KubeconfigFetchError(Exception):
     pass
 
 
+REMOTE_KUBECONFIG_PATH = "/home/ubuntu/.kube/config"
+
+
+def rewrite_server_address(kubeconfig: str, server_address: str) -> str:
+    """
+    Point every cluster in a kubeconfig at server_address, keeping the
+    scheme and port of the original server URL.
+    """
+    try:
+        config = yaml.safe_load(kubeconfig)
+    except yaml.YAMLError as exc:
+        raise KubeconfigFetchError(f"Kubeconfig is not valid YAML: {exc}") from exc
+
+    if not isinstance(config, dict):
+        raise KubeconfigFetchError("Kubeconfig is not a YAML mapping")
+
+    for entry in config.get("clusters") or []:
+        cluster = entry.get("cluster") or {}
+        server = cluster.get("server")
+        if not server:
+            continue
+
+        url = urlsplit(server)
+        netloc = server_address if url.port is None else f"{server_address}:{url.port}"
+        cluster["server"] = urlunsplit(url._replace(netloc=netloc))
+
+    return yaml.safe_dump(config, sort_keys=False)
+
+
+def write_kubeconfig(local_output_path: str, kubeconfig: str) -> None:
+    """
+    Write kubeconfig to local_output_path atomically, readable only by the
+    current user. The file never exists with wider permissions or partial
+    content.
+    """
+    parent = os.path.dirname(local_output_path) or "."
+    os.makedirs(parent, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=parent, prefix=".kubeconfig-")
+
+    try:
+        os.fchmod(fd, stat.S_IRUSR | stat.S_IWUSR)
+        with os.fdopen(fd, "w") as f:
+            f.write(kubeconfig)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, local_output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
 def real_fetch_kubeconfig(
     machine_ip: str,
     local_output_path: str,
-    remote_path: str = "/home/ubuntu/.kube/config",
+    remote_path: str = REMOTE_KUBECONFIG_PATH,
     user: str = "ubuntu",
     password: str = "bootstrap",
+    connection_manager=None,
+    server_address: str = None,
 ):
     """
     Fetch the kubeconfig from the newly bootstrapped node and store it locally.
@@ -22,41 +83,34 @@ def real_fetch_kubeconfig(
       - The temporary bootstrap password is 'bootstrap'
       - The remote kubeconfig path is /home/ubuntu/.kube/config
 
-    This function uses sshpass to avoid interactive prompts. The bootstrap
-    design is intentionally short-lived, so password authentication is
-    acceptable at this stage.
+    The file is read over an SFTP channel straight into memory, in-process.
+    If a connection_manager (ssh_session.SSHConnectionManager) is given, the
+    node's existing session is reused; otherwise a short-lived one is opened
+    with user and password. The bootstrap design is intentionally
+    short-lived, so password authentication is acceptable at this stage.
 
-    The kubeconfig is written with restrictive permissions.
-    """
+    If server_address is given, the cluster server addresses are rewritten
+    to it before the file is written.
 
-    # Ensure sshpass is installed
-    try:
-        subprocess.run(
-            ["sshpass", "-V"], stdout=subprocess.PIPE, stderr=subprocess.PIPE
-        )
-    except FileNotFoundError:
-        raise KubeconfigFetchError("sshpass is required but is not installed.")
-
-    parent = os.path.dirname(local_output_path)
-    if parent and not os.path.exists(parent):
-        os.makedirs(parent, exist_ok=True)
-
-    scp_command = [
-        "sshpass",
-        "-p",
-        password,
-        "scp",
-        "-o",
-        "StrictHostKeyChecking=no",
-        f"{user}@{machine_ip}:{remote_path}",
-        local_output_path,
-    ]
+    The kubeconfig is written atomically with restrictive permissions.
+    """
+    owns_connections = connection_manager is None
+    if owns_connections:
+        connection_manager = SSHConnectionManager(ssh_user=user, ssh_password=password)
 
     try:
-        subprocess.run(scp_command, check=True)
-    except subprocess.CalledProcessError as exc:
+        with tracing.span("fetch kubeconfig", tracing.SSH, host=machine_ip):
+            with connection_manager.sftp(machine_ip).open(remote_path, "r") as f:
+                kubeconfig = f.read().decode()
+    except Exception as exc:
         raise KubeconfigFetchError(
-            f"Failed to fetch kubeconfig via SCP: {exc}"
+            f"Failed to fetch kubeconfig via SFTP: {exc}"
         ) from exc
+    finally:
+        if owns_connections:
+            connection_manager.close()
+
+    if server_address is not None:
+        kubeconfig = rewrite_server_address(kubeconfig, server_address)
 
-    os.chmod(local_output_path, stat.S_IRUSR | stat.S_IWUSR)
+    write_kubeconfig(local_output_path, kubeconfig)
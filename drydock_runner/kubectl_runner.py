@@ -1,12 +1,19 @@
 import subprocess
 import os
 
+from drydock_runner import tracing
+from drydock_runner.kube_client import KubeClientError, client_for, load_manifests
+from drydock_runner.kube_wait import wait_for_manifests
+from drydock_runner.readiness import ReadinessTimeoutError
+
 
 class KubectlApplyError(Exception):
     pass
 
 
-def real_kubectl_apply(kubeconfig_path: str = None, manifest_path: str = None) -> None:
+def real_kubectl_apply(
+    kubeconfig_path: str = None, manifest_path: str = None, wait_timeout=None
+):
     """
     Apply a Kubernetes manifest using kubectl.
 
@@ -15,13 +22,16 @@ def real_kubectl_apply(kubeconfig_path: str = None, manifest_path: str = None) -
 
     kubeconfig_path: path to the kubeconfig file created by kubeadm init
     manifest_path: path to a file or directory containing Kubernetes manifests
+    wait_timeout: if given, wait up to this many seconds for the applied
+        objects to become ready (see kube_wait.READY_CONDITIONS) and return
+        the seconds waited for each
     """
 
     if not os.path.exists(manifest_path):
         raise KubectlApplyError(f"Manifest path not found: {manifest_path}")
 
     try:
-        subprocess.run(
+        tracing.run(
             [
                 "kubectl",
                 "--kubeconfig",
@@ -34,3 +44,15 @@ def real_kubectl_apply(kubeconfig_path: str = None, manifest_path: str = None) -
         )
     except subprocess.CalledProcessError as exc:
         raise KubectlApplyError(f"kubectl apply failed: {exc}") from exc
+
+    if wait_timeout is None:
+        return None
+
+    try:
+        return wait_for_manifests(
+            client_for(kubeconfig_path),
+            load_manifests(manifest_path),
+            timeout=wait_timeout,
+        )
+    except (KubeClientError, ReadinessTimeoutError) as exc:
+        raise KubectlApplyError(f"Applied objects did not become ready: {exc}") from exc
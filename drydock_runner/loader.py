@@ -1,20 +1,264 @@
-import yaml
+import functools
+import hashlib
+import json
+import os
+import tempfile
 from pathlib import Path
-from .config import BootstrapConfig
+
+import yaml
+
+from .cache import default_cache_dir
+
+# libyaml's loader is many times faster than the pure-Python one, but
+# PyYAML is not always built with it.
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Only present in a source checkout; see schema_available().
+DEFAULT_SCHEMA_PATH = Path(__file__).resolve().parent.parent / "config-schema.yaml"
+
+# The leaf types config-schema.yaml uses. Any other leaf is a literal the
+# value must equal, such as the apiVersion.
+SCHEMA_TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+}
+
+# Models validated in this process, by absolute path:
+# (mtime_ns, size, sha256, model).
+_loaded = {}
+
+
+def _parse(data: bytes, path: Path):
+    try:
+        return yaml.load(data, Loader=SafeLoader)
+    except yaml.YAMLError as exc:
+        raise ValueError(f"Invalid Drydock configuration: {path}: {exc}") from exc
+
+
+def _type_name(value) -> str:
+    if value is None:
+        return "null"
+    return {bool: "boolean", int: "integer", float: "number", str: "string"}.get(
+        type(value), "a " + ("mapping" if isinstance(value, dict) else "list")
+    )
 
 
-def load_config(path: str | Path) -> BootstrapConfig:
+def compile_schema(schema):
     """
-    Load and validate the Drydock configuration file.
+    Turn a config-schema.yaml document into a function of (value, where)
+    that returns what is wrong with value, as a list of messages.
+
+    Only keys present in both the schema and the value are checked. The
+    schema describes where the configuration is going, so it has keys the
+    models do not (yet) have and lacks some they do; neither is an error.
+    A null value is treated as absent.
+    """
+    if isinstance(schema, dict):
+        fields = {key: compile_schema(item) for key, item in schema.items()}
+
+        def check(value, where):
+            if not isinstance(value, dict):
+                return [
+                    f"{where or 'configuration'}: expected a mapping, got "
+                    f"{_type_name(value)}"
+                ]
+            errors = []
+            for key, item in value.items():
+                if key in fields and item is not None:
+                    errors += fields[key](item, f"{where}.{key}" if where else key)
+            return errors
+
+        return check
+
+    if isinstance(schema, list):
+        check_item = compile_schema(schema[0]) if schema else lambda value, where: []
+
+        def check(value, where):
+            if not isinstance(value, list):
+                return [f"{where}: expected a list, got {_type_name(value)}"]
+            errors = []
+            for index, item in enumerate(value):
+                if item is not None:
+                    errors += check_item(item, f"{where}[{index}]")
+            return errors
+
+        return check
+
+    if schema in SCHEMA_TYPES:
+        types = SCHEMA_TYPES[schema]
+
+        def check(value, where):
+            # bool is an int to Python, but not to YAML.
+            if isinstance(value, bool) != (bool in types) or not isinstance(
+                value, types
+            ):
+                return [f"{where}: expected {schema}, got {_type_name(value)}"]
+            return []
+
+        return check
+
+    def check(value, where):
+        if value != schema:
+            return [f"{where}: expected {schema!r}, got {value!r}"]
+        return []
+
+    return check
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled_schema(schema_path: str, mtime_ns: int):
+    return compile_schema(_parse(Path(schema_path).read_bytes(), schema_path))
+
+
+def schema_available(schema_path=DEFAULT_SCHEMA_PATH) -> bool:
+    """
+    Whether config-schema.yaml can be read. It lives at the top of the
+    repository, next to config.yaml, so a copy of drydock_runner on its
+    own does not have it; callers fall back to load_config.
+    """
+    return Path(schema_path).is_file()
+
+
+def validate_config_schema(path: str | Path, schema_path=DEFAULT_SCHEMA_PATH) -> dict:
+    """
+    Check the configuration file against config-schema.yaml and return it
+    as parsed, without building (or importing) the pydantic models.
+
+    This only catches values of the wrong type (see compile_schema), not
+    missing settings; load_config does the full validation.
     """
     path = Path(path)
     if not path.exists():
         raise FileNotFoundError(f"Config file not found: {path}")
 
-    with path.open("r") as f:
-        raw = yaml.safe_load(f)
+    schema_path = Path(schema_path)
+    if not schema_available(schema_path):
+        raise FileNotFoundError(f"Config schema not found: {schema_path}")
+
+    check = _compiled_schema(str(schema_path), schema_path.stat().st_mtime_ns)
+    raw = _parse(path.read_bytes(), path)
+
+    errors = check(raw, "")
+    if errors:
+        raise ValueError(f"Invalid Drydock configuration: {'; '.join(errors)}")
+
+    return raw
 
+
+@functools.lru_cache(maxsize=None)
+def _models_fingerprint() -> str:
+    """
+    Identify the models a cached configuration was validated with, so a
+    change to config.py or pydantic invalidates the cache.
+    """
+    import pydantic
+
+    from . import config
+
+    digest = hashlib.sha256(Path(config.__file__).read_bytes())
+    digest.update(pydantic.VERSION.encode())
+    return digest.hexdigest()[:16]
+
+
+def _cache_file(cache_dir: str, key: str) -> str:
+    name = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{name}.json")
+
+
+def _read_cached(model_class, cache_file: str, digest: str):
+    """
+    Rebuild a model from its cache entry, or return None.
+
+    The JSON is validated again rather than trusted: pydantic's JSON
+    validation costs a fraction of parsing the YAML, and it means a
+    cache entry can never produce a model the current classes would
+    reject.
+    """
+    try:
+        with open(cache_file) as f:
+            entry = json.load(f)
+        if entry["sha256"] != digest or entry["models"] != _models_fingerprint():
+            return None
+        return model_class.model_validate_json(entry["config"])
+    except Exception:
+        return None
+
+
+def _write_cached(cache_file: str, digest: str, model) -> None:
+    entry = {
+        "sha256": digest,
+        "models": _models_fingerprint(),
+        "config": model.model_dump_json(),
+    }
+
+    # The cache only saves time, so failing to write it is not an error.
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(cache_file), prefix=".config-"
+        )
+    except OSError:
+        return
+
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, cache_file)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def _validate(model_class, raw):
     try:
-        return BootstrapConfig(**raw)
+        return model_class(**raw)
     except Exception as exc:
         raise ValueError(f"Invalid Drydock configuration: {exc}") from exc
+
+
+def load_config(path: str | Path, cache_dir: str = None, use_cache: bool = True):
+    """
+    Load and validate the Drydock configuration file.
+
+    Validated configurations are cached, serialised as JSON, in cache_dir
+    (by default the "config" directory of Drydock's cache), keyed by the
+    file's SHA256 and the version of the models. A cache hit skips parsing
+    the YAML, and the model is validated from the cached JSON instead.
+    Within a process, a file whose mtime and size have not changed is not
+    even read again, nor validated. Each call returns its own copy of the
+    config.BootstrapConfig.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Config file not found: {path}")
+
+    # Imported here so that validate_config_schema does not need pydantic.
+    from .config import BootstrapConfig
+
+    if not use_cache:
+        return _validate(BootstrapConfig, _parse(path.read_bytes(), path))
+
+    key = str(path.resolve())
+    stat = path.stat()
+    entry = _loaded.get(key)
+
+    if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+        return entry[3].model_copy(deep=True)
+
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+
+    if entry is not None and entry[2] == digest:
+        model = entry[3]
+    else:
+        cache_file = _cache_file(cache_dir or default_cache_dir("config"), key)
+        model = _read_cached(BootstrapConfig, cache_file, digest)
+
+        if model is None:
+            model = _validate(BootstrapConfig, _parse(data, path))
+            _write_cached(cache_file, digest, model)
+
+    _loaded[key] = (stat.st_mtime_ns, stat.st_size, digest, model)
+    return model.model_copy(deep=True)
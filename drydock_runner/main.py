@@ -1,47 +1,104 @@
 #!/usr/bin/env python3
 
 import sys
-import tempfile
 import argparse
+import hashlib
 import ipaddress
-
-
-from drydock_runner.kubectl_runner import real_kubectl_apply
-from drydock_runner.clean import run_cleanup, CleanupError
-from drydock_runner.cluster_build import run_bootstrap
-from drydock_runner.environment import EnvironmentValidationError
-from drydock_runner.orchestration import OrchestrationError
-from drydock_runner.git_runner import clone_repositories
-from drydock_runner.ansible_runner import (
-    real_ansible_playbook,
-    real_ansible_requirements,
-)
-from drydock_runner.loader import load_config
-from pathlib import Path
 import stat
 import os
 
+# Only the standard library is imported up front. Each command imports
+# what it needs when it runs, so `validate` and `discover` (and --help)
+# do not pay for paramiko, the Kubernetes client or the whole bootstrap
+# workflow. benchmarks/startup_benchmark.py keeps them that way.
+
 INDENT = " " * 8
 
+COMMANDS = ("bootstrap", "validate", "discover")
+
+
+def _add_config_argument(parser):
+    parser.add_argument(
+        "--config",
+        default="bootstrap_runner/config.yaml",
+        help="Path to the Drydock configuration file",
+    )
+
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(
         description="Bootstrap the inaugural Kubernetes lab node."
     )
+    commands = parser.add_subparsers(
+        dest="command",
+        metavar="{bootstrap,validate,discover}",
+        help="What to do (default: bootstrap)",
+    )
 
-    parser.add_argument(
+    bootstrap_parser = commands.add_parser(
+        "bootstrap", help="Bootstrap the cluster described by the configuration."
+    )
+    bootstrap_parser.add_argument(
         "--ip",
         type=str,
         help="IP address of the inaugural Ubuntu host. "
         "If omitted, automatic discovery will be attempted.",
     )
-    parser.add_argument(
-        "--config",
-        default="bootstrap_runner/config.yaml",
-        help="Path to the Drydock configuration file",
+    _add_config_argument(bootstrap_parser)
+    bootstrap_parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory for Drydock's persistent caches. "
+        "Defaults to $DRYDOCK_CACHE_DIR, then $XDG_CACHE_HOME/drydock.",
+    )
+    bootstrap_parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Ignore phases completed by earlier runs and bootstrap from scratch.",
+    )
+    bootstrap_parser.add_argument(
+        "--trace-file",
+        default=None,
+        help="Where to write a Chrome trace of the run (chrome://tracing, "
+        "Perfetto). Defaults to a timestamped file under <cache-dir>/traces.",
+    )
+
+    validate_parser = commands.add_parser(
+        "validate", help="Check the configuration file and exit."
+    )
+    _add_config_argument(validate_parser)
+    validate_parser.add_argument(
+        "--schema-only",
+        action="store_true",
+        help="Only check the types of the settings against config-schema.yaml, "
+        "without building the full model. Much faster, but does not notice "
+        "missing settings.",
     )
 
-    return parser.parse_args()
+    discover_parser = commands.add_parser(
+        "discover", help="List the SSH hosts on the network and exit."
+    )
+    _add_config_argument(discover_parser)
+    discover_parser.add_argument(
+        "--cidr",
+        default=None,
+        help="Network to scan. Defaults to the configured network, in which "
+        "case the configuration is loaded.",
+    )
+    discover_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Seconds to keep scanning. Defaults to the configured discovery "
+        "timeout, or 120 with --cidr.",
+    )
+
+    # Without a command, bootstrap, as before there were commands.
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in (*COMMANDS, "-h", "--help"):
+        argv.insert(0, "bootstrap")
+
+    return parser.parse_args(argv)
 
 
 def validate_ip(ip_str):
@@ -52,9 +109,41 @@ def validate_ip(ip_str):
         return False
 
 
-def main():
+def _node_architectures(spec) -> list:
     """
-    Entry point for the Kubernetes lab bootstrap tool.
+    The architectures to stage artifacts for: those configured, else those
+    in the cluster layout, else both that Drydock supports.
+    """
+    if spec.artifactCache.architectures:
+        return spec.artifactCache.architectures
+
+    layout = spec.clusterLayout
+    architectures = set()
+    if layout is not None:
+        for group in (layout.controllers, layout.workers):
+            if group is not None and group.architecture:
+                architectures.add(group.architecture)
+
+    return sorted(architectures) or ["amd64", "arm64"]
+
+
+def _checkpoint_file(cache_dir, cfg, config_path) -> str:
+    """
+    Where to keep the checkpoints of the cluster cfg describes: named after
+    the inaugural node's hostname, else the configuration's metadata.name,
+    else (if that is empty) a hash of the configuration file's path.
+    """
+    name = cfg.spec.inauguralNode.hostname or cfg.metadata.name
+    if not name:
+        path = os.path.abspath(config_path).encode()
+        name = f"config-{hashlib.sha256(path).hexdigest()[:16]}"
+
+    return os.path.join(cache_dir, "checkpoints", f"{name}.json")
+
+
+def bootstrap(args) -> int:
+    """
+    Bootstrap the cluster described by the configuration.
 
     Responsibilities:
       1. Create a temporary working directory.
@@ -63,9 +152,32 @@ def main():
       4. Report success or failure clearly.
       5. Perform cleanup unconditionally.
     """
+    import tempfile
+    import time
+    from pathlib import Path
 
-    args = parse_args()
-    cfg = load_config(args.config)
+    from drydock_runner.kube_client import server_side_apply
+    from drydock_runner.kube_wait import wait_for_cluster_ready
+    from drydock_runner.clean import run_cleanup, CleanupError
+    from drydock_runner.cluster_build import run_bootstrap
+    from drydock_runner.environment import EnvironmentValidationError
+    from drydock_runner.orchestration import OrchestrationError
+    from drydock_runner.git_runner import clone_repositories, RepositoryCache
+    from drydock_runner.ansible_runner import (
+        real_ansible_playbook,
+        real_ansible_requirements,
+    )
+    from drydock_runner.loader import load_config
+    from drydock_runner.artifact_cache import ArtifactCache, write_playbook_vars
+    from drydock_runner.cache import default_cache_dir
+    from drydock_runner.checkpoints import CheckpointStore, fingerprint
+    from drydock_runner import tracing
+    from drydock_runner.ip_discovery import iter_ssh_hosts
+    from drydock_runner.node_assignment import AddressPool
+    from drydock_runner.ssh_control import SSHControlMasters
+
+    cache_dir = args.cache_dir or default_cache_dir()
+    cfg = load_config(args.config, cache_dir=os.path.join(cache_dir, "config"))
 
     static_ip = cfg.spec.network.staticIP.address
     gateway = cfg.spec.network.staticIP.gateway
@@ -81,6 +193,15 @@ def main():
 
     bootstrap_settings = cfg.spec.bootstrapSources
 
+    address_pool = None
+    if cfg.spec.network.addressPool is not None:
+        address_pool = AddressPool(
+            cidr,
+            start=cfg.spec.network.addressPool.start,
+            end=cfg.spec.network.addressPool.end,
+            reserved=[gateway, *nameservers],
+        )
+
     if args.ip:
         if not validate_ip(args.ip):
             raise ValueError(f"Invalid IP address: {args.ip}")
@@ -89,6 +210,17 @@ def main():
     else:
         print("[INFO] No IP provided. Beginning automatic discovery...")
 
+    repository_cache = RepositoryCache(cache_dir=os.path.join(cache_dir, "git"))
+
+    checkpoints = CheckpointStore(_checkpoint_file(cache_dir, cfg, args.config))
+    if args.fresh:
+        checkpoints.invalidate()
+
+    trace_file = args.trace_file or os.path.join(
+        cache_dir, "traces", time.strftime("bootstrap-%Y%m%d-%H%M%S.json")
+    )
+    tracer = tracing.start_tracing()
+
     tmp_dir = tempfile.mkdtemp(prefix="k8s-lab-bootstrap-")
     print(f"[INFO] Working directory created at: {tmp_dir}")
     print("[INFO] Starting cluster bootstrap process...")
@@ -100,6 +232,36 @@ def main():
     argocd_manifest_path = (config_repo_path / config_paths.argocdManifest).as_posix()
     argocd_values_path = (config_repo_path / config_paths.argocdValues).as_posix()
 
+    control_masters = SSHControlMasters(
+        os.path.join(tmp_dir, "ssh"),
+        ssh_user=inaugural_node.sshUser,
+        ssh_password=inaugural_node.sshPassword,
+    )
+
+    playbook_args = {
+        "kubeadm_config_src": kubeadm_config_path,
+        "argocd_manifest": argocd_manifest_path,
+        "argocd_values": argocd_values_path,
+        "fact_cache_dir": os.path.join(cache_dir, "facts", hostname or "default"),
+        "control_masters": control_masters,
+    }
+
+    artifact_func = None
+    artifact_settings = cfg.spec.artifactCache
+    if artifact_settings.enabled:
+        artifact_cache = ArtifactCache(cache_dir=os.path.join(cache_dir, "artifacts"))
+        artifact_vars_path = os.path.join(tmp_dir, "artifacts.yaml")
+        playbook_args["extra_vars_file"] = artifact_vars_path
+
+        def artifact_func():
+            playbook_vars = artifact_cache.prepare(
+                architectures=_node_architectures(cfg.spec),
+                repository=artifact_settings.aptRepository,
+                packages=artifact_settings.packages,
+                images=artifact_settings.images,
+            )
+            return write_playbook_vars(playbook_vars, artifact_vars_path)
+
     try:
         result = run_bootstrap(
             static_ip=static_ip,
@@ -109,26 +271,45 @@ def main():
             hostname=hostname,
             tmp_dir=tmp_dir,
             ansible_playbook_func=lambda ip: real_ansible_playbook(
-                ip_address=ip,
-                kubeadm_config_src=kubeadm_config_path,
-                argocd_manifest=argocd_manifest_path,
-                argocd_values=argocd_values_path,
+                ip_address=ip, hostname=hostname, **playbook_args
+            ),
+            ansible_cluster_playbook_func=lambda nodes: real_ansible_playbook(
+                nodes=nodes, **playbook_args
             ),
             ansible_install_func=lambda: real_ansible_requirements(
-                requirements_path="bootstrap_node_config/requirements.yml"
+                requirements_path="bootstrap_node_config/requirements.yml",
+                cache_dir=os.path.join(cache_dir, "galaxy"),
             ),
             clone_func=lambda: clone_repositories(
                 repos=bootstrap_settings.repositories,
                 base_dir=tmp_dir,
+                cache=repository_cache,
             ),
-            kubectl_apply_func=real_kubectl_apply,
+            kubectl_apply_func=server_side_apply,
+            readiness_func=wait_for_cluster_ready,
+            artifact_func=artifact_func,
+            control_masters=control_masters,
             node_ip_address=args.ip,
+            ssh_user=inaugural_node.sshUser,
+            ssh_password=inaugural_node.sshPassword,
+            cluster_layout=cfg.spec.clusterLayout,
+            node_discovery_func=lambda cidr, stop=None: iter_ssh_hosts(
+                cidr,
+                total_timeout=discovery_settings.timeoutSeconds,
+                quiet_timeout=discovery_settings.quietSeconds,
+                stop=stop,
+            ),
+            address_pool=address_pool,
+            checkpoints=checkpoints,
+            config_fingerprint=fingerprint(Path(args.config).read_text()),
         )
 
         if result.success:
             print("[SUCCESS] Cluster bootstrapped successfully.")
             if result.machine_ip:
                 print(f"[INFO] Node IP address: {result.machine_ip}")
+            for name, seconds in (result.readiness or {}).items():
+                print(f"[INFO] {name} ready after {seconds:.1f}s")
             return 0
 
         print("[ERROR] Cluster bootstrap failed.")
@@ -148,12 +329,104 @@ def main():
 
     finally:
         try:
-            run_cleanup(tmp_dir)
+            run_cleanup(tmp_dir, control_masters=control_masters)
             print("[INFO] Temporary directory cleaned.")
         except CleanupError as exc:
             print("[ERROR] Cleanup failed:")
             print(f"{INDENT}{str(exc)}")
 
+        tracing.stop_tracing()
+        print(tracer.format_summary())
+        try:
+            tracer.write_chrome_trace(trace_file)
+            print(f"[INFO] Trace written to {trace_file}")
+        except OSError as exc:
+            print(f"[WARN] Could not write trace file: {exc}")
+
+
+def validate(args) -> int:
+    """
+    Load and validate the configuration, reporting what is wrong with it.
+    """
+    from drydock_runner.loader import (
+        DEFAULT_SCHEMA_PATH,
+        load_config,
+        schema_available,
+        validate_config_schema,
+    )
+
+    schema_only = args.schema_only
+    if schema_only and not schema_available():
+        print(
+            f"[WARN] {DEFAULT_SCHEMA_PATH} not found; "
+            "validating against the full configuration models instead."
+        )
+        schema_only = False
+
+    try:
+        if schema_only:
+            validate_config_schema(args.config)
+        else:
+            load_config(args.config)
+    except (FileNotFoundError, ValueError) as exc:
+        print("[ERROR] Configuration is invalid:")
+        print(f"{INDENT}{str(exc)}")
+        return 2
+
+    if os.stat(args.config).st_mode & stat.S_IWOTH:
+        print("[ERROR] Configuration is invalid:")
+        print(f"{INDENT}Config file must not be world-writable.")
+        return 2
+
+    print(f"[INFO] {args.config} is valid.")
+    return 0
+
+
+def discover(args) -> int:
+    """
+    Print each SSH host on the network as it is found, until the timeout.
+    """
+    from drydock_runner.ip_discovery import iter_ssh_hosts
+
+    cidr, timeout = args.cidr, args.timeout
+
+    if cidr is None:
+        from drydock_runner.loader import load_config
+
+        cfg = load_config(args.config)
+        cidr = cfg.spec.network.cidr
+        if timeout is None:
+            timeout = cfg.spec.discovery.timeoutSeconds
+
+    if timeout is None:
+        timeout = 120
+
+    print(f"[INFO] Scanning {cidr} for SSH hosts for {timeout:g}s...")
+    found = 0
+
+    hosts = iter_ssh_hosts(cidr, total_timeout=timeout)
+    try:
+        for host in hosts:
+            found += 1
+            print(f"{host.ip}{INDENT}{host.banner}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        hosts.close()
+
+    print(f"[INFO] Found {found} SSH host(s).")
+    return 0
+
+
+def main(argv=None):
+    """
+    Entry point for the Kubernetes lab bootstrap tool.
+    """
+    args = parse_args(argv)
+    command = {"bootstrap": bootstrap, "validate": validate, "discover": discover}
+
+    return command[args.command](args)
+
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,274 @@
+import ipaddress
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+
+class AddressPoolExhaustedError(Exception):
+    pass
+
+
+CONTROLLER = "controller"
+WORKER = "worker"
+
+
+class AddressPool:
+    """
+    Hands out static addresses from start to end (inclusive) on cidr,
+    skipping any reserved addresses such as the gateway and nameservers.
+
+    The pool must lie outside the DHCP range: an address leased to a host
+    drydock never discovered cannot be told apart from a free one. Hosts
+    that are discovered are reserved (see assign_cluster_nodes).
+
+    Allocation is thread-safe.
+    """
+
+    def __init__(self, cidr, start, end=None, reserved=()):
+        network = ipaddress.ip_network(cidr, strict=False)
+        start = ipaddress.ip_address(start)
+
+        if end is None:
+            end = network.broadcast_address - 1
+        else:
+            end = ipaddress.ip_address(end)
+
+        if start not in network or end not in network or end < start:
+            raise ValueError(f"Address pool {start}-{end} is not within {cidr}")
+
+        self._start = start
+        self._next = start
+        self._end = end
+        self._reserved = {ipaddress.ip_address(ip) for ip in reserved}
+        self._lock = threading.Lock()
+
+    def __contains__(self, ip) -> bool:
+        return self._start <= ipaddress.ip_address(ip) <= self._end
+
+    def reserve(self, ip) -> None:
+        """
+        Never hand out ip, because something else is using it.
+        """
+        with self._lock:
+            self._reserved.add(ipaddress.ip_address(ip))
+
+    def allocate(self) -> str:
+        with self._lock:
+            while self._next <= self._end:
+                candidate = self._next
+                self._next += 1
+
+                if candidate not in self._reserved:
+                    return str(candidate)
+
+        raise AddressPoolExhaustedError(f"No addresses left in pool up to {self._end}")
+
+
+@dataclass
+class NodeAssignment:
+    dhcp_ip: str
+    static_ip: str
+    role: str
+    success: bool
+    error_message: str = None
+    hostname: str = None
+
+
+class _Roles:
+    """
+    The places left in a cluster layout, with the first controller's kept
+    for the inaugural node if its hostname is known.
+    """
+
+    def __init__(self, layout, inaugural_hostname=None):
+        self.inaugural_hostname = inaugural_hostname
+        self.controllers = layout.controllers.count - (1 if inaugural_hostname else 0)
+        self.workers = 0
+        if layout.workers is not None:
+            self.workers = layout.workers.maxCount
+
+    def take(self, hostname):
+        """
+        Return the role for the node called hostname, or None if the layout
+        has no place left for it.
+        """
+        if self.inaugural_hostname and hostname == self.inaugural_hostname:
+            self.inaugural_hostname = None
+            return CONTROLLER
+
+        if self.controllers > 0:
+            self.controllers -= 1
+            return CONTROLLER
+
+        if self.workers is None or self.workers > 0:
+            if self.workers is not None:
+                self.workers -= 1
+            return WORKER
+
+        return None
+
+    def filled(self) -> bool:
+        return (
+            self.inaugural_hostname is None
+            and self.controllers == 0
+            and self.workers == 0
+        )
+
+
+def assign_cluster_nodes(
+    hosts,
+    layout,
+    pool: AddressPool,
+    assigner_factory,
+    gateway: str,
+    nameservers: list,
+    mask: int,
+    inaugural_hostname: str = None,
+    max_workers: int = 6,
+    stop: threading.Event = None,
+):
+    """
+    Assign static IPs to discovered hosts concurrently.
+
+    hosts may be any iterable of DHCP addresses, including the live
+    generator from ip_discovery.iter_ssh_hosts: each host is handed to the
+    thread pool as soon as it arrives, while discovery keeps going. Each
+    address is only handed over once, and addresses already handed out
+    are skipped, so a node found again at its new static IP is left alone.
+    Pool addresses held by discovered hosts are reserved.
+
+    On the pool, each host is identified by its hostname, so a node that
+    shows up again on a second interface is not taken for a new one. The
+    role and static IP are then decided under a lock: controllers first
+    ("first-available"), then workers ("assign-remaining"), in the order
+    hosts are identified. A host that is slow to answer does not hold up
+    the others. If inaugural_hostname is given, that host is checked to
+    be the one configured, made a controller whenever it arrives, and
+    returned first; the other hosts fill the remaining places.
+
+    stop is set once the layout is full or the pool runs out; pass the
+    same event to iter_ssh_hosts so that discovery ends there and then.
+    Workers without a maxCount take every host found until hosts ends.
+
+    A failure on one host does not affect the others; it is recorded in
+    that host's NodeAssignment.
+
+    assigner_factory is called once per host and must return an object
+    with StaticIPAssigner-compatible hostname() and assign() methods.
+    """
+    if stop is None:
+        stop = threading.Event()
+
+    roles = _Roles(layout, inaugural_hostname)
+    lock = threading.Lock()
+    seen = set()
+    assigned = set()
+    hostnames = set()
+
+    def claim(dhcp_ip, hostname):
+        # Called with lock held. Returns (static IP, role), or None.
+        if stop.is_set():
+            print(f"[INFO] Skipping {dhcp_ip}: assignment has finished")
+            return None
+
+        if hostname in hostnames:
+            print(f"[INFO] Skipping {dhcp_ip}: {hostname} is already assigned")
+            return None
+
+        role = roles.take(hostname)
+        if role is None:
+            print(f"[INFO] Skipping {dhcp_ip}: the cluster layout is full")
+            return None
+
+        try:
+            static_ip = pool.allocate()
+        except AddressPoolExhaustedError as exc:
+            print(f"[WARN] Not assigning {dhcp_ip}: {exc}")
+            stop.set()
+            return None
+
+        hostnames.add(hostname)
+        assigned.add(static_ip)
+        if roles.filled():
+            stop.set()
+
+        return static_ip, role
+
+    def assign_one(dhcp_ip):
+        assigner = assigner_factory()
+
+        try:
+            hostname = assigner.hostname(dhcp_ip)
+        except Exception as exc:
+            return NodeAssignment(
+                dhcp_ip=dhcp_ip,
+                static_ip=None,
+                role=None,
+                success=False,
+                error_message=str(exc),
+            )
+
+        with lock:
+            claimed = claim(dhcp_ip, hostname)
+
+        if claimed is None:
+            return None
+
+        static_ip, role = claimed
+        print(f"[INFO] Assigning static IP {static_ip} to {role} at {dhcp_ip}")
+
+        try:
+            assigner.assign(
+                dhcp_ip=dhcp_ip,
+                static_ip=static_ip,
+                gateway=gateway,
+                nameservers=nameservers,
+                hostname=hostname if hostname == inaugural_hostname else None,
+                mask=mask,
+            )
+        except Exception as exc:
+            return NodeAssignment(
+                dhcp_ip=dhcp_ip,
+                static_ip=static_ip,
+                role=role,
+                success=False,
+                error_message=str(exc),
+                hostname=hostname,
+            )
+
+        return NodeAssignment(
+            dhcp_ip=dhcp_ip,
+            static_ip=static_ip,
+            role=role,
+            success=True,
+            hostname=hostname,
+        )
+
+    futures = []
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="drydock-assign"
+    ) as executor:
+        for dhcp_ip in hosts:
+            if stop.is_set():
+                break
+
+            with lock:
+                if dhcp_ip in seen or dhcp_ip in assigned:
+                    continue
+                seen.add(dhcp_ip)
+
+            if dhcp_ip in pool:
+                pool.reserve(dhcp_ip)
+
+            futures.append(executor.submit(assign_one, dhcp_ip))
+
+    results = [future.result() for future in futures]
+    results = [result for result in results if result is not None]
+
+    # The inaugural node goes first, where build_inventory and run_bootstrap
+    # look for it.
+    results.sort(
+        key=lambda a: not (inaugural_hostname and a.hostname == inaugural_hostname)
+    )
+    return results
@@ -12,26 +12,98 @@ class OrchestrationResult:
         machine_ip: str = None,
         error_message: str = None,
         ip_prompted: bool = False,
+        ansible_report=None,
+        readiness=None,
     ):
         self.success = success
         self.machine_ip = machine_ip
         self.error_message = error_message
         self.ip_prompted = ip_prompted
+        self.ansible_report = ansible_report
+        self.readiness = readiness
 
 
 def run_orchestration(node_ip_address: str, ansible_func):
+    """
+    Run ansible_func against node_ip_address.
+
+    If ansible_func returns an ansible_events.PlaybookReport (or raises an
+    error carrying one as .report), it is kept on the result. A failure
+    with a report already says which tasks failed, so the traceback is
+    only included for unexpected errors.
+    """
     try:
-        ansible_func(node_ip_address)
+        report = ansible_func(node_ip_address)
     except Exception as exc:
-        tb = traceback.format_exc()
+        report = getattr(exc, "report", None)
+        error_message = f"Ansible execution failed: {exc}"
+        if report is None:
+            error_message += f"\n{traceback.format_exc()}"
+
         return OrchestrationResult(
             success=False,
             machine_ip=node_ip_address,
-            error_message=f"Ansible execution failed: {exc}\n{tb}",
+            error_message=error_message,
+            ansible_report=report,
         )
 
     return OrchestrationResult(
         success=True,
         machine_ip=node_ip_address,
         ip_prompted=True,
+        ansible_report=report,
     )
+
+
+def run_cluster_orchestration(nodes: list, ansible_func) -> dict:
+    """
+    Run ansible_func once against every node in nodes (node assignments
+    with a static_ip), so a single ansible-playbook run provisions the
+    whole cluster.
+
+    Returns an OrchestrationResult per static IP, split out of the
+    PlaybookReport: a node fails if any of its tasks failed or it was
+    unreachable. If the run fails without a report, every node fails.
+    """
+    try:
+        report = ansible_func(nodes)
+        run_error = None
+    except Exception as exc:
+        report = getattr(exc, "report", None)
+        run_error = f"Ansible execution failed: {exc}"
+        if report is None:
+            run_error += f"\n{traceback.format_exc()}"
+
+    results = {}
+
+    for node in nodes:
+        ip = node.static_ip
+        failures = []
+        stats = {}
+
+        if report is not None:
+            failures = [
+                f"'{r.task}': {r.msg}" for r in report.failures() if r.host == ip
+            ]
+            stats = report.host_stats.get(ip, {})
+
+        if report is None:
+            error_message = run_error
+        elif failures:
+            error_message = "Ansible execution failed: " + "; ".join(failures)
+        elif stats.get("failures") or stats.get("unreachable"):
+            error_message = "Ansible execution failed on this host"
+        elif run_error is not None and not stats:
+            error_message = run_error
+        else:
+            error_message = None
+
+        results[ip] = OrchestrationResult(
+            success=error_message is None,
+            machine_ip=ip,
+            error_message=error_message,
+            ip_prompted=error_message is None,
+            ansible_report=report,
+        )
+
+    return results
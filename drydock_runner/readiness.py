@@ -0,0 +1,73 @@
+import socket
+import time
+
+from drydock_runner.ssh_probe import SSH_PORT, ProbeOutcome, classify_banner
+
+
+class ReadinessTimeoutError(Exception):
+    pass
+
+
+def probe_ssh_banner(host, port=SSH_PORT, timeout=1.0):
+    """
+    Cheap readiness check: TCP connect to host:port and read the banner,
+    without any key exchange.
+
+    Returns a (ProbeOutcome, banner) tuple, classified the same way as the
+    discovery scanner.
+    """
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as s:
+            raw = s.recv(1024)
+    except (ConnectionRefusedError, ConnectionResetError):
+        return ProbeOutcome.REFUSED, None
+    except OSError:
+        return ProbeOutcome.SILENT, None
+
+    return classify_banner(raw)
+
+
+def wait_for_ssh_banner(
+    host,
+    port=SSH_PORT,
+    timeout=300,
+    initial_interval=0.2,
+    max_interval=2.0,
+    probe_timeout=1.0,
+    probe_func=probe_ssh_banner,
+):
+    """
+    Wait until host presents an SSH banner on port, or raise
+    ReadinessTimeoutError after timeout seconds.
+
+    The polling interval starts at initial_interval and grows by half each
+    time the host stays silent, up to max_interval. A refused connection
+    means the host is up and sshd is starting, so the interval drops back
+    to initial_interval.
+
+    probe_func is dependency-injected so tests can script the outcomes.
+
+    Returns the banner.
+    """
+    deadline = time.time() + timeout
+    interval = initial_interval
+
+    while True:
+        outcome, banner = probe_func(host, port=port, timeout=probe_timeout)
+
+        if outcome == ProbeOutcome.SSH:
+            return banner
+
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise ReadinessTimeoutError(
+                f"Host {host} did not present an SSH banner on port {port} "
+                f"within {timeout} seconds."
+            )
+
+        if outcome == ProbeOutcome.REFUSED:
+            interval = initial_interval
+        else:
+            interval = min(interval * 1.5, max_interval)
+
+        time.sleep(min(interval, remaining))
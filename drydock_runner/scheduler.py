@@ -0,0 +1,111 @@
+import inspect
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from drydock_runner import tracing
+
+
+class PhaseGraphError(Exception):
+    pass
+
+
+class PhaseScheduler:
+    """
+    Runs the phases of a workflow as a dependency graph.
+
+    Each phase is a callable added with the names of the phases it depends
+    on. A phase starts as soon as all of its dependencies have finished,
+    so independent phases overlap and the total time is that of the
+    critical path. A phase receives the results of its dependencies as
+    keyword arguments, for any parameters named after them.
+
+    Each phase is recorded as a tracing span.
+
+    If a phase raises, no further phases are started, the running ones are
+    waited for, and the first exception is re-raised unchanged.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self._phases = {}
+
+    def add(self, name: str, func, depends_on=()) -> None:
+        if name in self._phases:
+            raise PhaseGraphError(f"Phase '{name}' is already defined")
+
+        self._phases[name] = (func, tuple(depends_on))
+
+    def order(self) -> list[str]:
+        """
+        Return the phases in a valid sequential order, checking that every
+        dependency exists and that there are no cycles.
+        """
+        ordered = []
+        visiting = set()
+
+        def visit(name, path):
+            if name in ordered:
+                return
+            if name not in self._phases:
+                raise PhaseGraphError(
+                    f"Phase '{path[-1]}' depends on unknown phase '{name}'"
+                )
+            if name in visiting:
+                cycle = " -> ".join([*path, name])
+                raise PhaseGraphError(f"Phase dependency cycle: {cycle}")
+
+            visiting.add(name)
+            for dependency in self._phases[name][1]:
+                visit(dependency, [*path, name])
+            visiting.discard(name)
+            ordered.append(name)
+
+        for name in self._phases:
+            visit(name, [])
+
+        return ordered
+
+    def _call(self, name, results):
+        func, depends_on = self._phases[name]
+        parameters = inspect.signature(func).parameters
+        kwargs = {dep: results[dep] for dep in depends_on if dep in parameters}
+
+        with tracing.span(name, tracing.PHASE):
+            return func(**kwargs)
+
+    def run(self) -> dict:
+        """
+        Run every phase and return a mapping of phase name to result.
+        """
+        pending = self.order()
+        results = {}
+        running = {}
+        error = None
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="drydock-phase"
+        ) as executor:
+            while pending or running:
+                if error is None:
+                    for name in list(pending):
+                        if all(dep in results for dep in self._phases[name][1]):
+                            pending.remove(name)
+                            future = executor.submit(self._call, name, results)
+                            running[future] = name
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except BaseException as exc:
+                        if error is None:
+                            error = exc
+
+        if error is not None:
+            raise error
+
+        return results
@@ -0,0 +1,251 @@
+import contextlib
+import os
+import shlex
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from drydock_runner import tracing
+
+
+class SSHControlError(Exception):
+    pass
+
+
+# How long an idle master outlives its last client. Only a safety net if
+# drydock dies without cleaning up; run_cleanup closes the masters itself.
+CONTROL_PERSIST = "30m"
+
+# One socket per user, host and port. Kept short because a unix socket
+# path is limited to about 100 bytes.
+CONTROL_SOCKET = "%r@%h:%p"
+
+
+class SSHControlMasters:
+    """
+    OpenSSH control masters for the nodes of one bootstrap run, so that
+    ansible-playbook and ssh share one authenticated connection per
+    node instead of each paying for its own handshake.
+
+    The sockets live in control_dir, which is private to the run (main
+    puts it in the temporary working directory). Masters persist until
+    close() is called, which clean.run_cleanup does at the end of the run.
+
+    Without ssh_password, the masters are opened with key authentication;
+    with it, through sshpass.
+    """
+
+    def __init__(
+        self,
+        control_dir: str,
+        ssh_user: str = "ubuntu",
+        ssh_password: str = None,
+        port: int = 22,
+        connect_timeout: int = 10,
+        max_workers: int = 8,
+    ):
+        self.control_dir = control_dir
+        self.ssh_user = ssh_user
+        self.ssh_password = ssh_password
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.max_workers = max_workers
+
+    @property
+    def control_path(self) -> str:
+        return os.path.join(self.control_dir, CONTROL_SOCKET)
+
+    def socket_path(self, host: str) -> str:
+        return os.path.join(self.control_dir, f"{self.ssh_user}@{host}:{self.port}")
+
+    def ssh_options(self) -> list:
+        """
+        OpenSSH options that make ssh go through the run's masters,
+        or start one at the same path if a master is not running.
+        """
+        return [
+            "-o",
+            "ControlMaster=auto",
+            "-o",
+            f"ControlPath={self.control_path}",
+            "-o",
+            f"ControlPersist={CONTROL_PERSIST}",
+            "-o",
+            "StrictHostKeyChecking=no",
+        ]
+
+    def ansible_env(self) -> dict:
+        """
+        Environment for ansible-playbook. ANSIBLE_SSH_ARGS replaces the
+        ssh_args in ansible.cfg, and as it names a ControlPath Ansible
+        does not add its own.
+        """
+        return {"ANSIBLE_SSH_ARGS": shlex.join(self.ssh_options())}
+
+    def command(self, host: str, *command) -> list:
+        """
+        An ssh command line that runs command on host over its master.
+        """
+        return [
+            "ssh",
+            *self.ssh_options(),
+            "-p",
+            str(self.port),
+            f"{self.ssh_user}@{host}",
+            *command,
+        ]
+
+    def _control(self, operation: str, host: str, port=None):
+        return tracing.run(
+            [
+                "ssh",
+                "-O",
+                operation,
+                "-o",
+                f"ControlPath={self.control_path}",
+                "-p",
+                str(port or self.port),
+                f"{self.ssh_user}@{host}",
+            ],
+            span_name=f"ssh -O {operation}",
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+
+    def is_open(self, host: str) -> bool:
+        if not os.path.exists(self.socket_path(host)):
+            return False
+        try:
+            return self._control("check", host).returncode == 0
+        except OSError:
+            return False
+
+    def open(self, host: str) -> None:
+        """
+        Start a master for host, unless one is already running.
+        """
+        if self.is_open(host):
+            return
+
+        # A socket left by a master that has died would stop a new one
+        # from listening.
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.socket_path(host))
+
+        os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+
+        command = [
+            "ssh",
+            "-o",
+            "ControlMaster=yes",
+            "-o",
+            f"ControlPath={self.control_path}",
+            "-o",
+            f"ControlPersist={CONTROL_PERSIST}",
+            "-o",
+            "StrictHostKeyChecking=no",
+            "-o",
+            f"ConnectTimeout={self.connect_timeout}",
+            "-o",
+            "ServerAliveInterval=30",
+            "-N",
+            "-f",
+            "-p",
+            str(self.port),
+            f"{self.ssh_user}@{host}",
+        ]
+        env = None
+
+        if self.ssh_password is None:
+            command[1:1] = ["-o", "BatchMode=yes"]
+        else:
+            command = ["sshpass", "-e", *command]
+            env = {**os.environ, "SSHPASS": self.ssh_password}
+
+        # The backgrounded master may keep stderr open, so it goes to a
+        # file rather than a pipe that would never reach EOF.
+        with tempfile.TemporaryFile("w+") as errors:
+            try:
+                with tracing.span("ssh control master", tracing.SSH, host=host):
+                    result = subprocess.run(
+                        command,
+                        stdin=subprocess.DEVNULL,
+                        stdout=subprocess.DEVNULL,
+                        stderr=errors,
+                        env=env,
+                        timeout=self.connect_timeout * 3,
+                    )
+            except (OSError, subprocess.TimeoutExpired) as exc:
+                raise SSHControlError(
+                    f"Could not open an SSH control master for {host}: {exc}"
+                ) from exc
+
+            errors.seek(0)
+            message = errors.read().strip()
+
+        if result.returncode != 0:
+            raise SSHControlError(
+                f"Could not open an SSH control master for {host}: "
+                f"{message or f'ssh exited with status {result.returncode}'}"
+            )
+
+    def open_all(self, hosts) -> dict:
+        """
+        Open a master for each of hosts at the same time. Returns
+        {host: error message} for the hosts that could not be reached;
+        their ssh steps will simply make their own connections.
+        """
+        hosts = list(dict.fromkeys(hosts))
+        if not hosts:
+            return {}
+
+        def open_one(host):
+            try:
+                self.open(host)
+            except SSHControlError as exc:
+                return str(exc)
+            return None
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(hosts)),
+            thread_name_prefix="drydock-ssh-master",
+        ) as executor:
+            errors = dict(zip(hosts, executor.map(open_one, hosts)))
+
+        return {host: error for host, error in errors.items() if error}
+
+    def close(self) -> list:
+        """
+        Stop every master with a socket in control_dir, including any
+        ansible-playbook started. Returns the hosts closed.
+        """
+        try:
+            sockets = sorted(os.listdir(self.control_dir))
+        except FileNotFoundError:
+            return []
+
+        closed = []
+        for name in sockets:
+            user, _, address = name.partition("@")
+            host, _, port = address.rpartition(":")
+            if user != self.ssh_user or not host:
+                continue
+
+            try:
+                result = self._control("exit", host, port=port)
+            except OSError as exc:
+                print(
+                    f"[WARN] Could not close the SSH control master for {host}: {exc}"
+                )
+                continue
+
+            if result.returncode == 0:
+                closed.append(host)
+            else:
+                print(
+                    f"[WARN] Could not close the SSH control master for {host}: "
+                    f"{result.stderr.strip()}"
+                )
+
+        return closed
@@ -0,0 +1,30 @@
+from enum import Enum
+
+SSH_PORT = 22
+
+
+class ProbeOutcome(Enum):
+    """
+    What a single probe of port 22 on one address found.
+    """
+
+    REFUSED = "refused"  # host is up, nothing is listening (yet)
+    SILENT = "silent"  # no answer at all, probably no host at this address
+    NON_SSH = "non-ssh"  # something answered, but it is not an SSH server
+    SSH = "ssh"
+
+
+def classify_banner(raw: bytes):
+    """
+    Classify what an open port sent first. Returns a (ProbeOutcome,
+    banner) tuple; a connection closed without a word counts as refused.
+    """
+    if not raw:
+        return ProbeOutcome.REFUSED, None
+
+    banner = raw.decode(errors="ignore")
+
+    if "ssh" in banner.lower():
+        return ProbeOutcome.SSH, banner
+
+    return ProbeOutcome.NON_SSH, banner
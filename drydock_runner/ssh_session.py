@@ -0,0 +1,177 @@
+import threading
+
+from drydock_runner import tracing
+
+
+class SSHSessionError(Exception):
+    pass
+
+
+class SSHConnectionManager:
+    """
+    Keeps one authenticated SSH transport open per host for the whole
+    bootstrap run, and hands out exec, SFTP and raw channels on it.
+
+    Every step that talks to a node over SSH should go through the same
+    manager, so each node pays for exactly one key exchange.
+
+    Safe to share between threads; each host has its own transport.
+    """
+
+    def __init__(
+        self,
+        ssh_user,
+        ssh_password=None,
+        ssh_key_path=None,
+        port=22,
+        connect_timeout=10,
+        keepalive_interval=30,
+    ):
+        self.ssh_user = ssh_user
+        self.ssh_password = ssh_password
+        self.ssh_key_path = ssh_key_path
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.keepalive_interval = keepalive_interval
+        self._clients = {}
+        self._sftp = {}
+        self._connecting = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _open(self, host):
+        # paramiko (and its crypto backends) is slow to import, and only
+        # needed once a node is actually connected to.
+        import paramiko
+
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+
+        connect_args = {
+            "hostname": host,
+            "port": self.port,
+            "username": self.ssh_user,
+            "timeout": self.connect_timeout,
+        }
+
+        if self.ssh_key_path:
+            connect_args["pkey"] = paramiko.RSAKey.from_private_key_file(
+                self.ssh_key_path
+            )
+        else:
+            connect_args["password"] = self.ssh_password
+
+        try:
+            with tracing.span("ssh connect", tracing.SSH, host=host):
+                client.connect(**connect_args)
+        except Exception as exc:
+            client.close()
+            raise SSHSessionError(f"SSH connection to {host} failed: {exc}") from exc
+
+        # Keep the session alive across long idle steps such as the playbook.
+        client.get_transport().set_keepalive(self.keepalive_interval)
+
+        return client
+
+    def get(self, host):
+        """
+        Return the open client for host, or None if there is not one.
+        """
+        with self._lock:
+            client = self._clients.get(host)
+
+        if client is None:
+            return None
+
+        transport = client.get_transport()
+        if transport is None or not transport.is_active():
+            self.close(host)
+            return None
+
+        return client
+
+    def connect(self, host):
+        """
+        Return an authenticated client for host, reusing the open transport
+        if there is one.
+        """
+        client = self.get(host)
+        if client is not None:
+            return client
+
+        # Callers racing to connect to the same host wait for one
+        # connection rather than each opening their own.
+        with self._lock:
+            connecting = self._connecting.setdefault(host, threading.Lock())
+
+        with connecting:
+            client = self.get(host)
+            if client is not None:
+                return client
+
+            client = self._open(host)
+
+            with self._lock:
+                self._clients[host] = client
+
+        return client
+
+    def exec(self, host, command):
+        """
+        Run command on host and wait for it to finish.
+
+        Returns (exit_status, stdout, stderr).
+        """
+        client = self.connect(host)
+
+        with tracing.span("ssh exec", tracing.SSH, host=host, command=command):
+            _, stdout, stderr = client.exec_command(command)
+            output = stdout.read().decode(errors="replace")
+            errors = stderr.read().decode(errors="replace")
+
+            return stdout.channel.recv_exit_status(), output, errors
+
+    def sftp(self, host):
+        """
+        Return an SFTP client on host's transport, opening one if needed.
+        """
+        client = self.connect(host)
+
+        with self._lock:
+            sftp = self._sftp.get(host)
+
+        if sftp is None or sftp.get_channel().closed:
+            with tracing.span("sftp open", tracing.SSH, host=host):
+                sftp = client.open_sftp()
+            with self._lock:
+                self._sftp[host] = sftp
+
+        return sftp
+
+    def open_channel(self, host):
+        """
+        Open a new session channel on host's transport.
+        """
+        return self.connect(host).get_transport().open_session()
+
+    def close(self, host=None):
+        """
+        Close the session to host, or every session if host is None.
+        """
+        with self._lock:
+            hosts = list(self._clients) if host is None else [host]
+            clients = [self._clients.pop(h, None) for h in hosts]
+            sftps = [self._sftp.pop(h, None) for h in hosts]
+
+        for sftp in sftps:
+            if sftp is not None:
+                sftp.close()
+
+        for client in clients:
+            if client is not None:
+                client.close()
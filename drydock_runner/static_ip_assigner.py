@@ -1,5 +1,8 @@
 import time
-import paramiko
+
+from drydock_runner import tracing
+from drydock_runner.readiness import ReadinessTimeoutError, wait_for_ssh_banner
+from drydock_runner.ssh_session import SSHConnectionManager, SSHSessionError
 
 
 class StaticIPAssignmentError(Exception):
@@ -7,49 +10,90 @@ class StaticIPAssignmentError(Exception):
 
 
 class StaticIPAssigner:
-    def __init__(self, ssh_user, ssh_password=None, ssh_key_path=None, timeout=300):
+    def __init__(
+        self,
+        ssh_user,
+        ssh_password=None,
+        ssh_key_path=None,
+        timeout=300,
+        port=22,
+        connection_manager=None,
+    ):
         self.ssh_user = ssh_user
         self.ssh_password = ssh_password
         self.ssh_key_path = ssh_key_path
         self.timeout = timeout
+        self.port = port
+
+        if connection_manager is None:
+            connection_manager = SSHConnectionManager(
+                ssh_user=ssh_user,
+                ssh_password=ssh_password,
+                ssh_key_path=ssh_key_path,
+                port=port,
+            )
 
-    def _connect(self, host):
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self.connections = connection_manager
+        # Hostnames already looked up, by address, so assign() need not
+        # ask again.
+        self._hostnames = {}
 
+    def _connect(self, host):
         try:
-            if self.ssh_key_path:
-                key = paramiko.RSAKey.from_private_key_file(self.ssh_key_path)
-                client.connect(
-                    hostname=host,
-                    username=self.ssh_user,
-                    pkey=key,
-                    timeout=10,
-                )
-            else:
-                client.connect(
-                    hostname=host,
-                    username=self.ssh_user,
-                    password=self.ssh_password,
-                    timeout=10,
-                )
-        except Exception as exc:
-            raise StaticIPAssignmentError(f"SSH connection to {host} failed: {exc}")
-
-        return client
-
-    def _wait_for_ssh(self, host, delay=5):
+            return self.connections.connect(host)
+        except SSHSessionError as exc:
+            raise StaticIPAssignmentError(str(exc)) from exc
+
+    def _wait_for_ssh(self, host, delay=0.5):
+        """
+        Wait for host to come back on SSH and leave one authenticated
+        session open to it in the connection manager, for later steps.
+
+        Readiness is first established with a cheap TCP connect and banner
+        read. A full SSH handshake is only attempted once sshd answers, and
+        is retried every delay seconds in case it is still starting.
+        """
         deadline = time.time() + self.timeout
 
-        while time.time() < deadline:
+        try:
+            wait_for_ssh_banner(host, port=self.port, timeout=self.timeout)
+        except ReadinessTimeoutError as exc:
+            raise StaticIPAssignmentError(
+                f"Host {host} did not become reachable on SSH."
+            ) from exc
+
+        while True:
             try:
-                client = self._connect(host)
-                client.close()
-                return True
+                return self._connect(host)
             except StaticIPAssignmentError:
+                if time.time() >= deadline:
+                    raise StaticIPAssignmentError(
+                        f"Host {host} did not become reachable on SSH."
+                    )
                 time.sleep(delay)
 
-        raise StaticIPAssignmentError(f"Host {host} did not become reachable on SSH.")
+    def session(self, host):
+        """
+        Return the authenticated session kept open by _wait_for_ssh, or
+        None if there is not one.
+        """
+        return self.connections.get(host)
+
+    def close(self):
+        self.connections.close()
+
+    def hostname(self, host):
+        """
+        Return the hostname of the node at host. The session stays open,
+        and the hostname is remembered, for assign().
+        """
+        client = self._connect(host)
+
+        with tracing.span("check hostname", tracing.SSH, host=host):
+            _, stdout, _ = client.exec_command("hostname")
+            self._hostnames[host] = stdout.read().decode().strip()
+
+        return self._hostnames[host]
 
     @staticmethod
     def _generate_netplan_yaml(static_ip, gateway, nameservers, mask):
@@ -74,31 +118,31 @@ network:
         hostname=None,
         mask=24,
     ):
+        """
+        Move the node at dhcp_ip to static_ip, first checking that it is
+        the node called hostname if one is given. Returns the node's
+        hostname.
+        """
         if nameservers is None:
             nameservers = ["1.1.1.1", "8.8.8.8"]
 
+        with tracing.span(
+            "assign static IP", tracing.SSH, host=dhcp_ip, static_ip=static_ip
+        ):
+            return self._assign(
+                dhcp_ip, static_ip, gateway, nameservers, hostname, mask
+            )
+
+    def _assign(self, dhcp_ip, static_ip, gateway, nameservers, hostname, mask):
         client = self._connect(dhcp_ip)
+        remote_hostname = self._hostnames.get(dhcp_ip) or self.hostname(dhcp_ip)
 
-        if hostname:
-            _, stdout, _ = client.exec_command("hostname")
-            remote_hostname = stdout.read().decode().strip()
-
-            if remote_hostname != hostname:
-                client.close()
-                raise StaticIPAssignmentError(
-                    f"Refusing to configure host '{remote_hostname}'. "
-                    f"Expected '{hostname}'."
-                )
-
-        if hostname:
-            _, stdout, _ = client.exec_command(
-                f"sudo hostnamectl set-hostname {hostname}"
+        if hostname and remote_hostname != hostname:
+            self.connections.close(dhcp_ip)
+            raise StaticIPAssignmentError(
+                f"Refusing to configure host '{remote_hostname}'. "
+                f"Expected '{hostname}'."
             )
-            stdout.channel.recv_exit_status()
-
-            hosts_fix = f"127.0.1.1 {hostname}\n"
-            cmd = f"echo '{hosts_fix}' | sudo tee -a /etc/hosts"
-            client.exec_command(cmd)
 
         netplan_yaml = self._generate_netplan_yaml(
             static_ip=static_ip,
@@ -107,18 +151,21 @@ network:
             mask=mask,
         )
 
-        sftp = client.open_sftp()
-        remote_path = "/etc/netplan/99-static.yaml"
+        with tracing.span("write netplan", tracing.SSH, host=dhcp_ip):
+            sftp = self.connections.sftp(dhcp_ip)
+            remote_path = "/etc/netplan/99-static.yaml"
 
-        with sftp.open(remote_path, "w") as f:
-            f.write(netplan_yaml)
+            with sftp.open(remote_path, "w") as f:
+                f.write(netplan_yaml)
 
-        sftp.close()
+        with tracing.span("netplan apply", tracing.SSH, host=dhcp_ip):
+            _, stdout, _ = client.exec_command("sudo netplan apply || sudo reboot")
+            stdout.channel.recv_exit_status()
 
-        _, stdout, _ = client.exec_command("sudo netplan apply || sudo reboot")
-        stdout.channel.recv_exit_status()
+        # The DHCP address goes away with netplan apply.
+        self.connections.close(dhcp_ip)
 
-        client.close()
-        self._wait_for_ssh(static_ip)
+        with tracing.span("wait for ssh", tracing.SSH, host=static_ip):
+            self._wait_for_ssh(static_ip)
 
-        return True
+        return remote_hostname
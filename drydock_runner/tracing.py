@@ -0,0 +1,197 @@
+import contextlib
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+
+PHASE = "phase"
+SUBPROCESS = "subprocess"
+SSH = "ssh"
+
+
+@dataclass
+class Span:
+    name: str
+    category: str
+    start: float
+    thread: int
+    depth: int
+    end: float = None
+    attributes: dict = field(default_factory=dict)
+    error: str = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+
+class Tracer:
+    """
+    Records timed, nested spans from any thread.
+
+    Spans opened on the same thread while another is open are nested
+    inside it. The recorded spans can be exported in the Chrome trace
+    event format (chrome://tracing, Perfetto) or summarised as a table.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str = PHASE, **attributes):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        span = Span(
+            name=name,
+            category=category,
+            start=time.perf_counter(),
+            thread=threading.get_ident(),
+            depth=len(stack),
+            attributes=attributes,
+        )
+
+        with self._lock:
+            self.spans.append(span)
+
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            span.end = time.perf_counter()
+            stack.pop()
+
+    def chrome_trace(self) -> dict:
+        """
+        Return the spans as a Chrome trace event document.
+        """
+        pid = os.getpid()
+        events = []
+
+        with self._lock:
+            spans = list(self.spans)
+
+        for span in spans:
+            args = dict(span.attributes)
+            if span.error is not None:
+                args["error"] = span.error
+
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": round((span.start - self.origin) * 1e6),
+                    "dur": round(span.duration * 1e6),
+                    "pid": pid,
+                    "tid": span.thread,
+                    "args": args,
+                }
+            )
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str) -> None:
+        parent = os.path.dirname(path) or "."
+        os.makedirs(parent, exist_ok=True)
+
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f, default=str)
+
+    def summary(self) -> list:
+        """
+        (category, name, count, total seconds) for every distinct span, in
+        the order each was first seen.
+        """
+        totals = {}
+
+        with self._lock:
+            spans = list(self.spans)
+
+        for span in spans:
+            key = (span.category, span.name)
+            count, seconds = totals.get(key, (0, 0.0))
+            totals[key] = (count + 1, seconds + span.duration)
+
+        return [
+            (category, name, count, seconds)
+            for (category, name), (count, seconds) in totals.items()
+        ]
+
+    def format_summary(self) -> str:
+        lines = [f"{'CATEGORY':<12} {'COUNT':>5} {'SECONDS':>9}  SPAN"]
+
+        for category, name, count, seconds in self.summary():
+            lines.append(f"{category:<12} {count:>5} {seconds:>9.2f}  {name}")
+
+        return "\n".join(lines)
+
+
+_tracer = None
+
+
+def start_tracing() -> Tracer:
+    """
+    Start recording spans for this process and return the tracer.
+    """
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing() -> None:
+    global _tracer
+    _tracer = None
+
+
+def get_tracer() -> Tracer | None:
+    return _tracer
+
+
+@contextlib.contextmanager
+def span(name: str, category: str = PHASE, **attributes):
+    """
+    Record a span on the active tracer. Does nothing (and yields None) if
+    tracing has not been started.
+    """
+    tracer = _tracer
+
+    if tracer is None:
+        yield None
+        return
+
+    with tracer.span(name, category, **attributes) as recorded:
+        yield recorded
+
+
+def _command_name(args) -> str:
+    """
+    Name a command by its program and first subcommand, e.g. "git fetch"
+    for ["git", "-C", path, "fetch", ...].
+    """
+    program = os.path.basename(str(args[0]))
+
+    for arg in args[1:]:
+        if re.fullmatch(r"[a-z][a-z-]*", str(arg)):
+            return f"{program} {arg}"
+
+    return program
+
+
+def run(args, span_name: str = None, **kwargs):
+    """
+    subprocess.run, recorded as a span named span_name, or after the
+    command if not given.
+    """
+    with span(span_name or _command_name(args), SUBPROCESS):
+        return subprocess.run(args, **kwargs)
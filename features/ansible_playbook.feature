@@ -0,0 +1,78 @@
+Feature: Ansible playbook execution
+
+  The playbook reports what it is doing while it runs, and where the time
+  went once it has finished.
+
+
+  Background:
+    Given ansible-playbook is replaced by a local stand-in
+    And the playbook inputs exist
+
+
+  Scenario: Task events are streamed while the playbook runs
+    When the playbook is run against "192.168.8.10"
+    Then the first task event should arrive before the playbook finishes
+    And the timing report should show time spent in "pre_tasks" and "tasks"
+
+
+  Scenario: A failed task is named in the orchestration result
+    Given the "Run kubeadm init" task fails
+    When orchestration runs the playbook against "192.168.8.10"
+    Then orchestration should fail naming "Run kubeadm init" on "192.168.8.10"
+
+
+  Scenario: One playbook run provisions every node of a cluster
+    Given the "Run kubeadm init" task fails on "192.168.8.12"
+    When orchestration runs the playbook against the cluster:
+      | static_ip    | role       |
+      | 192.168.8.10 | controller |
+      | 192.168.8.11 | worker     |
+      | 192.168.8.12 | worker     |
+    Then the playbook should have run once for all 3 nodes
+    And provisioning should have succeeded on "192.168.8.10" and "192.168.8.11"
+    And provisioning should have failed on "192.168.8.12" naming "Run kubeadm init"
+
+
+  Scenario: A node that fails early does not stop the others being provisioned
+    Given the "Install Kubernetes packages" task fails on "192.168.8.11"
+    When orchestration runs the playbook against the cluster:
+      | static_ip    | role       |
+      | 192.168.8.10 | controller |
+      | 192.168.8.11 | worker     |
+      | 192.168.8.12 | worker     |
+    Then provisioning should have succeeded on "192.168.8.10" and "192.168.8.12"
+    And "Install minimal Cilium CNI" should have run on "192.168.8.10" and "192.168.8.12"
+    And provisioning should have failed on "192.168.8.11" naming "Install Kubernetes packages"
+
+
+  Scenario: Facts are gathered once and reused on the next run
+    Given a fact cache directory
+    When the playbook is run against "192.168.8.10" as "inaugural-node" with the fact cache
+    And the playbook is run against "192.168.8.10" as "inaugural-node" with the fact cache
+    Then facts should have been gathered for "192.168.8.10" in runs "1"
+
+
+  Scenario: Facts are gathered again when a node's hostname or static IP changes
+    Given a fact cache directory
+    When the playbook is run against "192.168.8.10" as "inaugural-node" with the fact cache
+    And the playbook is run against "192.168.8.10" as "rebuilt-node" with the fact cache
+    And the playbook is run against "192.168.8.20" as "rebuilt-node" with the fact cache
+    Then facts should have been gathered for "192.168.8.10" in runs "1, 2"
+    And facts should have been gathered for "192.168.8.20" in runs "3"
+    And the fact cache should not hold facts for "192.168.8.10"
+
+
+  Scenario: Nodes that share a hostname always have their facts gathered
+    Given a fact cache directory
+    When the playbook is run against the cluster with the fact cache:
+      | static_ip    | role       | hostname |
+      | 192.168.8.10 | controller | lab-1    |
+      | 192.168.8.11 | worker     | ubuntu   |
+      | 192.168.8.12 | worker     | ubuntu   |
+    And the playbook is run against the cluster with the fact cache:
+      | static_ip    | role       | hostname |
+      | 192.168.8.10 | controller | lab-1    |
+      | 192.168.8.11 | worker     | ubuntu   |
+      | 192.168.8.12 | worker     | ubuntu   |
+    Then facts should have been gathered for "192.168.8.10" in runs "1"
+    And facts should have been gathered for "192.168.8.11" in runs "1, 2"
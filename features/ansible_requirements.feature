@@ -0,0 +1,36 @@
+Feature: Ansible Galaxy requirements installation
+
+  Roles and collections are resolved once per requirements.yml and
+  ansible-galaxy version, then reused from the cache.
+
+
+  Background:
+    Given ansible-galaxy installs from local sources
+    And a requirements file listing role "geerlingguy.containerd" and collection "kubernetes.core"
+
+
+  Scenario: The first install populates the cache
+    When the Ansible requirements are installed
+    Then ansible-galaxy should have installed 2 times
+    And role "geerlingguy.containerd" should be installed
+    And collection "kubernetes.core" should be installed
+
+
+  Scenario: Unchanged requirements are not installed again
+    When the Ansible requirements are installed
+    And the Ansible requirements are installed
+    Then ansible-galaxy should have installed 2 times
+
+
+  Scenario: A fresh checkout is installed from the cache
+    When the Ansible requirements are installed
+    And the Ansible requirements are installed into a fresh checkout
+    Then ansible-galaxy should have installed 2 times
+    And role "geerlingguy.containerd" should be installed
+
+
+  Scenario: A new ansible-galaxy version installs again
+    When the Ansible requirements are installed
+    And ansible-galaxy is upgraded to "2.17.0"
+    And the Ansible requirements are installed
+    Then ansible-galaxy should have installed 4 times
@@ -0,0 +1,57 @@
+Feature: Node artifact cache
+
+  The Kubernetes packages and container images the nodes need are
+  downloaded once, on the operator's machine, and the playbook copies them
+  to every node over the LAN instead of each node fetching them itself.
+
+
+  Background:
+    Given a local apt repository serving:
+      | package        | version     | architecture | depends                                      |
+      | kubelet        | 1.30.2-1.1  | arm64        | kubernetes-cni (>= 1.2.0), iptables          |
+      | kubelet        | 1.30.10-1.1 | arm64        | kubernetes-cni (>= 1.2.0), iptables          |
+      | kubelet        | 1.30.10-1.1 | amd64        | kubernetes-cni (>= 1.2.0), iptables          |
+      | kubeadm        | 1.30.10-1.1 | arm64        | cri-tools (>= 1.30.0), kubelet (>= 1.19.0)   |
+      | kubeadm        | 1.30.10-1.1 | amd64        | cri-tools (>= 1.30.0), kubelet (>= 1.19.0)   |
+      | kubectl        | 1.30.10-1.1 | arm64        |                                              |
+      | kubectl        | 1.30.10-1.1 | amd64        |                                              |
+      | kubernetes-cni | 1.4.0-1.1   | arm64        |                                              |
+      | kubernetes-cni | 1.4.0-1.1   | amd64        |                                              |
+      | cri-tools      | 1.30.1-1.1  | all          |                                              |
+    And an empty artifact cache
+
+
+  Scenario: Packages are downloaded once and reused on the next run
+    When the artifact cache is prepared for "arm64, amd64"
+    Then the playbook vars should list these packages for "arm64":
+      | file                                |
+      | kubelet_1.30.10-1.1_arm64.deb       |
+      | kubeadm_1.30.10-1.1_arm64.deb       |
+      | kubectl_1.30.10-1.1_arm64.deb       |
+      | kubernetes-cni_1.4.0-1.1_arm64.deb  |
+      | cri-tools_1.30.1-1.1_all.deb        |
+    And every package should have been downloaded once
+    When the artifact cache is prepared for "arm64, amd64"
+    Then only the package index should have been downloaded again
+
+
+  Scenario: A pinned package version is staged instead of the newest
+    When the artifact cache is prepared with packages "kubelet=1.30.2-1.1" for "arm64"
+    Then the playbook vars should list these packages for "arm64":
+      | file                               |
+      | kubelet_1.30.2-1.1_arm64.deb       |
+      | kubernetes-cni_1.4.0-1.1_arm64.deb |
+
+
+  Scenario: A download that does not match its checksum is not cached
+    Given the repository's "kubectl_1.30.10-1.1_arm64.deb" is corrupted
+    When the artifact cache is prepared for "arm64"
+    Then preparing the artifact cache should fail naming "Checksum mismatch"
+    And the artifact cache should not hold "kubectl_1.30.10-1.1_arm64.deb"
+
+
+  Scenario: Container images are saved once per architecture
+    When the artifact cache is prepared with images "quay.io/cilium/cilium:v1.15.6" for "arm64, amd64"
+    And the artifact cache is prepared with images "quay.io/cilium/cilium:v1.15.6" for "arm64, amd64"
+    Then 2 images should have been fetched
+    And the playbook vars should list 1 image for each architecture
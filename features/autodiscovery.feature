@@ -63,3 +63,56 @@ Feature: Autodiscovery of inaugural bootstrap host
     When autodiscovery runs
     Then the result should be "192.168.8.12"
     And autodiscovery should accept the first stable detection
+
+
+  Scenario: Later rounds only re-probe addresses whose state could change
+    Given the subnet contains a host at "192.168.8.30" that refuses connections
+    When autodiscovery runs
+    Then autodiscovery should fail with "No inaugural host found"
+    And "192.168.8.30" should have been probed more often than "192.168.8.31"
+
+
+  Scenario: Silent addresses sit out the round after they first miss
+    Given the discovery retry interval is 1 seconds
+    And the subnet contains a host at "192.168.8.30" that refuses connections
+    When the subnet is scanned twice, one retry interval apart
+    Then "192.168.8.30" should have been probed 2 times
+    And "192.168.8.31" should have been probed 1 time
+
+
+  Scenario: Hosts in the neighbour table are probed before the subnet is swept
+    Given the neighbour table is "features/fixtures/proc-net-arp"
+    And the subnet contains a SSH host at "192.168.8.12"
+    When autodiscovery runs
+    Then the result should be "192.168.8.12"
+    And "192.168.8.1, 192.168.8.12, 192.168.8.20" should have been probed first
+
+
+  Scenario: An SSH host missing from the neighbour table is not overlooked
+    Given the neighbour table is "features/fixtures/proc-net-arp"
+    And the subnet contains a SSH host at "192.168.8.12"
+    And the subnet also contains a SSH host at "192.168.8.40"
+    When autodiscovery runs
+    Then autodiscovery should fail with "Multiple SSH hosts detected"
+
+
+  Scenario: A host that comes up while its address is backing off is not overlooked
+    Given after 1 retries an SSH host appears at "192.168.8.12"
+    And after 1 retries a silent address "192.168.8.50" starts answering SSH
+    When autodiscovery runs
+    Then autodiscovery should fail with "Multiple SSH hosts detected"
+
+
+  Scenario: The subnet is still swept when the neighbour table has no SSH host
+    Given the neighbour table is "features/fixtures/proc-net-arp"
+    And the subnet contains a SSH host at "192.168.8.40"
+    When autodiscovery runs
+    Then the result should be "192.168.8.40"
+
+
+  Scenario: Streaming discovery reports every SSH host as it is found
+    Given the subnet contains a SSH host at "192.168.8.12"
+    And the subnet also contains a SSH host at "192.168.8.34"
+    When streaming discovery runs until 2 hosts are found
+    Then the streamed hosts should be "192.168.8.12, 192.168.8.34"
+    And every streamed host should report SSH version "2.0"
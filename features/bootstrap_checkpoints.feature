@@ -0,0 +1,44 @@
+Feature: Resuming an interrupted bootstrap
+
+  Completed phases are checkpointed, so a re-run after a late failure
+  skips the work that has already been done on the node.
+
+
+  Background:
+    Given a node that answers at its static IP
+    And a checkpoint store
+
+
+  Scenario: A re-run after a failed apply skips static IPs and the playbook
+    Given the root Application apply fails once
+    When the bootstrap is run
+    Then the bootstrap should fail
+    When the bootstrap is run
+    Then the bootstrap should succeed
+    And static IP assignment should have run 1 time
+    And the playbook should have run 1 time
+
+
+  Scenario: A phase whose post-conditions no longer hold is re-run
+    Given the root Application apply fails once
+    When the bootstrap is run
+    And the node loses its kubeconfig
+    And the bootstrap is run
+    Then the bootstrap should succeed
+    And static IP assignment should have run 1 time
+    And the playbook should have run 2 times
+
+
+  Scenario: Changed inputs invalidate the checkpoints
+    Given the root Application apply fails once
+    When the bootstrap is run
+    And the bootstrap is run with a different configuration
+    Then the bootstrap should succeed
+    And static IP assignment should have run 2 times
+    And the playbook should have run 2 times
+
+
+  Scenario: Clusters without an inaugural hostname keep their own checkpoints
+    When checkpoint files are chosen for "lab-a" and "lab-b", neither with an inaugural hostname
+    Then the two checkpoint files should differ
+    And neither checkpoint file should be named "None.json"
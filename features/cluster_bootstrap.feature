@@ -6,4 +6,20 @@ Feature: Cluster bootstrap
     Given valid environment configuration
     And a new machine is available on the network
     When the operator runs the bootstrap tool
-    Then the cluster is ready for GitOps takeover
\ No newline at end of file
+    Then the cluster is ready for GitOps takeover
+
+  Scenario: Successful cluster bootstrap
+    Given valid environment configuration
+    And 3 new machines are available on the network
+    When the operator runs the bootstrap tool
+    Then the cluster is ready for GitOps takeover
+    And every node has been provisioned
+
+  Scenario: Every node keeps one SSH connection for the whole run
+    Given valid environment configuration
+    And 2 new machines are available on the network
+    When the operator runs the bootstrap tool with SSH control masters
+    Then the cluster is ready for GitOps takeover
+    And the SSH log for every node should read "ssh master, ssh multiplexed"
+    When the run is cleaned up
+    Then the SSH log for every node should read "ssh master, ssh multiplexed, ssh exit"
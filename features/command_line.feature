@@ -0,0 +1,52 @@
+Feature: Command line
+
+  Checking a configuration or looking for nodes starts quickly, because
+  neither loads the bootstrap workflow.
+
+
+  Scenario: validate accepts a valid configuration
+    Given a valid configuration file
+    When drydock is run with "validate"
+    Then the command should exit with status 0, printing "is valid"
+
+
+  Scenario: validate reports what is wrong with a configuration
+    Given a configuration file without "spec.inauguralNode"
+    When drydock is run with "validate"
+    Then the command should exit with status 2, printing "inauguralNode"
+
+
+  Scenario: validate --schema-only reports settings of the wrong type
+    Given a configuration file with "spec.inauguralNode.sshUser" set to 7
+    When drydock is run with "validate --schema-only"
+    Then the command should exit with status 2, printing "spec.inauguralNode.sshUser: expected string, got integer"
+
+
+  Scenario: validate --schema-only does not build the models
+    Given a valid configuration file
+    When drydock is run with "validate --schema-only"
+    Then the command should exit with status 0, printing "is valid"
+    And "pydantic" should not have been imported
+
+
+  Scenario: validate --schema-only falls back to the models without the schema
+    Given a valid configuration file
+    And a copy of drydock_runner without config-schema.yaml
+    When drydock is run with "validate --schema-only"
+    Then the command should exit with status 0, printing "is valid"
+    And the command should have warned "config-schema.yaml not found"
+
+
+  Scenario Outline: Fast commands do not import what only bootstrap needs
+    Given a valid configuration file
+    When drydock is run with "<arguments>"
+    Then the command should exit with status 0, printing "<output>"
+    And "paramiko" should not have been imported
+    And "drydock_runner.cluster_build" should not have been imported
+
+    Examples:
+      | arguments                                  | output          |
+      | --help                                     | validate        |
+      | validate                                   | is valid        |
+      | validate --schema-only                     | is valid        |
+      | discover --cidr 127.0.0.1/32 --timeout 0   | SSH host(s)     |
@@ -0,0 +1,43 @@
+Feature: Configuration loading
+
+  A validated configuration is cached, so loading the same file again does
+  not parse its YAML. A new process validates the cached JSON instead.
+
+
+  Background:
+    Given a configuration file and an empty configuration cache
+
+
+  Scenario: A configuration is validated once
+    When the configuration is loaded 3 times
+    Then it should have been parsed 1 time
+
+
+  Scenario: The cache on disk outlives the process
+    Given the configuration has been loaded
+    When the configuration is loaded by a new process
+    Then it should have been parsed 0 times
+    And the loaded configuration should name "startup-benchmark"
+
+
+  Scenario: A changed configuration is validated again
+    Given the configuration has been loaded
+    When the configuration's metadata.name is changed to "changed"
+    And the configuration is loaded by a new process
+    Then it should have been parsed 1 time
+    And the loaded configuration should name "changed"
+
+
+  Scenario: A corrupt cache entry is ignored
+    Given the configuration has been loaded
+    And every cached configuration is corrupted
+    When the configuration is loaded by a new process
+    Then it should have been parsed 1 time
+    And the loaded configuration should name "startup-benchmark"
+
+
+  Scenario: Changing a loaded configuration does not change the cache
+    Given the configuration has been loaded
+    When the loaded configuration's metadata.name is changed to "changed"
+    And the configuration is loaded 1 time
+    Then the loaded configuration should name "startup-benchmark"
@@ -0,0 +1,350 @@
+"""
+A fake Kubernetes API server for the behave features.
+
+Serves discovery for a handful of resources and stores objects sent with
+server-side apply. Plain HTTP on loopback, with keep-alive, and counts the
+connections and requests it receives so tests can check pooling.
+
+Collections can be listed (optionally with a metadata.name field selector)
+and watched from a resourceVersion, with chunked event streams. Tests
+change an object's status with update_status() and drop the event history
+with compact(), after which watches from an older version get 410 Gone.
+"""
+
+import copy
+import json
+import posixpath
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+RESOURCES = {
+    "v1": [
+        ("namespaces", "Namespace", False),
+        ("configmaps", "ConfigMap", True),
+        ("nodes", "Node", False),
+    ],
+    "apps/v1": [("deployments", "Deployment", True)],
+    "apiextensions.k8s.io/v1": [
+        ("customresourcedefinitions", "CustomResourceDefinition", False)
+    ],
+}
+
+# Only served once a CRD for it has been applied.
+CUSTOM_RESOURCES = {
+    "applications.argoproj.io": (
+        "argoproj.io/v1alpha1",
+        ("applications", "Application", True),
+    ),
+}
+
+
+class FakeKubeAPI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, token=None, max_watch_seconds=None):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.token = token
+        self.max_watch_seconds = max_watch_seconds
+        self.resources = {gv: list(resources) for gv, resources in RESOURCES.items()}
+        self.objects = {}
+        self.resource_version = 0
+        self.events = []
+        self.compacted = 0
+        self.stopping = False
+        self.connections = 0
+        self.requests = []
+        self.discovery_delay = {}
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self.changed:
+            self.stopping = True
+            self.changed.notify_all()
+        self.shutdown()
+        self.server_close()
+
+    def kubeconfig(self) -> str:
+        user = {"token": self.token} if self.token else {}
+        return json.dumps(
+            {
+                "apiVersion": "v1",
+                "kind": "Config",
+                "clusters": [{"name": "fake", "cluster": {"server": self.url}}],
+                "users": [{"name": "admin", "user": user}],
+                "contexts": [
+                    {"name": "fake", "context": {"cluster": "fake", "user": "admin"}}
+                ],
+                "current-context": "fake",
+            }
+        )
+
+    def discovery(self, group_version):
+        time.sleep(self.discovery_delay.get(group_version, 0))
+        resources = self.resources.get(group_version)
+        if resources is None:
+            return None
+        return {
+            "kind": "APIResourceList",
+            "groupVersion": group_version,
+            "resources": [
+                {"name": name, "kind": kind, "namespaced": namespaced}
+                for name, kind, namespaced in resources
+            ],
+        }
+
+    def store(self, path, obj):
+        """
+        Store obj at path as a server-side apply would. Returns
+        (status, stored object).
+        """
+        with self.changed:
+            created = path not in self.objects
+            self._record_event("ADDED" if created else "MODIFIED", path, obj)
+
+            if obj.get("kind") == "CustomResourceDefinition":
+                served = CUSTOM_RESOURCES.get(obj["metadata"]["name"])
+                if served:
+                    group_version, resource = served
+                    self.resources.setdefault(group_version, []).append(resource)
+
+        return (201 if created else 200), obj
+
+    def update_status(self, path, status):
+        """
+        Merge status into the stored object's status, as a controller
+        would, and tell the watchers.
+        """
+        with self.changed:
+            obj = self.objects[path]
+            obj["status"] = {**obj.get("status", {}), **status}
+            self._record_event("MODIFIED", path, obj)
+
+    def compact(self):
+        """
+        Forget the event history, as if other writes had happened and been
+        compacted away, and end every open watch. A watch resumed from any
+        resourceVersion handed out so far gets 410 Gone.
+        """
+        with self.changed:
+            self.resource_version += 1
+            self.compacted = self.resource_version
+            self.events = []
+            self.changed.notify_all()
+
+    def _record_event(self, event_type, path, obj):
+        # Called with the lock held.
+        self.resource_version += 1
+        obj.setdefault("metadata", {})["resourceVersion"] = str(self.resource_version)
+        self.objects[path] = obj
+        snapshot = copy.deepcopy(obj)
+        self.events.append((self.resource_version, event_type, path, snapshot))
+        self.changed.notify_all()
+
+    def is_collection(self, path) -> bool:
+        plural = posixpath.basename(path)
+        return any(
+            name == plural
+            for resources in self.resources.values()
+            for name, _, _ in resources
+        )
+
+    def collection(self, path, name=None):
+        """
+        Return the objects in the collection at path, and the current
+        resourceVersion.
+        """
+        with self.lock:
+            items = [
+                copy.deepcopy(obj)
+                for obj_path, obj in self.objects.items()
+                if _in_collection(obj_path, path, name)
+            ]
+            return items, self.resource_version
+
+    def events_since(self, path, resource_version, name=None, generation=None):
+        """
+        Block until there are events in the collection at path after
+        resource_version, or the history is compacted. Returns the events,
+        or None if resource_version is too old to resume from.
+        """
+        with self.changed:
+            if resource_version < self.compacted:
+                return None
+
+            events = [
+                (rv, event_type, obj)
+                for rv, event_type, obj_path, obj in self.events
+                if rv > resource_version and _in_collection(obj_path, path, name)
+            ]
+            if not events and generation == self.compacted and not self.stopping:
+                self.changed.wait(0.1)
+            return events
+
+    def bookmark_version(self, path, resource_version, name=None):
+        """
+        The resourceVersion a watch that has seen everything up to
+        resource_version in the collection at path can resume from.
+        """
+        with self.lock:
+            pending = any(
+                rv > resource_version and _in_collection(obj_path, path, name)
+                for rv, _, obj_path, _ in self.events
+            )
+            return resource_version if pending else self.resource_version
+
+
+def _in_collection(obj_path, path, name=None):
+    parent, obj_name = posixpath.split(obj_path)
+    return parent == path and name in (None, obj_name)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _not_found(self):
+        self._reply(404, {"kind": "Status", "message": "the server could not find it"})
+
+    def _authorised(self):
+        if not self.server.token:
+            return True
+        if self.headers.get("Authorization") == f"Bearer {self.server.token}":
+            return True
+        self._reply(401, {"kind": "Status", "message": "Unauthorized"})
+        return False
+
+    def _record(self):
+        url = urlsplit(self.path)
+        with self.server.lock:
+            self.server.requests.append((self.command, url.path, parse_qs(url.query)))
+        return url
+
+    def do_GET(self):
+        url = self._record()
+        if not self._authorised():
+            return
+
+        parts = url.path.strip("/").split("/")
+        if parts[0] == "api" and len(parts) == 2:
+            listing = self.server.discovery(parts[1])
+        elif parts[0] == "apis" and len(parts) == 3:
+            listing = self.server.discovery(f"{parts[1]}/{parts[2]}")
+        elif self.server.is_collection(url.path):
+            return self._collection(url.path, parse_qs(url.query))
+        else:
+            obj = self.server.objects.get(url.path)
+            return self._reply(200, obj) if obj else self._not_found()
+
+        return self._reply(200, listing) if listing else self._not_found()
+
+    def _collection(self, path, query):
+        name = None
+        for selector in query.get("fieldSelector", []):
+            field, _, value = selector.partition("=")
+            if field == "metadata.name":
+                name = value
+
+        if query.get("watch") == ["1"]:
+            return self._watch(path, query, name)
+
+        items, resource_version = self.server.collection(path, name)
+        self._reply(
+            200,
+            {
+                "kind": "List",
+                "metadata": {"resourceVersion": str(resource_version)},
+                "items": items,
+            },
+        )
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _write_event(self, event_type, obj):
+        event = {"type": event_type, "object": obj}
+        self._write_chunk(json.dumps(event).encode() + b"\n")
+
+    def _watch(self, path, query, name):
+        try:
+            self._stream(path, query, name)
+        except ConnectionError:
+            # The client stopped watching.
+            pass
+        self.close_connection = True
+
+    def _stream(self, path, query, name):
+        resource_version = int(query.get("resourceVersion", ["0"])[0] or 0)
+        seconds = float(query.get("timeoutSeconds", ["60"])[0])
+        if self.server.max_watch_seconds is not None:
+            seconds = min(seconds, self.server.max_watch_seconds)
+        deadline = time.monotonic() + seconds
+        generation = self.server.compacted
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        while time.monotonic() < deadline and not self.server.stopping:
+            events = self.server.events_since(path, resource_version, name, generation)
+            if events is None:
+                self._write_event(
+                    "ERROR", {"kind": "Status", "code": 410, "message": "too old"}
+                )
+                break
+            if generation != self.server.compacted:
+                break
+
+            for event_rv, event_type, obj in events:
+                resource_version = event_rv
+                self._write_event(event_type, obj)
+        else:
+            if query.get("allowWatchBookmarks") == ["true"]:
+                version = self.server.bookmark_version(path, resource_version, name)
+                self._write_event(
+                    "BOOKMARK", {"metadata": {"resourceVersion": str(version)}}
+                )
+
+        self._write_chunk(b"")
+
+    def do_PATCH(self):
+        url = self._record()
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+
+        if not self._authorised():
+            return
+
+        if self.headers.get("Content-Type") != "application/apply-patch+yaml":
+            return self._reply(415, {"kind": "Status", "message": "not an apply"})
+
+        status, obj = self.server.store(url.path, json.loads(body))
+        self._reply(status, obj)
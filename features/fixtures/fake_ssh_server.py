@@ -0,0 +1,166 @@
+"""
+A fake SSH server for the behave features, built on paramiko's server
+mode and listening on a loopback address.
+
+It accepts one username and password, answers "hostname" and "true" and
+counts the connections it receives, so tests can check that sessions are
+reused. drop() closes every connection from the server's end, as a node
+that reboots does.
+
+With sftp_root, it also serves that directory, read-only, over SFTP as
+if it were the node's root filesystem.
+"""
+
+import os
+import socket
+import threading
+import time
+
+import paramiko
+
+
+class _Server(paramiko.ServerInterface):
+    def __init__(self, fake):
+        self.fake = fake
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        if (username, password) == (self.fake.username, self.fake.password):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        command = command.decode()
+        self.fake.commands.append(command)
+
+        if command == "hostname":
+            output, status = f"{self.fake.hostname}\n", 0
+        elif command == "true":
+            output, status = "", 0
+        else:
+            output, status = "", 127
+
+        def run():
+            channel.sendall(output.encode())
+            channel.send_exit_status(status)
+            # Closing could overtake the reply to the exec request, so
+            # only end the output.
+            channel.shutdown_write()
+
+        threading.Thread(target=run, daemon=True).start()
+        return True
+
+
+class _SFTPHandle(paramiko.SFTPHandle):
+    def stat(self):
+        return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+
+class _SFTPServer(paramiko.SFTPServerInterface):
+    def __init__(self, server, root):
+        super().__init__(server)
+        self.root = root
+
+    def _local(self, path):
+        return os.path.join(self.root, path.lstrip("/"))
+
+    def open(self, path, flags, attr):
+        if flags & (os.O_WRONLY | os.O_RDWR):
+            return paramiko.SFTP_PERMISSION_DENIED
+
+        try:
+            f = open(self._local(path), "rb")
+        except OSError as exc:
+            return paramiko.SFTPServer.convert_errno(exc.errno)
+
+        handle = _SFTPHandle(flags)
+        handle.readfile = f
+        handle.filename = path
+        return handle
+
+    def stat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self._local(path)))
+        except OSError as exc:
+            return paramiko.SFTPServer.convert_errno(exc.errno)
+
+    lstat = stat
+
+
+class FakeSSHServer:
+    def __init__(
+        self,
+        address="127.0.0.1",
+        port=0,
+        username="ubuntu",
+        password="bootstrap",
+        hostname="fake-node",
+        host_key=None,
+        sftp_root=None,
+    ):
+        self.username = username
+        self.password = password
+        self.hostname = hostname
+        self.sftp_root = sftp_root
+        self.host_key = host_key or paramiko.ECDSAKey.generate()
+        self.connections = 0
+        self.commands = []
+        self.transports = []
+
+        self._socket = socket.socket()
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((address, port))
+        self._socket.listen()
+        self.address = address
+        self.port = self._socket.getsockname()[1]
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self._socket.accept()
+            except OSError:
+                return
+
+            self.connections += 1
+            transport = paramiko.Transport(sock)
+            transport.add_server_key(self.host_key)
+            self.setup_transport(transport)
+            transport.start_server(server=_Server(self))
+            self.transports.append(transport)
+
+    def setup_transport(self, transport):
+        if self.sftp_root is not None:
+            transport.set_subsystem_handler(
+                "sftp", paramiko.SFTPServer, _SFTPServer, self.sftp_root
+            )
+
+    def active_connections(self) -> int:
+        return sum(transport.is_active() for transport in self.transports)
+
+    def wait_for_active_connections(self, count, timeout=5) -> bool:
+        deadline = time.time() + timeout
+        while self.active_connections() != count:
+            if time.time() > deadline:
+                return False
+            time.sleep(0.02)
+        return True
+
+    def drop(self):
+        for transport in self.transports:
+            transport.close()
+
+    def stop(self):
+        self._socket.close()
+        self.drop()
@@ -0,0 +1,42 @@
+Feature: In-process server-side apply
+
+  Manifests are applied straight to the Kubernetes API with server-side
+  apply, over pooled connections, instead of by forking kubectl.
+
+
+  Background:
+    Given a fake Kubernetes API server
+    And a kubeconfig for the fake API server
+
+
+  Scenario: A directory of manifests is applied with server-side apply
+    Given a manifest directory with a Namespace, a ConfigMap and a Deployment
+    When the manifest directory is applied
+    Then the API server should store the Namespace, the ConfigMap and the Deployment
+    And every object should have been applied by the "drydock" field manager
+
+
+  Scenario: Discovery and connections are reused between applies
+    Given a manifest directory with 20 ConfigMaps
+    When the manifest directory is applied
+    And the manifest directory is applied
+    Then API discovery should have been fetched once for "v1"
+    And the API server should have seen at most 4 connections
+
+
+  Scenario: A custom resource is applied together with its definition
+    Given a manifest directory with an ArgoCD Application and its CRD
+    When the manifest directory is applied
+    Then the API server should store the Application
+
+
+  Scenario: A slow discovery does not hold up other kinds
+    Given discovery of "apps/v1" takes 2 seconds
+    When a Deployment and a ConfigMap are looked up at the same time
+    Then the ConfigMap should have been resolved within 1 second
+
+
+  Scenario: A manifest document that is not an object is rejected
+    Given a manifest file holding a list of strings
+    When the manifest file is loaded
+    Then loading should fail with a ValueError naming the manifest file
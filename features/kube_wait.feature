@@ -0,0 +1,73 @@
+Feature: Watch-based readiness waits
+
+  After the root Application is applied, drydock waits for the cluster to
+  become ready by watching the Kubernetes API, so it carries on as soon as
+  the nodes, the ArgoCD server and the Application are ready instead of at
+  the next poll.
+
+
+  Background:
+    Given a fake Kubernetes API server
+    And a kubeconfig for the fake API server
+
+
+  Scenario: A Deployment is ready as soon as it becomes available
+    Given the API server has a Deployment "argocd/argocd-server" with no available replicas
+    When the Deployment becomes available after 0.3 seconds
+    And I wait up to 5 seconds for the Deployment "argocd/argocd-server"
+    Then the wait should finish within 0.25 seconds of the change
+    And the API server should have listed "deployments" 1 time(s)
+
+
+  Scenario: A watch the server ends is resumed from the last resourceVersion
+    Given the fake API server ends watches after 0.2 seconds
+    And the API server has a Deployment "argocd/argocd-server" with no available replicas
+    When the Deployment becomes available after 0.7 seconds
+    And I wait up to 5 seconds for the Deployment "argocd/argocd-server"
+    Then the wait should finish within 0.25 seconds of the change
+    And the API server should have listed "deployments" 1 time(s)
+    And every watch on "deployments" should have resumed from a resourceVersion
+
+
+  Scenario: Nodes are listed again when the watch history is gone
+    Given the API server has 3 nodes, 1 of them Ready
+    When the watch history is compacted and every node becomes Ready after 0.3 seconds
+    And I wait up to 5 seconds for 3 Ready nodes
+    Then the wait should finish within 0.25 seconds of the change
+    And the API server should have listed "nodes" 2 time(s)
+
+
+  Scenario: An Application that never becomes Healthy times out
+    Given the API server has an ArgoCD Application "argocd/root" that is Progressing
+    When I wait up to 0.5 seconds for the Application "argocd/root"
+    Then the wait should fail with a readiness timeout naming "Application argocd/root"
+
+
+  Scenario: The cluster is ready once its nodes, ArgoCD and the root Application are
+    Given the API server has 1 nodes, 0 of them Ready
+    And the API server has a Deployment "argocd/argocd-server" with no available replicas
+    And the API server has an ArgoCD Application "argocd/root" that is Progressing
+    And a root Application manifest for "argocd/root"
+    When the cluster becomes ready after 0.3 seconds
+    And I wait for the cluster to be ready
+    Then readiness should be reported for:
+      | name                            |
+      | Node                            |
+      | Deployment/argocd/argocd-server |
+      | Application/argocd/root         |
+
+
+  Scenario: A multi-node cluster is ready once every node has joined
+    Given the API server has 1 nodes, 0 of them Ready
+    And the API server has a Deployment "argocd/argocd-server" with no available replicas
+    And the API server has an ArgoCD Application "argocd/root" that is Progressing
+    And a root Application manifest for "argocd/root"
+    When the cluster becomes ready after 0.3 seconds
+    And 2 more nodes join and become Ready after 0.8 seconds
+    And I wait for a 3 node cluster to be ready
+    Then the wait should finish within 0.25 seconds of the change
+    And readiness should be reported for:
+      | name                            |
+      | Node                            |
+      | Deployment/argocd/argocd-server |
+      | Application/argocd/root         |
@@ -0,0 +1,56 @@
+Feature: Kubeconfig fetch
+
+  The kubeconfig is read from the inaugural node over SFTP, on the node's
+  existing SSH session, and written locally in one step.
+
+
+  Scenario: The kubeconfig is fetched over the node's session
+    Given a node at "127.0.79.1" with a kubeconfig for "https://10.96.0.1:6443"
+    And "hostname" has been run on "127.0.79.1" through a connection manager
+    When the kubeconfig is fetched from "127.0.79.1" for "192.168.8.10"
+    Then the local kubeconfig should point at "https://192.168.8.10:6443"
+    And the local kubeconfig should only be readable by its owner
+    And "127.0.79.1" should have been connected to 1 time
+
+
+  Scenario: A node without a kubeconfig fails the fetch
+    Given a node at "127.0.79.1" without a kubeconfig
+    When the kubeconfig is fetched from "127.0.79.1" for "192.168.8.10"
+    Then the fetch should fail with "Failed to fetch kubeconfig via SFTP"
+    And there should be no local kubeconfig
+
+
+  Scenario: An existing kubeconfig is replaced whole
+    Given a local kubeconfig readable by everyone
+    When a new kubeconfig is written over it
+    Then the local kubeconfig should be the new one
+    And the local kubeconfig should only be readable by its owner
+    And no partial kubeconfig should be left behind
+
+
+  Scenario: A failed write leaves the old kubeconfig in place
+    Given a local kubeconfig readable by everyone
+    When writing a new kubeconfig over it fails
+    Then the local kubeconfig should be the old one
+    And no partial kubeconfig should be left behind
+
+
+  Scenario Outline: Server addresses are rewritten keeping the scheme and port
+    When the server "<server>" is rewritten to "192.168.8.10"
+    Then the server should be "<rewritten>"
+
+    Examples:
+      | server                     | rewritten                 |
+      | https://10.96.0.1:6443     | https://192.168.8.10:6443 |
+      | https://kube.internal      | https://192.168.8.10      |
+      | https://[fd00::1]:6443/api | https://192.168.8.10:6443/api |
+
+
+  Scenario Outline: A kubeconfig that cannot be rewritten is reported
+    When the kubeconfig "<kubeconfig>" is rewritten to "192.168.8.10"
+    Then the rewrite should fail with "<message>"
+
+    Examples:
+      | kubeconfig      | message                   |
+      | clusters: [     | not valid YAML            |
+      | - just a list   | not a YAML mapping        |
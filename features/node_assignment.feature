@@ -0,0 +1,110 @@
+Feature: Cluster node assignment
+
+  Every node the cluster layout asks for is given a static IP from the
+  address pool, in the order the nodes are found and identified.
+
+
+  Background:
+    Given an address pool from "192.168.8.10" to "192.168.8.20"
+
+
+  Scenario: Controllers are assigned before workers
+    Given a layout of 2 controllers and up to 2 workers
+    And discovery finds "192.168.8.101, 192.168.8.102, 192.168.8.103, 192.168.8.104"
+    When the cluster nodes are assigned
+    Then the nodes should be assigned:
+      | host          | static ip    | role       |
+      | 192.168.8.101 | 192.168.8.10 | controller |
+      | 192.168.8.102 | 192.168.8.11 | controller |
+      | 192.168.8.103 | 192.168.8.12 | worker     |
+      | 192.168.8.104 | 192.168.8.13 | worker     |
+
+
+  Scenario: Discovery stops once the layout is full
+    Given a layout of 1 controller and up to 1 worker
+    And discovery finds "192.168.8.101, 192.168.8.102, 192.168.8.103"
+    When the cluster nodes are assigned
+    Then 2 nodes should have been assigned
+    And "192.168.8.103" should not have been discovered
+
+
+  Scenario: Nodes found again at their static IP are not assigned twice
+    Given a layout of 1 controller and any number of workers
+    And discovery finds "192.168.8.101, 192.168.8.102" and then every node at its static IP
+    When the cluster nodes are assigned
+    Then the nodes should be assigned:
+      | host          | static ip    | role       |
+      | 192.168.8.101 | 192.168.8.10 | controller |
+      | 192.168.8.102 | 192.168.8.11 | worker     |
+
+
+  Scenario: A node found on a second address is assigned once
+    Given a layout of 1 controller and any number of workers
+    And "192.168.8.101" and "192.168.8.201" are both called "node-a"
+    And discovery finds "192.168.8.101, 192.168.8.201, 192.168.8.102"
+    When the cluster nodes are assigned
+    Then the nodes should be assigned:
+      | host          | static ip    | role       |
+      | 192.168.8.101 | 192.168.8.10 | controller |
+      | 192.168.8.102 | 192.168.8.11 | worker     |
+
+
+  Scenario: The inaugural node is a controller whenever it is found
+    Given a layout of 1 controller and any number of workers
+    And the inaugural node is "192.168.8.103"
+    And discovery finds "192.168.8.101, 192.168.8.102, 192.168.8.103"
+    When the cluster nodes are assigned
+    Then the nodes should be assigned:
+      | host          | static ip    | role       |
+      | 192.168.8.103 | 192.168.8.12 | controller |
+      | 192.168.8.101 | 192.168.8.10 | worker     |
+      | 192.168.8.102 | 192.168.8.11 | worker     |
+    And only "192.168.8.103" should have been checked for the inaugural hostname
+
+
+  Scenario: A failure on one node does not affect the others
+    Given a layout of 1 controller and up to 2 workers
+    And assigning "192.168.8.102" fails with "netplan apply failed"
+    And discovery finds "192.168.8.101, 192.168.8.102, 192.168.8.103"
+    When the cluster nodes are assigned
+    Then "192.168.8.102" should have failed with "netplan apply failed"
+    And "192.168.8.101, 192.168.8.103" should have been assigned
+
+
+  Scenario: A discovered host keeps its address in the pool
+    Given a layout of 1 controller and any number of workers
+    And discovery finds "192.168.8.11, 192.168.8.101"
+    When the cluster nodes are assigned
+    Then the nodes should be assigned:
+      | host          | static ip    | role       |
+      | 192.168.8.11  | 192.168.8.10 | controller |
+      | 192.168.8.101 | 192.168.8.12 | worker     |
+
+
+  Scenario: Assignment stops when the pool runs out
+    Given an address pool from "192.168.8.10" to "192.168.8.11"
+    And a layout of 1 controller and any number of workers
+    And discovery finds "192.168.8.101, 192.168.8.102, 192.168.8.103"
+    When the cluster nodes are assigned
+    Then 2 nodes should have been assigned
+
+
+  Scenario: A node slow to say what it is called does not hold up the others
+    Given a layout of 1 controller and any number of workers
+    And "192.168.8.101" takes 1 seconds to say what it is called
+    And discovery finds "192.168.8.101, 192.168.8.102, 192.168.8.103"
+    When the cluster nodes are assigned
+    Then the nodes should be assigned:
+      | host          | static ip    | role       |
+      | 192.168.8.101 | 192.168.8.12 | worker     |
+      | 192.168.8.102 | 192.168.8.10 | controller |
+      | 192.168.8.103 | 192.168.8.11 | worker     |
+
+
+  Scenario: Without a worker maxCount, discovery ends once the network goes quiet
+    Given a layout of 1 controller and any number of workers
+    And SSH servers answer at "192.168.8.101, 192.168.8.102" and nothing else on the subnet
+    And real discovery of that subnet times out after 60 seconds, or 2 seconds after the last new host
+    When the cluster nodes are assigned
+    Then 2 nodes should have been assigned
+    And assignment should have finished well before the discovery timeout
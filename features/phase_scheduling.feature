@@ -0,0 +1,23 @@
+Feature: Overlapping bootstrap phases
+
+  Cloning, the Ansible Galaxy install and static IP assignment do not
+  depend on each other, so the bootstrap runs them at the same time.
+
+
+  Background:
+    Given a node that answers at its static IP
+    And a checkpoint store
+
+
+  Scenario: Independent phases run at the same time
+    Given cloning, the galaxy install and static IP assignment each wait until all three have started
+    When the bootstrap is run
+    Then the bootstrap should succeed
+    And cloning, the galaxy install and static IP assignment should have overlapped
+
+
+  Scenario: A failed phase stops the phases that depend on it
+    Given cloning fails with "remote hung up"
+    When the bootstrap is run
+    Then the bootstrap should fail with "Failed to clone repositories: remote hung up"
+    And the playbook should have run 0 times
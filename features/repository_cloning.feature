@@ -0,0 +1,57 @@
+Feature: Cloning bootstrap source repositories
+
+  The bootstrapper only reads a handful of files from each source
+  repository, so it should not pay for their full history or contents.
+
+
+  Background:
+    Given a source repository "config" with 3 commits containing
+      | path                                                     |
+      | clusters/kubernetes-lab/kubeadm-controlplane-config.yaml |
+      | clusters/kubernetes-lab/root-application.yaml            |
+      | values/argocd.yaml                                       |
+      | docs/unused.md                                           |
+    And the "config" repository is configured with paths
+      | name          | path                                                     |
+      | kubeadmConfig | clusters/kubernetes-lab/kubeadm-controlplane-config.yaml |
+      | argocdValues  | values/argocd.yaml                                       |
+    And a source repository "infrastructure" with 2 commits containing
+      | path                     |
+      | tinkerbell/discover.ipxe |
+      | tinkerbell/unused.yaml   |
+    And the "infrastructure" repository is configured with paths
+      | name        | path                     |
+      | discoverPxe | tinkerbell/discover.ipxe |
+
+
+  Scenario: Only the configured paths and the clusters tree are checked out
+    When the source repositories are cloned
+    Then the "config" checkout should contain "clusters/kubernetes-lab/root-application.yaml"
+    And the "config" checkout should contain "values/argocd.yaml"
+    And the "config" checkout should not contain "docs/unused.md"
+    And the "infrastructure" checkout should contain "tinkerbell/discover.ipxe"
+    And the "infrastructure" checkout should not contain "tinkerbell/unused.yaml"
+
+
+  Scenario: Clones are shallow
+    When the source repositories are cloned
+    Then the "config" checkout should have 1 commit of history
+    And the "infrastructure" checkout should have 1 commit of history
+
+
+  Scenario: Mirrors are kept in a persistent cache and only fetch new commits
+    Given a persistent repository cache
+    When the source repositories are cloned through the cache
+    And a new commit is pushed to the "config" repository
+    And the source repositories are cloned through the cache again
+    Then the "config" checkout should be at the new commit
+    And the cache should hold 2 mirrors
+
+
+  Scenario: Evicting a mirror does not break the working copies made from it
+    Given a persistent repository cache
+    When the source repositories are cloned through the cache
+    And every mirror is evicted from the cache
+    Then the cache should hold 0 mirrors
+    And the "config" checkout should be intact
+    And the "config" checkout should have 3 commits of history
@@ -0,0 +1,38 @@
+Feature: SSH control masters
+
+  Drydock keeps one SSH master connection open to each node for the whole
+  run, and the OpenSSH steps (the playbook, ssh) go through it instead of
+  each making their own.
+
+
+  Background:
+    Given ssh is replaced by a local stand-in
+    And a temporary working directory exists
+    And the run's SSH control masters are kept in it
+
+
+  Scenario: ssh runs commands over the node's master
+    Given control masters are open for "192.168.8.10"
+    When "true" is run on "192.168.8.10" with ssh
+    Then the SSH log for "192.168.8.10" should read "ssh master, ssh multiplexed"
+
+
+  Scenario: A master that is already running is reused
+    Given control masters are open for "192.168.8.10"
+    When control masters are opened for "192.168.8.10"
+    Then the SSH log for "192.168.8.10" should read "ssh master"
+
+
+  Scenario: A node that cannot be reached is left to connect on its own
+    Given "192.168.8.11" cannot be reached over SSH
+    When control masters are opened for "192.168.8.10,192.168.8.11"
+    Then opening a control master should have failed for "192.168.8.11" only
+    And the SSH log for "192.168.8.10" should read "ssh master"
+
+
+  Scenario: Cleanup closes every master
+    Given control masters are open for "192.168.8.10,192.168.8.11"
+    When the cleanup process is executed
+    Then the temporary directory is removed
+    And the SSH log for "192.168.8.10" should read "ssh master, ssh exit"
+    And the SSH log for "192.168.8.11" should read "ssh master, ssh exit"
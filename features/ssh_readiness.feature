@@ -0,0 +1,53 @@
+Feature: Waiting for SSH
+
+  After a node is moved to its static IP, drydock waits for sshd with a
+  cheap banner probe and only then authenticates.
+
+
+  Scenario: The banner probe tells SSH from other services
+    Given a loopback listener sending "SSH-2.0-OpenSSH_9.6p1"
+    And a loopback listener sending "220 mail.example.com ESMTP"
+    And a loopback port nobody listens on
+    When each loopback port is probed
+    Then the probes should find "ssh, non-ssh, refused"
+
+
+  Scenario: A silent node is probed less and less often
+    Given a node that stays silent for 6 probes
+    When drydock waits for its SSH banner
+    Then the wait should succeed
+    And the probes should have backed off to the longest interval
+
+
+  Scenario: A refused connection means sshd is starting, so probing speeds up again
+    Given a node that stays silent for 5 probes and then refuses 1
+    When drydock waits for its SSH banner
+    Then the wait should succeed
+    And the probe after the refusal should have come at the shortest interval
+
+
+  Scenario: A node that never answers times out
+    Given a node that stays silent for 1000 probes
+    When drydock waits for its SSH banner for 0.5 seconds
+    Then the wait should time out after about 0.5 seconds
+
+
+  Scenario: A re-IPed node is not authenticated to before its banner appears
+    Given a fake node that takes 0.5 seconds to come back at its static IP
+    When the node is moved to its static IP
+    Then the static IP assignment should succeed
+    And the node should have been authenticated to once at its static IP
+
+
+  Scenario: A node already identified is not asked for its hostname again
+    Given a fake node that takes 0.1 seconds to come back at its static IP
+    When the node is identified and then moved to its static IP as "node-0"
+    Then the static IP assignment should succeed
+    And the node should have been asked for its hostname 1 time
+    And only the network configuration should have been changed on the node
+
+
+  Scenario: A node that does not come back fails its assignment
+    Given a fake node that takes 5 seconds to come back at its static IP
+    When the node is moved to its static IP, waiting at most 1 second
+    Then the static IP assignment should fail with "did not become reachable on SSH"
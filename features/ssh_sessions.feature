@@ -0,0 +1,36 @@
+Feature: Shared SSH sessions
+
+  Every bootstrap step that talks to a node over SSH shares one
+  authenticated session to it.
+
+
+  Background:
+    Given a fake SSH server at "127.0.79.1"
+
+
+  Scenario: Callers share one session
+    When "hostname" is run on "127.0.79.1" 3 times through one connection manager
+    Then every run should print "fake-node"
+    And "127.0.79.1" should have been connected to 1 time
+
+
+  Scenario: Callers connecting at the same time share one session
+    When 8 callers connect to "127.0.79.1" at the same time
+    Then "127.0.79.1" should have been connected to 1 time
+
+
+  Scenario: A dropped session is reopened
+    Given "hostname" has been run on "127.0.79.1" through a connection manager
+    When "127.0.79.1" drops its SSH connections
+    And "hostname" is run on "127.0.79.1" through the same connection manager
+    Then every run should print "fake-node"
+    And "127.0.79.1" should have been connected to 2 times
+
+
+  Scenario: Shutting down closes every session
+    Given a fake SSH server at "127.0.79.2"
+    And "hostname" has been run on "127.0.79.1" through a connection manager
+    And "hostname" has been run on "127.0.79.2" through the same connection manager
+    When the connection manager is closed
+    Then no SSH connections should be open to "127.0.79.1, 127.0.79.2"
+    And the connection manager should hold no session to "127.0.79.1, 127.0.79.2"
@@ -0,0 +1,209 @@
+from behave import given, when, then
+import os
+import shutil
+import tempfile
+import time
+
+# Import the real runner; a fake ansible-playbook replays the event protocol.
+from drydock_runner.ansible_runner import real_ansible_playbook
+from drydock_runner.node_assignment import NodeAssignment
+from drydock_runner.orchestration import run_cluster_orchestration, run_orchestration
+
+FAKE_BIN = os.path.join(os.path.dirname(__file__), "..", "fixtures", "bin")
+ANSIBLE_CFG = os.path.join(
+    os.path.dirname(__file__), "..", "..", "drydock_node_config", "ansible.cfg"
+)
+
+
+def _set_env(context, name, value):
+    previous = os.environ.get(name)
+
+    def restore():
+        if previous is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = previous
+
+    context.add_cleanup(restore)
+    os.environ[name] = value
+
+
+@given("ansible-playbook is replaced by a local stand-in")
+def step_fake_playbook(context):
+    _set_env(context, "PATH", f"{os.path.abspath(FAKE_BIN)}:{os.environ['PATH']}")
+    _set_env(context, "FAKE_PLAYBOOK_TASK_SECONDS", "0.2")
+
+
+@given("the playbook inputs exist")
+def step_playbook_inputs(context):
+    context.ansible_dir = tempfile.mkdtemp(prefix="drydock-ansible-")
+    context.playbook_inputs = {}
+
+    for name in ("playbook.yaml", "kubeadm.yaml", "argocd.yaml", "values.yaml"):
+        path = os.path.join(context.ansible_dir, name)
+        with open(path, "w") as f:
+            f.write("---\n")
+        context.playbook_inputs[name] = path
+
+    shutil.copy(ANSIBLE_CFG, context.ansible_dir)
+
+
+@given('the "{task}" task fails')
+def step_task_fails(context, task):
+    _set_env(context, "FAKE_PLAYBOOK_FAIL_TASK", task)
+
+
+@given('the "{task}" task fails on "{host}"')
+def step_task_fails_on_host(context, task, host):
+    _set_env(context, "FAKE_PLAYBOOK_FAIL_TASK", task)
+    _set_env(context, "FAKE_PLAYBOOK_FAIL_HOST", host)
+
+
+def _run_playbook(context, ip, event_handler=None, nodes=None, **kwargs):
+    context.playbook_runs = getattr(context, "playbook_runs", 0) + 1
+    return real_ansible_playbook(
+        kubeadm_config_src=context.playbook_inputs["kubeadm.yaml"],
+        argocd_manifest=context.playbook_inputs["argocd.yaml"],
+        argocd_values=context.playbook_inputs["values.yaml"],
+        ip_address=ip,
+        ansible_dir=context.ansible_dir,
+        event_handler=event_handler,
+        nodes=nodes,
+        **kwargs,
+    )
+
+
+@when('the playbook is run against "{ip}"')
+def step_run_playbook(context, ip):
+    context.event_arrivals = []
+
+    def on_event(event):
+        context.event_arrivals.append((event["event"], time.time()))
+
+    context.report = _run_playbook(context, ip, event_handler=on_event)
+    context.playbook_finished = time.time()
+
+
+@when('orchestration runs the playbook against "{ip}"')
+def step_run_orchestration(context, ip):
+    context.orchestration_result = run_orchestration(
+        node_ip_address=ip,
+        ansible_func=lambda node_ip: _run_playbook(context, node_ip),
+    )
+
+
+@when("orchestration runs the playbook against the cluster:")
+def step_run_cluster_orchestration(context):
+    context.nodes = [
+        NodeAssignment(
+            dhcp_ip=row["static_ip"],
+            static_ip=row["static_ip"],
+            role=row["role"],
+            success=True,
+        )
+        for row in context.table
+    ]
+    context.node_results = run_cluster_orchestration(
+        nodes=context.nodes,
+        ansible_func=lambda nodes: _run_playbook(context, None, nodes=nodes),
+    )
+
+
+@given("a fact cache directory")
+def step_fact_cache(context):
+    context.fact_cache_dir = os.path.join(context.ansible_dir, "facts")
+    context.fact_reports = []
+
+
+@when('the playbook is run against "{ip}" as "{hostname}" with the fact cache')
+def step_run_with_fact_cache(context, ip, hostname):
+    context.fact_reports.append(
+        _run_playbook(
+            context, ip, hostname=hostname, fact_cache_dir=context.fact_cache_dir
+        )
+    )
+
+
+@when("the playbook is run against the cluster with the fact cache:")
+def step_run_cluster_with_fact_cache(context):
+    nodes = [
+        NodeAssignment(
+            dhcp_ip=row["static_ip"],
+            static_ip=row["static_ip"],
+            role=row["role"],
+            success=True,
+            hostname=row["hostname"],
+        )
+        for row in context.table
+    ]
+    context.fact_reports.append(
+        _run_playbook(context, None, nodes=nodes, fact_cache_dir=context.fact_cache_dir)
+    )
+
+
+@then('facts should have been gathered for "{ip}" in runs "{runs}"')
+def step_facts_gathered(context, ip, runs):
+    gathered = [
+        str(number)
+        for number, report in enumerate(context.fact_reports, start=1)
+        if any(r.task == "Gathering Facts" and r.host == ip for r in report.results)
+    ]
+    assert gathered == runs.split(", "), f"Gathered in runs {gathered}"
+
+
+@then('the fact cache should not hold facts for "{ip}"')
+def step_no_cached_facts(context, ip):
+    assert not os.path.exists(os.path.join(context.fact_cache_dir, ip))
+
+
+@then("the playbook should have run once for all {count:d} nodes")
+def step_single_cluster_run(context, count):
+    assert context.playbook_runs == 1, f"Playbook ran {context.playbook_runs} times"
+    report = next(iter(context.node_results.values())).ansible_report
+    assert len(report.host_stats) == count, report.host_stats
+
+
+@then('provisioning should have succeeded on "{first}" and "{second}"')
+def step_cluster_succeeded(context, first, second):
+    for ip in (first, second):
+        result = context.node_results[ip]
+        assert result.success, f"{ip} failed: {result.error_message}"
+
+
+@then('"{task}" should have run on "{first}" and "{second}"')
+def step_task_ran_on(context, task, first, second):
+    report = next(iter(context.node_results.values())).ansible_report
+    ran = {r.host for r in report.results if r.task == task and r.status == "ok"}
+    assert {first, second} <= ran, f"{task} only ran on {sorted(ran)}"
+
+
+@then('provisioning should have failed on "{host}" naming "{task}"')
+def step_cluster_failed(context, host, task):
+    result = context.node_results[host]
+    assert result.success is False, f"{host} did not fail"
+    assert task in result.error_message, result.error_message
+
+
+@then("the first task event should arrive before the playbook finishes")
+def step_events_streamed(context):
+    first_task = next(t for kind, t in context.event_arrivals if kind == "task_start")
+    assert (
+        context.playbook_finished - first_task > 0.5
+    ), "Task events only arrived once the playbook had finished"
+
+
+@then('the timing report should show time spent in "{first}" and "{second}"')
+def step_timing_report(context, first, second):
+    totals = context.report.section_totals()
+    assert totals.get(first, 0) > 0, f"No time recorded for {first}: {totals}"
+    assert totals.get(second, 0) > 0, f"No time recorded for {second}: {totals}"
+
+
+@then('orchestration should fail naming "{task}" on "{host}"')
+def step_orchestration_fails(context, task, host):
+    result = context.orchestration_result
+    assert result.success is False, "Orchestration did not fail"
+    assert task in result.error_message, result.error_message
+    assert host in result.error_message, result.error_message
+    assert "Traceback" not in result.error_message, result.error_message
+    assert result.ansible_report.failures()[0].task == task
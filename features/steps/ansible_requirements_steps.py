@@ -0,0 +1,89 @@
+from behave import given, when, then
+import os
+import shutil
+import tempfile
+
+# Import the real requirements logic; a fake ansible-galaxy stands in for Galaxy.
+from drydock_runner.ansible_runner import real_ansible_requirements
+
+FAKE_BIN = os.path.join(os.path.dirname(__file__), "..", "fixtures", "bin")
+
+
+def _set_env(context, name, value):
+    previous = os.environ.get(name)
+
+    def restore():
+        if previous is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = previous
+
+    context.add_cleanup(restore)
+    os.environ[name] = value
+
+
+@given("ansible-galaxy installs from local sources")
+def step_fake_galaxy(context):
+    context.work_dir = tempfile.mkdtemp(prefix="drydock-galaxy-")
+    context.galaxy_log = os.path.join(context.work_dir, "galaxy.log")
+    context.galaxy_cache = os.path.join(context.work_dir, "cache")
+
+    _set_env(context, "PATH", f"{os.path.abspath(FAKE_BIN)}:{os.environ['PATH']}")
+    _set_env(context, "FAKE_GALAXY_LOG", context.galaxy_log)
+    _set_env(context, "FAKE_GALAXY_VERSION", "2.16.0")
+
+
+@given('a requirements file listing role "{role}" and collection "{collection}"')
+def step_requirements_file(context, role, collection):
+    context.ansible_dir = os.path.join(context.work_dir, "checkout")
+    os.makedirs(context.ansible_dir)
+
+    context.requirements_path = os.path.join(context.ansible_dir, "requirements.yml")
+    with open(context.requirements_path, "w") as f:
+        f.write(f"roles:\n  - name: {role}\ncollections:\n  - name: {collection}\n")
+
+
+@when("the Ansible requirements are installed")
+def step_install(context):
+    real_ansible_requirements(
+        requirements_path=context.requirements_path,
+        cache_dir=context.galaxy_cache,
+    )
+
+
+@when("the Ansible requirements are installed into a fresh checkout")
+def step_install_fresh_checkout(context):
+    fresh = os.path.join(context.work_dir, "fresh-checkout")
+    os.makedirs(fresh)
+    shutil.copy(context.requirements_path, fresh)
+
+    context.ansible_dir = fresh
+    context.requirements_path = os.path.join(fresh, "requirements.yml")
+    step_install(context)
+
+
+@when('ansible-galaxy is upgraded to "{version}"')
+def step_upgrade_galaxy(context, version):
+    os.environ["FAKE_GALAXY_VERSION"] = version
+
+
+@then("ansible-galaxy should have installed {count:d} times")
+def step_install_count(context, count):
+    with open(context.galaxy_log) as f:
+        installs = f.read().splitlines()
+    assert len(installs) == count, f"ansible-galaxy ran: {installs}"
+
+
+@then('role "{role}" should be installed')
+def step_role_installed(context, role):
+    path = os.path.join(context.ansible_dir, "roles", role)
+    assert os.path.isdir(path), f"{path} missing"
+
+
+@then('collection "{collection}" should be installed')
+def step_collection_installed(context, collection):
+    namespace, name = collection.split(".")
+    path = os.path.join(
+        context.ansible_dir, "collections", "ansible_collections", namespace, name
+    )
+    assert os.path.isdir(path), f"{path} missing"
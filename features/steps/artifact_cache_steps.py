@@ -0,0 +1,155 @@
+from behave import given, when, then
+import hashlib
+import os
+import pathlib
+import tempfile
+
+import yaml
+
+from drydock_runner.artifact_cache import (
+    ArtifactCache,
+    ArtifactCacheError,
+    fetch_url,
+    write_playbook_vars,
+)
+
+
+@given("a local apt repository serving:")
+def step_local_repository(context):
+    context.repository_dir = tempfile.mkdtemp(prefix="drydock-apt-")
+    stanzas = []
+
+    for row in context.table:
+        filename = f"pool/{row['package']}_{row['version']}_{row['architecture']}.deb"
+        path = pathlib.Path(context.repository_dir, filename)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(f"{row['package']} {row['version']}\n".encode())
+
+        stanza = [
+            f"Package: {row['package']}",
+            f"Version: {row['version']}",
+            f"Architecture: {row['architecture']}",
+        ]
+        if row["depends"]:
+            stanza.append(f"Depends: {row['depends']}")
+        stanza += [
+            f"Filename: {filename}",
+            f"SHA256: {hashlib.sha256(path.read_bytes()).hexdigest()}",
+        ]
+        stanzas.append("\n".join(stanza))
+
+    pathlib.Path(context.repository_dir, "Packages").write_text(
+        "\n\n".join(stanzas) + "\n"
+    )
+    context.repository = pathlib.Path(context.repository_dir).as_uri() + "/"
+
+
+@given("an empty artifact cache")
+def step_empty_cache(context):
+    context.cache_dir = tempfile.mkdtemp(prefix="drydock-artifacts-")
+    context.fetched_urls = []
+    context.fetched_images = []
+
+
+@given('the repository\'s "{name}" is corrupted')
+def step_corrupt_package(context, name):
+    pathlib.Path(context.repository_dir, "pool", name).write_bytes(b"corrupted\n")
+
+
+def _prepare(context, architectures, packages=None, images=()):
+    def fetch(url, dest):
+        context.fetched_urls.append(url)
+        fetch_url(url, dest)
+
+    def fetch_image(image, dest, architecture):
+        context.fetched_images.append((image, architecture))
+        pathlib.Path(dest).write_text(f"{image} {architecture}\n")
+
+    cache = ArtifactCache(
+        cache_dir=context.cache_dir, fetch_func=fetch, image_fetch_func=fetch_image
+    )
+    context.urls_before = len(context.fetched_urls)
+    context.prepare_error = None
+
+    kwargs = {"repository": context.repository, "images": images}
+    if packages is not None:
+        kwargs["packages"] = packages
+
+    try:
+        context.playbook_vars = cache.prepare(
+            [a.strip() for a in architectures.split(",")], **kwargs
+        )
+    except ArtifactCacheError as exc:
+        context.prepare_error = exc
+
+
+@when('the artifact cache is prepared for "{architectures}"')
+def step_prepare(context, architectures):
+    _prepare(context, architectures)
+
+
+@when('the artifact cache is prepared with packages "{packages}" for "{architectures}"')
+def step_prepare_packages(context, packages, architectures):
+    _prepare(context, architectures, packages=packages.split(","))
+
+
+@when('the artifact cache is prepared with images "{images}" for "{architectures}"')
+def step_prepare_images(context, images, architectures):
+    _prepare(context, architectures, images=images.split(","))
+
+
+@then('the playbook vars should list these packages for "{architecture}":')
+def step_listed_packages(context, architecture):
+    assert context.prepare_error is None, context.prepare_error
+
+    # The vars go to ansible-playbook as a YAML file.
+    path = write_playbook_vars(
+        context.playbook_vars, os.path.join(context.cache_dir, "vars.yaml")
+    )
+    with open(path) as f:
+        debs = yaml.safe_load(f)["drydock_debs"][architecture]
+
+    assert all(os.path.isfile(deb) for deb in debs), debs
+    listed = sorted(os.path.basename(deb) for deb in debs)
+    expected = sorted(row["file"] for row in context.table)
+    assert listed == expected, listed
+
+
+@then("every package should have been downloaded once")
+def step_downloaded_once(context):
+    packages = [url for url in context.fetched_urls if url.endswith(".deb")]
+    assert len(packages) == len(set(packages)), packages
+    assert len(packages) == 9, packages
+
+
+@then("only the package index should have been downloaded again")
+def step_only_index(context):
+    fetched = context.fetched_urls[context.urls_before :]
+    assert fetched == [f"{context.repository}Packages"], fetched
+
+
+@then('preparing the artifact cache should fail naming "{text}"')
+def step_prepare_failed(context, text):
+    assert context.prepare_error is not None, "Preparing the cache succeeded"
+    assert text in str(context.prepare_error), str(context.prepare_error)
+
+
+@then('the artifact cache should not hold "{name}"')
+def step_not_cached(context, name):
+    held = [path.name for path in pathlib.Path(context.cache_dir).rglob("*.deb")]
+    assert name not in held, held
+    leftovers = list(pathlib.Path(context.cache_dir).rglob(".partial-*"))
+    assert not leftovers, leftovers
+
+
+@then("{count:d} images should have been fetched")
+def step_images_fetched(context, count):
+    assert len(context.fetched_images) == count, context.fetched_images
+
+
+@then("the playbook vars should list 1 image for each architecture")
+def step_images_listed(context):
+    images = context.playbook_vars["drydock_images"]
+    assert set(images) == {"arm64", "amd64"}, images
+    assert all(len(paths) == 1 for paths in images.values()), images
+    assert images["arm64"] != images["amd64"], images
@@ -0,0 +1,290 @@
+from behave import given, when, then
+import asyncio
+import errno
+
+# Import the real discovery logic; only the network underneath it is simulated.
+from drydock_runner.ip_discovery import (
+    discover_inaugural_ip,
+    DiscoveryError,
+    NeighbourTableSource,
+    SubnetScanner,
+    iter_ssh_hosts,
+)
+
+DEFAULT_SSH_BANNER = "SSH-2.0-OpenSSH_9.6p1 Ubuntu-3ubuntu13\r\n"
+
+
+class FakeWriter:
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+class FakeSubnet:
+    """
+    Stands in for the VLAN. Each address is given a behaviour:
+
+      "unreachable"  nothing at this address, fails straight away
+      "hang"         connect never completes, so the scanner times out
+      "refuse"       a host is up but nothing listens on port 22
+      "banner"       port 22 accepts and sends self.banners[ip]
+    """
+
+    def __init__(self):
+        self.default = "unreachable"
+        self.hosts = {}
+        self.banners = {}
+        self.probes = {}
+        self.order = []
+        self.appears_after = {}
+        self.silent_for = {}
+        self.vanishes_after = {}
+
+    def behaviour_for(self, ip):
+        count = self.probes[ip]
+
+        if ip in self.appears_after and count <= self.appears_after[ip]:
+            return "refuse"
+
+        if ip in self.silent_for and count <= self.silent_for[ip]:
+            return "unreachable"
+
+        if ip in self.vanishes_after and count > self.vanishes_after[ip]:
+            return "unreachable"
+
+        return self.hosts.get(ip, self.default)
+
+    async def open_connection(self, host, port):
+        self.probes[host] = self.probes.get(host, 0) + 1
+        self.order.append(host)
+        behaviour = self.behaviour_for(host)
+
+        if behaviour == "hang":
+            await asyncio.sleep(3600)
+
+        if behaviour == "unreachable":
+            raise OSError(errno.EHOSTUNREACH, "No route to host")
+
+        if behaviour == "refuse":
+            raise ConnectionRefusedError(errno.ECONNREFUSED, "Connection refused")
+
+        reader = asyncio.StreamReader()
+        reader.feed_data(self.banners.get(host, DEFAULT_SSH_BANNER).encode())
+        reader.feed_eof()
+        return reader, FakeWriter()
+
+
+def _subnet(context):
+    if not hasattr(context, "subnet"):
+        context.subnet = FakeSubnet()
+    return context.subnet
+
+
+@given('the discovery subnet is "{cidr}"')
+def step_discovery_subnet(context, cidr):
+    context.cidr = cidr
+    _subnet(context)
+
+
+@given("the discovery retry interval is {seconds:d} seconds")
+def step_retry_interval(context, seconds):
+    context.retry_interval = seconds
+
+
+@given("the discovery total timeout is {seconds:d} seconds")
+def step_total_timeout(context, seconds):
+    context.total_timeout = seconds
+
+
+@given('the subnet contains a single SSH host at "{ip}"')
+@given('the subnet contains a SSH host at "{ip}"')
+@given('the subnet also contains a SSH host at "{ip}"')
+def step_ssh_host(context, ip):
+    _subnet(context).hosts[ip] = "banner"
+
+
+@given("the subnet initially has no SSH hosts")
+@given("the subnet contains no SSH hosts")
+def step_no_ssh_hosts(context):
+    _subnet(context).hosts.clear()
+
+
+@given('after {retries:d} retries an SSH host appears at "{ip}"')
+def step_host_appears(context, retries, ip):
+    subnet = _subnet(context)
+    subnet.hosts[ip] = "banner"
+    subnet.appears_after[ip] = retries
+    context.appearing_ip = ip
+    context.expected_retries = retries
+
+
+@given('after {retries:d} retries a silent address "{ip}" starts answering SSH')
+def step_silent_host_appears(context, retries, ip):
+    subnet = _subnet(context)
+    subnet.hosts[ip] = "banner"
+    subnet.silent_for[ip] = retries
+
+
+@given('the subnet contains a host at "{ip}" with port 22 open')
+@given('the subnet contains a host at "{ip}"')
+def step_open_host(context, ip):
+    _subnet(context).hosts[ip] = "banner"
+    context.open_host = ip
+
+
+@given('the subnet contains a host at "{ip}" that refuses connections')
+def step_refusing_host(context, ip):
+    _subnet(context).hosts[ip] = "refuse"
+
+
+@given('the neighbour table is "{path}"')
+def step_neighbour_table(context, path):
+    context.candidate_sources = (NeighbourTableSource(path),)
+
+
+@given("the host returns a non-SSH banner")
+def step_non_ssh_banner(context):
+    _subnet(context).banners[context.open_host] = "220 mail.example.com ESMTP\r\n"
+
+
+@given('the SSH banner is "{banner}"')
+def step_ssh_banner(context, banner):
+    _subnet(context).banners[context.open_host] = f"{banner}\r\n"
+
+
+@given("all TCP connection attempts on port 22 time out")
+def step_all_time_out(context):
+    subnet = _subnet(context)
+    subnet.hosts.clear()
+    subnet.default = "hang"
+
+
+@given('an SSH host appears only for one scan at "{ip}"')
+def step_host_flickers(context, ip):
+    subnet = _subnet(context)
+    subnet.hosts[ip] = "banner"
+    subnet.vanishes_after[ip] = 1
+    context.flicker_ip = ip
+
+
+@given("it disappears on subsequent scans")
+def step_host_vanishes(context):
+    assert _subnet(context).vanishes_after[context.flicker_ip] == 1
+
+
+@when("autodiscovery runs")
+def step_run_discovery(context):
+    context.discovery_result = None
+    context.discovery_exception = None
+
+    try:
+        context.discovery_result = discover_inaugural_ip(
+            cidr=context.cidr,
+            retry_interval=context.retry_interval,
+            total_timeout=context.total_timeout,
+            connect_func=context.subnet.open_connection,
+            candidate_sources=getattr(context, "candidate_sources", ()),
+        )
+    except DiscoveryError as exc:
+        context.discovery_exception = exc
+
+
+@when("streaming discovery runs until {count:d} hosts are found")
+def step_run_streaming_discovery(context, count):
+    context.streamed_hosts = []
+
+    for host in iter_ssh_hosts(
+        cidr=context.cidr,
+        retry_interval=context.retry_interval,
+        total_timeout=context.total_timeout,
+        connect_func=context.subnet.open_connection,
+        candidate_sources=(),
+    ):
+        context.streamed_hosts.append(host)
+
+        if len(context.streamed_hosts) == count:
+            break
+
+
+@when("the subnet is scanned twice, one retry interval apart")
+def step_scan_twice(context):
+    scanner = SubnetScanner(
+        context.cidr,
+        retry_interval=context.retry_interval,
+        connect_func=_subnet(context).open_connection,
+        candidate_sources=(),
+    )
+
+    async def two_rounds():
+        async for _ in scanner.scan_round():
+            pass
+        await asyncio.sleep(scanner.retry_interval)
+        async for _ in scanner.scan_round():
+            pass
+
+    asyncio.run(two_rounds())
+
+
+@then('"{ip}" should have been probed {count:d} time')
+@then('"{ip}" should have been probed {count:d} times')
+def step_probed_times(context, ip, count):
+    probes = context.subnet.probes.get(ip, 0)
+    assert probes == count, f"{ip} was probed {probes} times"
+
+
+@then('the result should be "{ip}"')
+def step_result_is(context, ip):
+    assert (
+        context.discovery_exception is None
+    ), f"Discovery failed: {context.discovery_exception}"
+    assert context.discovery_result == ip, f"Got {context.discovery_result}"
+
+
+@then('autodiscovery should fail with "{message}"')
+def step_discovery_fails(context, message):
+    assert context.discovery_exception is not None, "Discovery did not fail."
+    assert message in str(
+        context.discovery_exception
+    ), f"Unexpected error: {context.discovery_exception}"
+
+
+@then("autodiscovery should have retried at least {retries:d} times")
+def step_retried(context, retries):
+    probes = context.subnet.probes[context.appearing_ip]
+    assert probes > retries, f"{context.appearing_ip} was only probed {probes} times"
+
+
+@then("autodiscovery should accept the first stable detection")
+def step_first_detection(context):
+    assert context.subnet.probes[context.flicker_ip] == 1
+
+
+@then('"{busy_ip}" should have been probed more often than "{quiet_ip}"')
+def step_probed_more_often(context, busy_ip, quiet_ip):
+    busy = context.subnet.probes[busy_ip]
+    quiet = context.subnet.probes[quiet_ip]
+    assert busy > quiet, f"{busy_ip} probed {busy} times, {quiet_ip} {quiet} times"
+
+
+@then('"{addresses}" should have been probed first')
+def step_probed_first(context, addresses):
+    expected = {ip.strip() for ip in addresses.split(",")}
+    first = set(context.subnet.order[: len(expected)])
+    assert first == expected, f"Probed {sorted(first)} first"
+
+
+@then('the streamed hosts should be "{addresses}"')
+def step_streamed_hosts(context, addresses):
+    expected = sorted(ip.strip() for ip in addresses.split(","))
+    streamed = sorted(host.ip for host in context.streamed_hosts)
+    assert streamed == expected, f"Streamed {streamed}"
+
+
+@then('every streamed host should report SSH version "{version}"')
+def step_streamed_version(context, version):
+    for host in context.streamed_hosts:
+        assert host.ssh_version == version, f"{host.ip}: {host.ssh_version}"
+        assert host.banner.startswith("SSH-"), f"{host.ip}: {host.banner}"
+        assert host.first_seen > 0
@@ -0,0 +1,208 @@
+from behave import given, when, then
+import contextlib
+import copy
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.startup_benchmark import CONFIG
+from drydock_runner.checkpoints import CheckpointStore
+from drydock_runner.cluster_build import run_bootstrap
+from drydock_runner.config import BootstrapConfig
+from drydock_runner.kubeconfig_fetcher import REMOTE_KUBECONFIG_PATH
+from drydock_runner.main import _checkpoint_file
+from drydock_runner.orchestration import OrchestrationError
+
+KUBECONFIG = """\
+apiVersion: v1
+kind: Config
+clusters:
+- name: kubernetes
+  cluster:
+    server: https://10.0.0.1:6443
+"""
+
+
+class FakeConnections:
+    """
+    Stands in for SSHConnectionManager on a node that has a kubeconfig
+    until told otherwise.
+    """
+
+    def __init__(self):
+        self.has_kubeconfig = True
+
+    def exec(self, host, command):
+        if command == f"test -s {REMOTE_KUBECONFIG_PATH}":
+            return (0 if self.has_kubeconfig else 1), "", ""
+        return 0, "", ""
+
+    def sftp(self, host):
+        return self
+
+    def open(self, path, mode):
+        return io.BytesIO(KUBECONFIG.encode())
+
+    def close(self, host=None):
+        pass
+
+
+@given("a node that answers at its static IP")
+def step_node(context):
+    context.connections = FakeConnections()
+    context.counts = {"assign": 0, "playbook": 0}
+    context.apply_failures = 0
+    context.config_fingerprint = "original"
+    context.phase_barrier = None
+    context.phase_intervals = {}
+    context.clone_error = None
+
+
+@given("a checkpoint store")
+def step_checkpoint_store(context):
+    context.cache_dir = tempfile.mkdtemp(prefix="drydock-checkpoints-")
+    context.checkpoints = CheckpointStore(
+        os.path.join(context.cache_dir, "checkpoints.json")
+    )
+
+
+@given("the root Application apply fails once")
+def step_apply_fails_once(context):
+    context.apply_failures = 1
+
+
+@when("the node loses its kubeconfig")
+def step_lose_kubeconfig(context):
+    context.connections.has_kubeconfig = False
+
+
+@contextlib.contextmanager
+def _phase(context, name):
+    """
+    Record when the fake phase called name starts and ends, first waiting
+    at context.phase_barrier if a scenario has set one.
+    """
+    started = time.monotonic()
+    if context.phase_barrier is not None:
+        context.phase_barrier.wait()
+    yield
+    context.phase_intervals[name] = (started, time.monotonic())
+
+
+def _run(context):
+    counts = context.counts
+
+    class FakeAssigner:
+        def __init__(self, **kwargs):
+            pass
+
+        def assign(self, **kwargs):
+            with _phase(context, "static IP assignment"):
+                counts["assign"] += 1
+
+    def clone():
+        with _phase(context, "cloning"):
+            if context.clone_error:
+                raise RuntimeError(context.clone_error)
+        return {"config": tmp_dir}
+
+    def galaxy():
+        with _phase(context, "the galaxy install"):
+            pass
+
+    def playbook(ip):
+        counts["playbook"] += 1
+        context.connections.has_kubeconfig = True
+
+    def apply(**kwargs):
+        if context.apply_failures:
+            context.apply_failures -= 1
+            raise RuntimeError("API server unavailable")
+
+    tmp_dir = tempfile.mkdtemp(prefix="drydock-run-")
+    context.bootstrap_error = None
+
+    try:
+        context.bootstrap_result = run_bootstrap(
+            static_ip="10.0.0.1",
+            gateway="10.0.0.254",
+            cidr="10.0.0.0/24",
+            nameservers=["10.0.0.254"],
+            hostname="k8s-1",
+            tmp_dir=tmp_dir,
+            ansible_playbook_func=playbook,
+            ansible_install_func=galaxy,
+            clone_func=clone,
+            kubectl_apply_func=apply,
+            node_ip_address="10.0.0.50",
+            static_ip_assigner_func=FakeAssigner,
+            connection_manager=context.connections,
+            checkpoints=context.checkpoints,
+            config_fingerprint=context.config_fingerprint,
+        )
+    except OrchestrationError as exc:
+        context.bootstrap_error = exc
+
+
+@when("the bootstrap is run")
+def step_run(context):
+    _run(context)
+
+
+@when("the bootstrap is run with a different configuration")
+def step_run_changed(context):
+    context.config_fingerprint = "changed"
+    _run(context)
+
+
+@then("the bootstrap should fail")
+def step_failed(context):
+    assert context.bootstrap_error is not None, "Bootstrap did not fail"
+
+
+@then("the bootstrap should succeed")
+def step_succeeded(context):
+    assert context.bootstrap_error is None, context.bootstrap_error
+    assert context.bootstrap_result.success is True
+
+
+@then("static IP assignment should have run {count:d} time")
+@then("static IP assignment should have run {count:d} times")
+def step_assign_count(context, count):
+    assert context.counts["assign"] == count, context.counts
+
+
+@then("the playbook should have run {count:d} time")
+@then("the playbook should have run {count:d} times")
+def step_playbook_count(context, count):
+    assert context.counts["playbook"] == count, context.counts
+
+
+@when(
+    'checkpoint files are chosen for "{first}" and "{second}", neither with an '
+    "inaugural hostname"
+)
+def step_checkpoint_files(context, first, second):
+    context.checkpoint_files = []
+
+    for name in (first, second):
+        document = copy.deepcopy(CONFIG)
+        document["metadata"]["name"] = name
+        del document["spec"]["inauguralNode"]["hostname"]
+        cfg = BootstrapConfig(**document)
+        context.checkpoint_files.append(
+            _checkpoint_file("/cache", cfg, f"/configs/{name}.yaml")
+        )
+
+
+@then("the two checkpoint files should differ")
+def step_checkpoint_files_differ(context):
+    first, second = context.checkpoint_files
+    assert first != second, context.checkpoint_files
+
+
+@then('neither checkpoint file should be named "{name}"')
+def step_checkpoint_file_not_named(context, name):
+    names = [os.path.basename(path) for path in context.checkpoint_files]
+    assert name not in names, names
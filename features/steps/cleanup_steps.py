@@ -17,7 +17,9 @@ def step_run_cleanup(context):
     context.cleanup_result = None
 
     try:
-        context.cleanup_result = run_cleanup(context.tmp_dir)
+        context.cleanup_result = run_cleanup(
+            context.tmp_dir, control_masters=getattr(context, "control_masters", None)
+        )
     except Exception as exc:
         context.cleanup_exception = exc
 
@@ -2,42 +2,70 @@ from behave import given, when, then
 import os
 import tempfile
 
-# Import the real bootstrap orchestration function.
-from drydock_runner import run_bootstrap
+# Run the real bootstrap workflow against a simulated node on loopback.
+from benchmarks.fake_cluster import FakeCluster, fake_tools
+from drydock_runner.clean import run_cleanup
+from drydock_runner.ssh_control import SSHControlMasters
 
 
 @given("valid environment configuration")
 def step_valid_env(context):
-    # Acceptance tests should not care about low level details.
-    # We simply ensure the environment variables your tool expects exist.
-    os.environ["TF_BACKEND_BUCKET"] = "bootstrap-test-bucket"
-    os.environ["TF_BACKEND_KEY"] = "bootstrap-test-key"
-    os.environ["TF_BACKEND_REGION"] = "eu-west-2"
+    # The fake cluster supplies the network settings and stand-ins for
+    # git, ansible and kubectl, so there is nothing else to configure.
+    context.node_count = 1
 
 
 @given("a new machine is available on the network")
 def step_machine_available(context):
-    # For acceptance tests we do not attempt to simulate real network state.
-    # Instead we supply the IP address that the bootstrap workflow would receive.
-    context.machine_ip = "192.168.8.50"
+    # A fake node answers SSH on a loopback address, waiting to be
+    # discovered and given its static IP.
+    context.cluster = FakeCluster(node_count=context.node_count).__enter__()
+    context.add_cleanup(context.cluster.__exit__, None, None, None)
+
+
+@given("{count:d} new machines are available on the network")
+def step_machines_available(context, count):
+    context.node_count = count
+    step_machine_available(context)
 
 
 @when("the operator runs the bootstrap tool")
 def step_run_bootstrap(context):
-    # The bootstrap tool usually needs a workspace.
     # Behave scenarios should work in isolated temporary directories.
     context.tmp_dir = tempfile.mkdtemp(prefix="bootstrap-e2e-")
 
     # The run_bootstrap call should encapsulate the full workflow.
     # The behaviour test asserts only the top level result, not the internal calls.
     try:
-        context.bootstrap_result = run_bootstrap(
-            tmp_dir=context.tmp_dir, machine_ip=context.machine_ip
+        context.bootstrap_result = context.cluster.bootstrap(context.tmp_dir)
+    except Exception as exc:
+        context.bootstrap_exception = exc
+
+
+@when("the operator runs the bootstrap tool with SSH control masters")
+def step_run_bootstrap_control_masters(context):
+    context.tmp_dir = tempfile.mkdtemp(prefix="bootstrap-e2e-")
+    context.run_dir = os.path.join(context.tmp_dir, "run")
+    context.ssh_log = os.path.join(context.tmp_dir, "ssh.log")
+    context.control_masters = SSHControlMasters(
+        os.path.join(context.run_dir, "ssh"), ssh_password="bootstrap"
+    )
+
+    try:
+        context.bootstrap_result = context.cluster.bootstrap(
+            context.tmp_dir, control_masters=context.control_masters
         )
     except Exception as exc:
         context.bootstrap_exception = exc
 
 
+@when("the run is cleaned up")
+def step_run_cleaned_up(context):
+    # With the same stand-in ssh the bootstrap ran with.
+    with fake_tools(context.cluster.latencies, context.tmp_dir):
+        run_cleanup(context.run_dir, control_masters=context.control_masters)
+
+
 @then("the cluster is ready for GitOps takeover")
 def step_cluster_ready(context):
     # A real acceptance test checks observable success criteria.
@@ -49,7 +77,19 @@ def step_cluster_ready(context):
     assert context.bootstrap_result is not None, "Bootstrap tool returned no result."
 
     # The result object should indicate success in a stable, intentional way.
-    # Adjust this depending on your actual return type or status model.
     assert (
         context.bootstrap_result.success is True
     ), "Bootstrap tool did not report success."
+
+
+@then("every node has been provisioned")
+def step_every_node_provisioned(context):
+    results = context.bootstrap_result.node_results
+    assert len(results) == context.node_count, results
+    assert all(result.success for result in results.values()), results
+
+
+@then('the SSH log for every node should read "{expected}"')
+def step_ssh_log_every_node(context, expected):
+    for ip in context.bootstrap_result.node_results:
+        context.execute_steps(f'Then the SSH log for "{ip}" should read "{expected}"')
@@ -0,0 +1,95 @@
+from behave import given, when, then
+import copy
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.startup_benchmark import CONFIG, REPO_ROOT, parse_importtime
+
+
+def _write_config(context, config):
+    work_dir = tempfile.mkdtemp(prefix="drydock-cli-")
+    context.cache_dir = os.path.join(work_dir, "cache")
+    context.config_path = os.path.join(work_dir, "config.yaml")
+    with open(context.config_path, "w") as f:
+        json.dump(config, f)
+    os.chmod(context.config_path, 0o600)
+
+
+@given("a valid configuration file")
+def step_valid_config(context):
+    _write_config(context, CONFIG)
+
+
+def _section(config, key):
+    *parents, name = key.split(".")
+    for parent in parents:
+        config = config[parent]
+    return config, name
+
+
+@given('a configuration file without "{key}"')
+def step_config_without(context, key):
+    config = copy.deepcopy(CONFIG)
+    section, name = _section(config, key)
+    del section[name]
+    _write_config(context, config)
+
+
+@given('a configuration file with "{key}" set to {value}')
+def step_config_with(context, key, value):
+    config = copy.deepcopy(CONFIG)
+    section, name = _section(config, key)
+    section[name] = json.loads(value)
+    _write_config(context, config)
+
+
+@given("a copy of drydock_runner without config-schema.yaml")
+def step_copy_without_schema(context):
+    context.drydock_root = tempfile.mkdtemp(prefix="drydock-copy-")
+    shutil.copytree(
+        os.path.join(REPO_ROOT, "drydock_runner"),
+        os.path.join(context.drydock_root, "drydock_runner"),
+        ignore=shutil.ignore_patterns("__pycache__"),
+    )
+
+
+@when('drydock is run with "{arguments}"')
+def step_run_drydock(context, arguments):
+    args = arguments.split()
+    if args[0] in ("validate", "discover"):
+        args += ["--config", context.config_path]
+
+    context.command = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "drydock_runner", *args],
+        cwd=getattr(context, "drydock_root", REPO_ROOT),
+        env={**os.environ, "DRYDOCK_CACHE_DIR": context.cache_dir},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+
+@then('the command should exit with status {status:d}, printing "{text}"')
+def step_command_exit(context, status, text):
+    command = context.command
+    assert command.returncode == status, (command.returncode, command.stderr)
+    assert text in command.stdout, command.stdout
+
+
+@then('the command should have warned "{text}"')
+def step_command_warned(context, text):
+    warnings = [
+        line for line in context.command.stdout.splitlines() if "[WARN]" in line
+    ]
+    assert any(text in line for line in warnings), context.command.stdout
+
+
+@then('"{module}" should not have been imported')
+def step_not_imported(context, module):
+    imported = {name for name, _, _, _ in parse_importtime(context.command.stderr)}
+    assert imported, "No -X importtime output"
+    assert module not in imported, f"{module} was imported"
@@ -0,0 +1,87 @@
+from behave import given, when, then
+import copy
+import json
+import os
+import pathlib
+import tempfile
+
+from benchmarks.startup_benchmark import CONFIG
+from drydock_runner import loader
+
+
+@given("a configuration file and an empty configuration cache")
+def step_config_and_cache(context):
+    work_dir = tempfile.mkdtemp(prefix="drydock-config-")
+    context.config_path = os.path.join(work_dir, "config.yaml")
+    context.config_cache = os.path.join(work_dir, "cache")
+    context.config_document = copy.deepcopy(CONFIG)
+    _write(context)
+
+    context.parses = 0
+    parse = loader._parse
+
+    def counting_parse(data, path):
+        context.parses += 1
+        return parse(data, path)
+
+    loader._parse = counting_parse
+    context.add_cleanup(setattr, loader, "_parse", parse)
+
+
+def _write(context):
+    with open(context.config_path, "w") as f:
+        json.dump(context.config_document, f)
+
+
+def _load(context):
+    context.loaded = loader.load_config(
+        context.config_path, cache_dir=context.config_cache
+    )
+
+
+@given("the configuration has been loaded")
+def step_loaded(context):
+    _load(context)
+    context.parses = 0
+
+
+@given("every cached configuration is corrupted")
+def step_corrupt_cache(context):
+    for path in pathlib.Path(context.config_cache).glob("*.json"):
+        path.write_text("{not json")
+
+
+@when("the configuration is loaded {count:d} time")
+@when("the configuration is loaded {count:d} times")
+def step_load(context, count):
+    for _ in range(count):
+        _load(context)
+
+
+@when("the configuration is loaded by a new process")
+def step_load_fresh(context):
+    # A new process starts without the in-memory copies.
+    loader._loaded.clear()
+    _load(context)
+
+
+@when('the configuration\'s metadata.name is changed to "{name}"')
+def step_change_config(context, name):
+    context.config_document["metadata"]["name"] = name
+    _write(context)
+
+
+@when('the loaded configuration\'s metadata.name is changed to "{name}"')
+def step_change_loaded(context, name):
+    context.loaded.metadata.name = name
+
+
+@then("it should have been parsed {count:d} time")
+@then("it should have been parsed {count:d} times")
+def step_parsed(context, count):
+    assert context.parses == count, context.parses
+
+
+@then('the loaded configuration should name "{name}"')
+def step_loaded_name(context, name):
+    assert context.loaded.metadata.name == name, context.loaded.metadata.name
@@ -0,0 +1,192 @@
+from behave import given, when, then
+import os
+import tempfile
+import threading
+import time
+
+import yaml
+
+from drydock_runner.kube_client import KubeClient, load_manifests, server_side_apply
+from features.fixtures.fake_kube_api import FakeKubeAPI
+
+
+@given("a fake Kubernetes API server")
+def step_fake_api(context):
+    context.api = FakeKubeAPI(token="bootstrap-token").start()
+    context.add_cleanup(context.api.stop)
+
+
+@given("a kubeconfig for the fake API server")
+def step_kubeconfig(context):
+    context.work_dir = tempfile.mkdtemp(prefix="drydock-kube-")
+    context.kubeconfig_path = os.path.join(context.work_dir, "config")
+
+    with open(context.kubeconfig_path, "w") as f:
+        f.write(context.api.kubeconfig())
+
+
+def _write_manifests(context, files):
+    context.manifest_dir = os.path.join(context.work_dir, "manifests")
+    os.makedirs(context.manifest_dir, exist_ok=True)
+
+    for name, documents in files.items():
+        with open(os.path.join(context.manifest_dir, name), "w") as f:
+            yaml.safe_dump_all(documents, f)
+
+
+def _object(api_version, kind, name, namespace=None, **fields):
+    metadata = {"name": name}
+    if namespace:
+        metadata["namespace"] = namespace
+    return {"apiVersion": api_version, "kind": kind, "metadata": metadata, **fields}
+
+
+@given("a manifest directory with a Namespace, a ConfigMap and a Deployment")
+def step_basic_manifests(context):
+    _write_manifests(
+        context,
+        {
+            "app.yaml": [
+                _object("v1", "ConfigMap", "settings", "lab", data={"a": "1"}),
+                _object("apps/v1", "Deployment", "web", "lab", spec={"replicas": 1}),
+            ],
+            "namespace.yaml": [_object("v1", "Namespace", "lab")],
+        },
+    )
+
+
+@given("a manifest directory with {count:d} ConfigMaps")
+def step_many_configmaps(context, count):
+    _write_manifests(
+        context,
+        {
+            "configmaps.yaml": [
+                _object("v1", "ConfigMap", f"settings-{i}", "default")
+                for i in range(count)
+            ]
+        },
+    )
+
+
+@given("a manifest directory with an ArgoCD Application and its CRD")
+def step_crd_manifests(context):
+    _write_manifests(
+        context,
+        {
+            "root-application.yaml": [
+                _object(
+                    "argoproj.io/v1alpha1",
+                    "Application",
+                    "root",
+                    "argocd",
+                    spec={"project": "default"},
+                ),
+                _object(
+                    "apiextensions.k8s.io/v1",
+                    "CustomResourceDefinition",
+                    "applications.argoproj.io",
+                ),
+            ]
+        },
+    )
+
+
+@when("the manifest directory is applied")
+def step_apply(context):
+    server_side_apply(
+        kubeconfig_path=context.kubeconfig_path,
+        manifest_path=context.manifest_dir,
+    )
+
+
+@then("the API server should store the Namespace, the ConfigMap and the Deployment")
+def step_basic_stored(context):
+    for path in (
+        "/api/v1/namespaces/lab",
+        "/api/v1/namespaces/lab/configmaps/settings",
+        "/apis/apps/v1/namespaces/lab/deployments/web",
+    ):
+        assert path in context.api.objects, list(context.api.objects)
+
+
+@then('every object should have been applied by the "{manager}" field manager')
+def step_field_manager(context, manager):
+    patches = [query for method, _, query in context.api.requests if method == "PATCH"]
+    assert patches, "Nothing was applied"
+    for query in patches:
+        assert query.get("fieldManager") == [manager], query
+        assert query.get("force") == ["true"], query
+
+
+@then('API discovery should have been fetched once for "{group_version}"')
+def step_discovery_cached(context, group_version):
+    path = f"/api/{group_version}"
+    fetches = [p for method, p, _ in context.api.requests if p == path]
+    assert len(fetches) == 1, f"{path} fetched {len(fetches)} times"
+
+
+@then("the API server should have seen at most {count:d} connections")
+def step_connections(context, count):
+    assert context.api.connections <= count, f"{context.api.connections} connections"
+
+
+@then("the API server should store the Application")
+def step_application_stored(context):
+    path = "/apis/argoproj.io/v1alpha1/namespaces/argocd/applications/root"
+    assert path in context.api.objects, list(context.api.objects)
+
+
+@given('discovery of "{group_version}" takes {seconds:d} seconds')
+def step_slow_discovery(context, group_version, seconds):
+    context.api.discovery_delay[group_version] = seconds
+
+
+@when("a Deployment and a ConfigMap are looked up at the same time")
+def step_concurrent_lookup(context):
+    client = KubeClient.from_kubeconfig(context.kubeconfig_path)
+    context.add_cleanup(client.close)
+    context.lookup_seconds = {}
+    started = time.monotonic()
+
+    def look_up(api_version, kind):
+        client.resource_for(api_version, kind)
+        context.lookup_seconds[kind] = time.monotonic() - started
+
+    threads = [
+        threading.Thread(target=look_up, args=("apps/v1", "Deployment")),
+        threading.Thread(target=look_up, args=("v1", "ConfigMap")),
+    ]
+    threads[0].start()
+    time.sleep(0.2)
+    threads[1].start()
+    for thread in threads:
+        thread.join()
+
+
+@then("the ConfigMap should have been resolved within {seconds:d} second")
+def step_lookup_fast(context, seconds):
+    elapsed = context.lookup_seconds["ConfigMap"]
+    assert elapsed < seconds, f"ConfigMap took {elapsed:.2f}s"
+    assert "Deployment" in context.lookup_seconds, "Deployment was not resolved"
+
+
+@given("a manifest file holding a list of strings")
+def step_list_manifest(context):
+    context.manifest_file = os.path.join(context.work_dir, "broken.yaml")
+    with open(context.manifest_file, "w") as f:
+        f.write("- nginx\n- redis\n")
+
+
+@when("the manifest file is loaded")
+def step_load_manifest(context):
+    try:
+        load_manifests(context.manifest_file)
+        context.load_error = None
+    except Exception as exc:
+        context.load_error = exc
+
+
+@then("loading should fail with a ValueError naming the manifest file")
+def step_load_failed(context):
+    assert isinstance(context.load_error, ValueError), repr(context.load_error)
+    assert context.manifest_file in str(context.load_error), context.load_error
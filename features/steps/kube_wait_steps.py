@@ -0,0 +1,270 @@
+from behave import given, when, then
+import os
+import threading
+import time
+
+import yaml
+
+from drydock_runner.kube_client import KubeClient
+from drydock_runner.kube_wait import (
+    wait_for_cluster_ready,
+    wait_for_nodes_ready,
+    wait_for_object,
+)
+from drydock_runner.readiness import ReadinessTimeoutError
+
+CRD_PATH = (
+    "/apis/apiextensions.k8s.io/v1/customresourcedefinitions/applications.argoproj.io"
+)
+
+
+def _deployment_path(namespace, name):
+    return f"/apis/apps/v1/namespaces/{namespace}/deployments/{name}"
+
+
+def _application_path(namespace, name):
+    return f"/apis/argoproj.io/v1alpha1/namespaces/{namespace}/applications/{name}"
+
+
+def _ready_condition(ready):
+    return {"conditions": [{"type": "Ready", "status": "True" if ready else "False"}]}
+
+
+def _client(context):
+    client = KubeClient.from_kubeconfig(context.kubeconfig_path)
+    context.add_cleanup(client.close)
+    return client
+
+
+def _later(context, seconds, change):
+    def run():
+        change()
+        context.changed_at = time.monotonic()
+
+    timer = threading.Timer(seconds, run)
+    timer.start()
+    context.add_cleanup(timer.cancel)
+
+
+def _timed_wait(context, wait):
+    context.wait_error = None
+    try:
+        context.wait_result = wait()
+    except ReadinessTimeoutError as exc:
+        context.wait_error = exc
+    context.finished_at = time.monotonic()
+
+
+@given("the fake API server ends watches after {seconds:g} seconds")
+def step_short_watches(context, seconds):
+    context.api.max_watch_seconds = seconds
+
+
+@given(
+    'the API server has a Deployment "{namespace}/{name}" with no available replicas'
+)
+def step_deployment(context, namespace, name):
+    context.api.store(
+        _deployment_path(namespace, name),
+        {
+            "apiVersion": "apps/v1",
+            "kind": "Deployment",
+            "metadata": {"name": name, "namespace": namespace},
+            "spec": {"replicas": 1},
+            "status": {"replicas": 1},
+        },
+    )
+
+
+@given("the API server has {count:d} nodes, {ready:d} of them Ready")
+def step_nodes(context, count, ready):
+    context.node_paths = [f"/api/v1/nodes/node-{i}" for i in range(count)]
+
+    for i, path in enumerate(context.node_paths):
+        context.api.store(
+            path,
+            {
+                "apiVersion": "v1",
+                "kind": "Node",
+                "metadata": {"name": f"node-{i}"},
+                "status": _ready_condition(i < ready),
+            },
+        )
+
+
+@given(
+    'the API server has an ArgoCD Application "{namespace}/{name}" that is Progressing'
+)
+def step_application(context, namespace, name):
+    context.api.store(
+        CRD_PATH,
+        {
+            "apiVersion": "apiextensions.k8s.io/v1",
+            "kind": "CustomResourceDefinition",
+            "metadata": {"name": "applications.argoproj.io"},
+        },
+    )
+    context.api.store(
+        _application_path(namespace, name),
+        {
+            "apiVersion": "argoproj.io/v1alpha1",
+            "kind": "Application",
+            "metadata": {"name": name, "namespace": namespace},
+            "status": {"health": {"status": "Progressing"}},
+        },
+    )
+
+
+@given('a root Application manifest for "{namespace}/{name}"')
+def step_root_manifest(context, namespace, name):
+    context.manifest_path = os.path.join(context.work_dir, "root-application.yaml")
+
+    with open(context.manifest_path, "w") as f:
+        yaml.safe_dump(
+            {
+                "apiVersion": "argoproj.io/v1alpha1",
+                "kind": "Application",
+                "metadata": {"name": name, "namespace": namespace},
+            },
+            f,
+        )
+
+
+@when("the Deployment becomes available after {seconds:g} seconds")
+def step_deployment_available(context, seconds):
+    path = _deployment_path("argocd", "argocd-server")
+    _later(
+        context,
+        seconds,
+        lambda: context.api.update_status(path, {"availableReplicas": 1}),
+    )
+
+
+@when(
+    "the watch history is compacted and every node becomes Ready after "
+    "{seconds:g} seconds"
+)
+def step_compact_and_ready(context, seconds):
+    def change():
+        context.api.compact()
+        for path in context.node_paths:
+            context.api.update_status(path, _ready_condition(True))
+
+    _later(context, seconds, change)
+
+
+@when("the cluster becomes ready after {seconds:g} seconds")
+def step_cluster_ready(context, seconds):
+    def change():
+        context.api.update_status("/api/v1/nodes/node-0", _ready_condition(True))
+        context.api.update_status(
+            _deployment_path("argocd", "argocd-server"), {"availableReplicas": 1}
+        )
+        context.api.update_status(
+            _application_path("argocd", "root"), {"health": {"status": "Healthy"}}
+        )
+
+    _later(context, seconds, change)
+
+
+@when("{count:d} more nodes join and become Ready after {seconds:g} seconds")
+def step_nodes_join(context, count, seconds):
+    first = len(context.node_paths)
+
+    def change():
+        for i in range(first, first + count):
+            path = f"/api/v1/nodes/node-{i}"
+            context.api.store(
+                path,
+                {
+                    "apiVersion": "v1",
+                    "kind": "Node",
+                    "metadata": {"name": f"node-{i}"},
+                    "status": _ready_condition(True),
+                },
+            )
+            context.node_paths.append(path)
+
+    _later(context, seconds, change)
+
+
+@when('I wait up to {timeout:g} seconds for the {kind} "{namespace}/{name}"')
+def step_wait_for_object(context, timeout, kind, namespace, name):
+    api_version = {
+        "Deployment": "apps/v1",
+        "Application": "argoproj.io/v1alpha1",
+    }[kind]
+    client = _client(context)
+
+    _timed_wait(
+        context,
+        lambda: wait_for_object(
+            client, api_version, kind, name, namespace=namespace, timeout=timeout
+        ),
+    )
+
+
+@when("I wait up to {timeout:g} seconds for {count:d} Ready nodes")
+def step_wait_for_nodes(context, timeout, count):
+    client = _client(context)
+    _timed_wait(context, lambda: wait_for_nodes_ready(client, count, timeout=timeout))
+
+
+@when("I wait for the cluster to be ready")
+def step_wait_for_cluster(context):
+    step_wait_for_cluster_of(context, 1)
+
+
+@when("I wait for a {count:d} node cluster to be ready")
+def step_wait_for_cluster_of(context, count):
+    _timed_wait(
+        context,
+        lambda: wait_for_cluster_ready(
+            kubeconfig_path=context.kubeconfig_path,
+            manifest_path=context.manifest_path,
+            node_count=count,
+            timeout=5,
+        ),
+    )
+
+
+@then("the wait should finish within {seconds:g} seconds of the change")
+def step_finished_promptly(context, seconds):
+    assert context.wait_error is None, context.wait_error
+    lag = context.finished_at - context.changed_at
+    assert 0 <= lag < seconds, f"Wait finished {lag:.3f}s after the change"
+
+
+@then('the API server should have listed "{plural}" {count:d} time(s)')
+def step_list_count(context, plural, count):
+    lists = [
+        path
+        for method, path, query in context.api.requests
+        if method == "GET" and path.endswith(f"/{plural}") and "watch" not in query
+    ]
+    assert len(lists) == count, f"Listed {len(lists)} time(s)"
+
+
+@then('every watch on "{plural}" should have resumed from a resourceVersion')
+def step_watches_resumed(context, plural):
+    versions = [
+        int(query["resourceVersion"][0])
+        for method, path, query in context.api.requests
+        if path.endswith(f"/{plural}") and "watch" in query
+    ]
+    assert len(versions) > 1, f"Only {len(versions)} watch(es)"
+    assert versions == sorted(versions), versions
+    assert all(version > 0 for version in versions), versions
+
+
+@then('the wait should fail with a readiness timeout naming "{description}"')
+def step_timed_out(context, description):
+    assert context.wait_error is not None, "The wait did not time out"
+    assert description in str(context.wait_error), str(context.wait_error)
+
+
+@then("readiness should be reported for:")
+def step_readiness_reported(context):
+    assert context.wait_error is None, context.wait_error
+    expected = {row["name"] for row in context.table}
+    assert set(context.wait_result) == expected, context.wait_result
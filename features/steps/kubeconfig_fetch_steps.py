@@ -0,0 +1,174 @@
+from behave import given, when, then
+import os
+import pathlib
+import stat
+import tempfile
+
+import yaml
+
+from drydock_runner.kubeconfig_fetcher import (
+    REMOTE_KUBECONFIG_PATH,
+    KubeconfigFetchError,
+    real_fetch_kubeconfig,
+    rewrite_server_address,
+    write_kubeconfig,
+)
+from drydock_runner.ssh_session import SSHConnectionManager
+from features.fixtures.fake_ssh_server import FakeSSHServer
+
+
+def _kubeconfig(server):
+    return yaml.safe_dump(
+        {
+            "apiVersion": "v1",
+            "kind": "Config",
+            "clusters": [{"name": "kubernetes", "cluster": {"server": server}}],
+        }
+    )
+
+
+def _node(context, address, kubeconfig):
+    root = tempfile.mkdtemp(prefix="drydock-node-")
+    if kubeconfig is not None:
+        path = pathlib.Path(root, REMOTE_KUBECONFIG_PATH.lstrip("/"))
+        path.parent.mkdir(parents=True)
+        path.write_text(kubeconfig)
+
+    server = FakeSSHServer(address, sftp_root=root).start()
+    context.add_cleanup(server.stop)
+    context.ssh_servers = {address: server}
+
+
+@given('a node at "{address}" with a kubeconfig for "{server}"')
+def step_node_with_kubeconfig(context, address, server):
+    _node(context, address, _kubeconfig(server))
+
+
+@given('a node at "{address}" without a kubeconfig')
+def step_node_without_kubeconfig(context, address):
+    _node(context, address, None)
+
+
+def _connection_manager(context):
+    # The node's session, if an earlier step opened one.
+    if not hasattr(context, "connection_manager"):
+        server = next(iter(context.ssh_servers.values()))
+        context.connection_manager = SSHConnectionManager(
+            ssh_user="ubuntu", ssh_password="bootstrap", port=server.port
+        )
+        context.add_cleanup(context.connection_manager.close)
+    return context.connection_manager
+
+
+def _local_path(context):
+    if not hasattr(context, "kubeconfig_path"):
+        directory = tempfile.mkdtemp(prefix="drydock-kubeconfig-")
+        context.kubeconfig_path = os.path.join(directory, "kubeconfig")
+    return context.kubeconfig_path
+
+
+@when('the kubeconfig is fetched from "{host}" for "{server_address}"')
+def step_fetch(context, host, server_address):
+    context.fetch_error = None
+
+    try:
+        real_fetch_kubeconfig(
+            host,
+            _local_path(context),
+            connection_manager=_connection_manager(context),
+            server_address=server_address,
+        )
+    except KubeconfigFetchError as exc:
+        context.fetch_error = exc
+
+
+@given("a local kubeconfig readable by everyone")
+def step_old_kubeconfig(context):
+    context.old_kubeconfig = _kubeconfig("https://old.invalid:6443")
+    path = _local_path(context)
+    with open(path, "w") as f:
+        f.write(context.old_kubeconfig)
+    os.chmod(path, 0o644)
+
+
+@when("a new kubeconfig is written over it")
+def step_write(context):
+    context.new_kubeconfig = _kubeconfig("https://new.invalid:6443")
+    write_kubeconfig(_local_path(context), context.new_kubeconfig)
+
+
+@when("writing a new kubeconfig over it fails")
+def step_write_fails(context):
+    # Not text, so the write fails once the temporary file exists.
+    try:
+        write_kubeconfig(_local_path(context), b"not text")
+    except TypeError:
+        return
+    raise AssertionError("The write did not fail")
+
+
+@when('the server "{server}" is rewritten to "{address}"')
+def step_rewrite(context, server, address):
+    rewritten = yaml.safe_load(rewrite_server_address(_kubeconfig(server), address))
+    context.rewritten_server = rewritten["clusters"][0]["cluster"]["server"]
+
+
+@when('the kubeconfig "{kubeconfig}" is rewritten to "{address}"')
+def step_rewrite_invalid(context, kubeconfig, address):
+    context.rewrite_error = None
+    try:
+        rewrite_server_address(kubeconfig, address)
+    except KubeconfigFetchError as exc:
+        context.rewrite_error = exc
+
+
+@then('the local kubeconfig should point at "{server}"')
+def step_points_at(context, server):
+    assert context.fetch_error is None, context.fetch_error
+    with open(context.kubeconfig_path) as f:
+        config = yaml.safe_load(f)
+    assert config["clusters"][0]["cluster"]["server"] == server, config
+
+
+@then("the local kubeconfig should only be readable by its owner")
+def step_owner_only(context):
+    mode = stat.S_IMODE(os.stat(context.kubeconfig_path).st_mode)
+    assert mode == 0o600, oct(mode)
+
+
+@then('the fetch should fail with "{message}"')
+def step_fetch_failed(context, message):
+    assert context.fetch_error is not None, "The fetch succeeded"
+    assert message in str(context.fetch_error), str(context.fetch_error)
+
+
+@then("there should be no local kubeconfig")
+def step_no_kubeconfig(context):
+    assert not os.listdir(os.path.dirname(context.kubeconfig_path))
+
+
+@then("the local kubeconfig should be the new one")
+def step_new_kubeconfig(context):
+    assert pathlib.Path(context.kubeconfig_path).read_text() == context.new_kubeconfig
+
+
+@then("the local kubeconfig should be the old one")
+def step_old_kubeconfig_kept(context):
+    assert pathlib.Path(context.kubeconfig_path).read_text() == context.old_kubeconfig
+
+
+@then("no partial kubeconfig should be left behind")
+def step_no_partial(context):
+    left = os.listdir(os.path.dirname(context.kubeconfig_path))
+    assert left == ["kubeconfig"], left
+
+
+@then('the server should be "{server}"')
+def step_server(context, server):
+    assert context.rewritten_server == server, context.rewritten_server
+
+
+@then('the rewrite should fail with "{message}"')
+def step_rewrite_failed(context, message):
+    assert context.rewrite_error is not None, "The rewrite succeeded"
+    assert message in str(context.rewrite_error), str(context.rewrite_error)
@@ -0,0 +1,247 @@
+from behave import given, when, then
+import asyncio
+import errno
+import threading
+import time
+
+from drydock_runner.config import ClusterLayout, ControllerLayout, WorkerLayout
+from drydock_runner.ip_discovery import iter_ssh_hosts
+from drydock_runner.node_assignment import AddressPool, assign_cluster_nodes
+
+# How long the fake discovery takes to find each host.
+DISCOVERY_INTERVAL = 0.1
+
+
+class FakeAssigner:
+    """
+    Stands in for StaticIPAssigner. Every node is called "node-<last
+    octet of its DHCP address>" unless the scenario names it, and keeps
+    its name at its static IP. A node in slow takes that many seconds to
+    say what it is called.
+    """
+
+    def __init__(self, hostnames, failures, checked):
+        self.hostnames = hostnames
+        self.failures = failures
+        self.checked = checked
+        self.slow = {}
+        self.lock = threading.Lock()
+
+    def _name(self, host):
+        return self.hostnames.get(host, f"node-{host.rsplit('.', 1)[1]}")
+
+    def hostname(self, host):
+        time.sleep(self.slow.get(host, 0))
+        return self._name(host)
+
+    def assign(self, dhcp_ip, static_ip, gateway, nameservers, hostname, mask):
+        if hostname:
+            self.checked.append(dhcp_ip)
+        if dhcp_ip in self.failures:
+            raise Exception(self.failures[dhcp_ip])
+
+        with self.lock:
+            self.hostnames[static_ip] = self._name(dhcp_ip)
+            return self._name(dhcp_ip)
+
+
+def _assignment(context):
+    if not hasattr(context, "assigner"):
+        context.assigner = FakeAssigner({}, {}, [])
+    return context.assigner
+
+
+def _addresses(text):
+    return [ip.strip() for ip in text.split(",")]
+
+
+@given('an address pool from "{start}" to "{end}"')
+def step_address_pool(context, start, end):
+    context.pool = AddressPool("192.168.8.0/24", start=start, end=end)
+
+
+@given("a layout of {controllers:d} controller and up to {workers:d} worker")
+@given("a layout of {controllers:d} controller and up to {workers:d} workers")
+@given("a layout of {controllers:d} controllers and up to {workers:d} workers")
+def step_layout(context, controllers, workers):
+    context.layout = ClusterLayout(
+        controllers=ControllerLayout(count=controllers),
+        workers=WorkerLayout(maxCount=workers),
+    )
+
+
+@given("a layout of {controllers:d} controller and any number of workers")
+def step_open_layout(context, controllers):
+    context.layout = ClusterLayout(
+        controllers=ControllerLayout(count=controllers), workers=WorkerLayout()
+    )
+
+
+@given('"{first}" and "{second}" are both called "{hostname}"')
+def step_same_hostname(context, first, second, hostname):
+    hostnames = _assignment(context).hostnames
+    hostnames[first] = hostnames[second] = hostname
+
+
+@given('the inaugural node is "{host}"')
+def step_inaugural_node(context, host):
+    context.inaugural_hostname = _assignment(context).hostname(host)
+
+
+@given('assigning "{host}" fails with "{message}"')
+def step_assignment_fails(context, host, message):
+    _assignment(context).failures[host] = message
+
+
+@given('"{host}" takes {seconds:g} seconds to say what it is called')
+def step_slow_hostname(context, host, seconds):
+    _assignment(context).slow[host] = seconds
+
+
+def _discovery(context, addresses):
+    # Finds one host every DISCOVERY_INTERVAL, ending early once stopped,
+    # as iter_ssh_hosts does.
+    for ip in addresses:
+        if context.stop.wait(DISCOVERY_INTERVAL):
+            return
+        context.discovered.append(ip)
+        yield ip
+
+
+@given('discovery finds "{addresses}"')
+def step_discovery_finds(context, addresses):
+    context.discovered = []
+    context.stop = threading.Event()
+    context.hosts = _discovery(context, _addresses(addresses))
+
+
+@given('discovery finds "{addresses}" and then every node at its static IP')
+def step_discovery_finds_again(context, addresses):
+    context.discovered = []
+    context.stop = threading.Event()
+
+    def hosts():
+        yield from _discovery(context, _addresses(addresses))
+        # As iter_ssh_hosts does while nodes move into the subnet.
+        yield from _discovery(context, list(context.pool_allocated))
+
+    context.hosts = hosts()
+
+
+class _FakeWriter:
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+@given('SSH servers answer at "{addresses}" and nothing else on the subnet')
+def step_ssh_servers(context, addresses):
+    answering = set(_addresses(addresses))
+    context.discovered = []
+    context.stop = threading.Event()
+
+    async def open_connection(host, port):
+        if host not in answering:
+            raise OSError(errno.EHOSTUNREACH, "No route to host")
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"SSH-2.0-OpenSSH_9.6p1\r\n")
+        reader.feed_eof()
+        return reader, _FakeWriter()
+
+    context.connect_func = open_connection
+
+
+@given(
+    "real discovery of that subnet times out after {timeout:d} seconds, or "
+    "{quiet:d} seconds after the last new host"
+)
+def step_real_discovery(context, timeout, quiet):
+    context.discovery_timeout = timeout
+
+    def hosts():
+        for host in iter_ssh_hosts(
+            "192.168.8.96/27",
+            total_timeout=timeout,
+            quiet_timeout=quiet,
+            stop=context.stop,
+            retry_interval=0.2,
+            connect_func=context.connect_func,
+            candidate_sources=(),
+        ):
+            context.discovered.append(host.ip)
+            yield host.ip
+
+    context.hosts = hosts()
+
+
+@when("the cluster nodes are assigned")
+def step_assign(context):
+    pool = context.pool
+    context.pool_allocated = []
+    allocate = pool.allocate
+
+    def recording_allocate():
+        ip = allocate()
+        context.pool_allocated.append(ip)
+        return ip
+
+    pool.allocate = recording_allocate
+
+    started = time.monotonic()
+    context.assignments = assign_cluster_nodes(
+        hosts=context.hosts,
+        layout=context.layout,
+        pool=pool,
+        assigner_factory=lambda: _assignment(context),
+        gateway="192.168.8.1",
+        nameservers=["192.168.8.1"],
+        mask=24,
+        inaugural_hostname=getattr(context, "inaugural_hostname", None),
+        stop=context.stop,
+    )
+    context.assignment_seconds = time.monotonic() - started
+
+
+@then("the nodes should be assigned:")
+def step_assigned(context):
+    assigned = [(a.dhcp_ip, a.static_ip, a.role) for a in context.assignments]
+    expected = [(row["host"], row["static ip"], row["role"]) for row in context.table]
+    assert assigned == expected, assigned
+    assert all(a.success for a in context.assignments), context.assignments
+
+
+@then("{count:d} nodes should have been assigned")
+def step_assigned_count(context, count):
+    assert len(context.assignments) == count, context.assignments
+
+
+@then('"{host}" should not have been discovered')
+def step_not_discovered(context, host):
+    assert host not in context.discovered, context.discovered
+
+
+@then('only "{host}" should have been checked for the inaugural hostname')
+def step_checked_hostname(context, host):
+    assert _assignment(context).checked == [host], _assignment(context).checked
+
+
+@then('"{host}" should have failed with "{message}"')
+def step_failed(context, host, message):
+    failed = {a.dhcp_ip: a for a in context.assignments if not a.success}
+    assert host in failed, context.assignments
+    assert message in failed[host].error_message, failed[host].error_message
+
+
+@then('"{addresses}" should have been assigned')
+def step_assigned_hosts(context, addresses):
+    assigned = [a.dhcp_ip for a in context.assignments if a.success]
+    assert assigned == _addresses(addresses), assigned
+
+
+@then("assignment should have finished well before the discovery timeout")
+def step_finished_early(context):
+    assert (
+        context.assignment_seconds < context.discovery_timeout / 2
+    ), f"Assignment took {context.assignment_seconds:.1f}s"
@@ -0,0 +1,32 @@
+from behave import given, then
+import threading
+
+PHASES = ("cloning", "the galaxy install", "static IP assignment")
+
+
+@given(
+    "cloning, the galaxy install and static IP assignment "
+    "each wait until all three have started"
+)
+def step_phases_wait_for_each_other(context):
+    # Run one after another, the first phase would wait out the timeout.
+    context.phase_barrier = threading.Barrier(len(PHASES), timeout=10)
+
+
+@given('cloning fails with "{message}"')
+def step_clone_fails(context, message):
+    context.clone_error = message
+
+
+@then("cloning, the galaxy install and static IP assignment should have overlapped")
+def step_phases_overlapped(context):
+    intervals = [context.phase_intervals[name] for name in PHASES]
+    last_start = max(start for start, _ in intervals)
+    first_end = min(end for _, end in intervals)
+    assert last_start < first_end, context.phase_intervals
+
+
+@then('the bootstrap should fail with "{message}"')
+def step_failed_with(context, message):
+    assert context.bootstrap_error is not None, "Bootstrap did not fail"
+    assert message in str(context.bootstrap_error), context.bootstrap_error
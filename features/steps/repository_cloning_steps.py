@@ -0,0 +1,166 @@
+from behave import given, when, then
+import os
+import subprocess
+import tempfile
+from types import SimpleNamespace
+
+# Import the real cloning logic; local bare repositories stand in for GitHub.
+from drydock_runner.git_runner import clone_repositories, RepositoryCache
+
+
+def _git(*args, cwd=None):
+    return subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    ).stdout
+
+
+def _commit_all(work_tree, message):
+    _git("add", "-A", cwd=work_tree)
+    _git(
+        "-c",
+        "user.name=drydock",
+        "-c",
+        "user.email=drydock@example.com",
+        "commit",
+        "--quiet",
+        "-m",
+        message,
+        cwd=work_tree,
+    )
+
+
+def _remotes_dir(context):
+    if not hasattr(context, "remotes_dir"):
+        context.remotes_dir = tempfile.mkdtemp(prefix="drydock-remotes-")
+        context.source_repos = {}
+    return context.remotes_dir
+
+
+@given('a source repository "{name}" with {commits:d} commits containing')
+def step_source_repository(context, name, commits):
+    remotes_dir = _remotes_dir(context)
+    work_tree = os.path.join(remotes_dir, f"{name}-work")
+    bare = os.path.join(remotes_dir, f"{name}.git")
+
+    _git("init", "--quiet", "--initial-branch", "main", work_tree)
+
+    for commit in range(commits):
+        for row in context.table:
+            path = os.path.join(work_tree, row["path"])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(f"revision {commit}\n")
+
+        _commit_all(work_tree, f"revision {commit}")
+
+    _git("clone", "--quiet", "--bare", work_tree, bare)
+    _git("config", "uploadpack.allowFilter", "true", cwd=bare)
+
+    context.source_repos[name] = SimpleNamespace(
+        url=f"file://{bare}",
+        branch="main",
+        paths=SimpleNamespace(),
+    )
+
+
+@given('the "{name}" repository is configured with paths')
+def step_repository_paths(context, name):
+    paths = context.source_repos[name].paths
+
+    for row in context.table:
+        setattr(paths, row["name"], row["path"])
+
+
+@given("a persistent repository cache")
+def step_repository_cache(context):
+    context.repository_cache = RepositoryCache(
+        cache_dir=tempfile.mkdtemp(prefix="drydock-git-cache-")
+    )
+
+
+@when("the source repositories are cloned through the cache")
+@when("the source repositories are cloned through the cache again")
+def step_clone_through_cache(context):
+    context.checkout_dir = tempfile.mkdtemp(prefix="drydock-checkouts-")
+    context.checkouts = clone_repositories(
+        repos=context.source_repos,
+        base_dir=context.checkout_dir,
+        cache=context.repository_cache,
+    )
+
+
+@when('a new commit is pushed to the "{name}" repository')
+def step_push_commit(context, name):
+    work_tree = os.path.join(context.remotes_dir, f"{name}-work")
+
+    with open(os.path.join(work_tree, "values", "argocd.yaml"), "w") as f:
+        f.write("revision new\n")
+
+    _commit_all(work_tree, "revision new")
+    _git(
+        "push",
+        "--quiet",
+        os.path.join(context.remotes_dir, f"{name}.git"),
+        "main",
+        cwd=work_tree,
+    )
+    context.new_commit = _git("rev-parse", "HEAD", cwd=work_tree).strip()
+
+
+@when("every mirror is evicted from the cache")
+def step_evict_all(context):
+    context.repository_cache.max_age_days = 0
+    context.repository_cache.max_size_bytes = 0
+    context.repository_cache.evict()
+
+
+@when("the source repositories are cloned")
+def step_clone(context):
+    context.checkout_dir = tempfile.mkdtemp(prefix="drydock-checkouts-")
+    context.checkouts = clone_repositories(
+        repos=context.source_repos, base_dir=context.checkout_dir
+    )
+
+
+@then('the "{name}" checkout should contain "{path}"')
+def step_checkout_contains(context, name, path):
+    full_path = os.path.join(context.checkouts[name], path)
+    assert os.path.isfile(full_path), f"{path} missing from {name} checkout"
+
+
+@then('the "{name}" checkout should not contain "{path}"')
+def step_checkout_lacks(context, name, path):
+    full_path = os.path.join(context.checkouts[name], path)
+    assert not os.path.exists(full_path), f"{path} present in {name} checkout"
+
+
+@then('the "{name}" checkout should be intact')
+def step_checkout_intact(context, name):
+    _git("fsck", "--full", "--no-dangling", cwd=context.checkouts[name])
+    _git("sparse-checkout", "add", "/docs/", cwd=context.checkouts[name])
+    assert os.path.isfile(os.path.join(context.checkouts[name], "docs", "unused.md"))
+
+
+@then('the "{name}" checkout should have {count:d} commit of history')
+@then('the "{name}" checkout should have {count:d} commits of history')
+def step_checkout_depth(context, name, count):
+    commits = _git("rev-list", "--count", "HEAD", cwd=context.checkouts[name])
+    assert int(commits) == count, f"{name} has {commits.strip()} commits"
+
+
+@then('the "{name}" checkout should be at the new commit')
+def step_checkout_at_new_commit(context, name):
+    head = _git("rev-parse", "HEAD", cwd=context.checkouts[name]).strip()
+    assert head == context.new_commit, f"{name} is at {head}"
+
+
+@then("the cache should hold {count:d} mirrors")
+def step_cache_mirrors(context, count):
+    cache_dir = context.repository_cache.cache_dir
+    mirrors = [name for name in os.listdir(cache_dir) if name.endswith(".git")]
+    assert len(mirrors) == count, f"Cache holds {mirrors}"
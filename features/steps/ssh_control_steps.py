@@ -0,0 +1,74 @@
+from behave import given, when, then
+import os
+import subprocess
+
+from drydock_runner.ssh_control import SSHControlMasters
+
+FAKE_BIN = os.path.join(os.path.dirname(__file__), "..", "fixtures", "bin")
+
+
+def _set_env(context, name, value):
+    previous = os.environ.get(name)
+
+    def restore():
+        if previous is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = previous
+
+    context.add_cleanup(restore)
+    os.environ[name] = value
+
+
+def _ssh_log(context, host):
+    try:
+        with open(context.ssh_log) as f:
+            lines = [line.split() for line in f]
+    except FileNotFoundError:
+        return []
+
+    return [f"{program} {what}" for program, what, logged in lines if logged == host]
+
+
+@given("ssh is replaced by a local stand-in")
+def step_fake_ssh(context):
+    _set_env(context, "PATH", f"{os.path.abspath(FAKE_BIN)}:{os.environ['PATH']}")
+
+
+@given("the run's SSH control masters are kept in it")
+def step_control_masters(context):
+    # The log is outside the run's directory so it outlives cleanup.
+    context.ssh_log = f"{context.tmp_dir}.ssh.log"
+    _set_env(context, "FAKE_SSH_LOG", context.ssh_log)
+
+    context.control_masters = SSHControlMasters(
+        os.path.join(context.tmp_dir, "ssh"), ssh_password="bootstrap"
+    )
+
+
+@given('"{host}" cannot be reached over SSH')
+def step_unreachable(context, host):
+    _set_env(context, "FAKE_SSH_UNREACHABLE", host)
+
+
+@given('control masters are open for "{hosts}"')
+@when('control masters are opened for "{hosts}"')
+def step_open_masters(context, hosts):
+    context.control_errors = context.control_masters.open_all(hosts.split(","))
+
+
+@when('"{command}" is run on "{host}" with ssh')
+def step_ssh_command(context, command, host):
+    subprocess.run(context.control_masters.command(host, command), check=True)
+
+
+@then('opening a control master should have failed for "{host}" only')
+def step_open_failed(context, host):
+    assert list(context.control_errors) == [host], context.control_errors
+    assert "No route to host" in context.control_errors[host]
+
+
+@then('the SSH log for "{host}" should read "{expected}"')
+def step_ssh_log(context, host, expected):
+    logged = _ssh_log(context, host)
+    assert logged == expected.split(", "), logged
@@ -0,0 +1,252 @@
+from behave import given, when, then
+import socket
+import threading
+import time
+
+from benchmarks.fake_cluster import FakeNetwork, FakeSSHConnections, Latencies
+from drydock_runner.readiness import (
+    ReadinessTimeoutError,
+    probe_ssh_banner,
+    wait_for_ssh_banner,
+)
+from drydock_runner.ssh_probe import ProbeOutcome
+from drydock_runner.static_ip_assigner import StaticIPAssigner, StaticIPAssignmentError
+
+INITIAL_INTERVAL = 0.02
+MAX_INTERVAL = 0.1
+
+DHCP_IP = "127.0.78.10"
+STATIC_IP = "127.0.78.100"
+
+
+def _listen(context, banner=None):
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    context.add_cleanup(server.close)
+
+    if banner is not None:
+        server.listen()
+
+        def serve():
+            try:
+                while True:
+                    connection, _ = server.accept()
+                    with connection:
+                        connection.sendall(f"{banner}\r\n".encode())
+            except OSError:
+                pass
+
+        threading.Thread(target=serve, daemon=True).start()
+
+    if not hasattr(context, "ports"):
+        context.ports = []
+    context.ports.append(server.getsockname()[1])
+
+
+@given('a loopback listener sending "{banner}"')
+def step_listener(context, banner):
+    _listen(context, banner)
+
+
+@given("a loopback port nobody listens on")
+def step_closed_port(context):
+    # Bound but not listening, so connections are refused.
+    _listen(context)
+
+
+@when("each loopback port is probed")
+def step_probe_ports(context):
+    context.outcomes = [
+        probe_ssh_banner("127.0.0.1", port=port, timeout=1)[0] for port in context.ports
+    ]
+
+
+@then('the probes should find "{outcomes}"')
+def step_outcomes(context, outcomes):
+    expected = [ProbeOutcome(outcome.strip()) for outcome in outcomes.split(",")]
+    assert context.outcomes == expected, context.outcomes
+
+
+def _scripted_node(context, outcomes):
+    context.probe_times = []
+    remaining = list(outcomes)
+
+    def probe(host, port, timeout):
+        context.probe_times.append(time.monotonic())
+        if remaining:
+            return remaining.pop(0), None
+        return ProbeOutcome.SSH, "SSH-2.0-OpenSSH_9.6p1"
+
+    context.probe_func = probe
+    context.refused_at = (
+        outcomes.index(ProbeOutcome.REFUSED)
+        if ProbeOutcome.REFUSED in outcomes
+        else None
+    )
+
+
+@given("a node that stays silent for {count:d} probes")
+def step_silent_node(context, count):
+    _scripted_node(context, [ProbeOutcome.SILENT] * count)
+
+
+@given("a node that stays silent for {count:d} probes and then refuses 1")
+def step_silent_then_refused(context, count):
+    _scripted_node(context, [ProbeOutcome.SILENT] * count + [ProbeOutcome.REFUSED])
+
+
+def _wait(context, timeout=30):
+    context.wait_error = None
+    started = time.monotonic()
+
+    try:
+        wait_for_ssh_banner(
+            "192.0.2.10",
+            timeout=timeout,
+            initial_interval=INITIAL_INTERVAL,
+            max_interval=MAX_INTERVAL,
+            probe_func=context.probe_func,
+        )
+    except ReadinessTimeoutError as exc:
+        context.wait_error = exc
+
+    context.wait_seconds = time.monotonic() - started
+
+
+@when("drydock waits for its SSH banner")
+def step_wait(context):
+    _wait(context)
+
+
+@when("drydock waits for its SSH banner for {seconds:g} seconds")
+def step_wait_for(context, seconds):
+    _wait(context, timeout=seconds)
+
+
+def _gaps(context):
+    times = context.probe_times
+    return [later - earlier for earlier, later in zip(times, times[1:])]
+
+
+@then("the wait should succeed")
+def step_wait_succeeded(context):
+    assert context.wait_error is None, context.wait_error
+
+
+@then("the probes should have backed off to the longest interval")
+def step_backed_off(context):
+    gaps = _gaps(context)
+    assert gaps[0] < MAX_INTERVAL * 0.6, gaps
+    assert gaps[-1] >= MAX_INTERVAL * 0.9, gaps
+    assert all(gap < MAX_INTERVAL * 2 for gap in gaps), gaps
+
+
+@then("the probe after the refusal should have come at the shortest interval")
+def step_sped_up(context):
+    gaps = _gaps(context)
+    before, after = gaps[context.refused_at - 1], gaps[context.refused_at]
+    assert after < before / 2, gaps
+    assert after < INITIAL_INTERVAL * 2, gaps
+
+
+@then("the wait should time out after about {seconds:g} seconds")
+def step_timed_out(context, seconds):
+    assert isinstance(context.wait_error, ReadinessTimeoutError), context.wait_error
+    assert seconds <= context.wait_seconds < seconds + 0.5, context.wait_seconds
+
+
+@given("a fake node that takes {seconds:g} seconds to come back at its static IP")
+def step_fake_node(context, seconds):
+    network = FakeNetwork()
+    network.start()
+    context.add_cleanup(network.stop)
+    network.listen(DHCP_IP)
+
+    connections = FakeSSHConnections(
+        network, {DHCP_IP: "node-0"}, Latencies(reboot=seconds)
+    )
+    context.connects = []
+    connect = connections.connect
+
+    def counting_connect(host):
+        context.connects.append(host)
+        return connect(host)
+
+    connections.connect = counting_connect
+    context.commands = []
+    exec_command = connections._exec_command
+
+    def recording_exec_command(host, command):
+        context.commands.append((host, command))
+        return exec_command(host, command)
+
+    connections._exec_command = recording_exec_command
+    context.network = network
+    context.connections = connections
+
+
+def _move(context, timeout=10, hostname=None, identify=False):
+    assigner = StaticIPAssigner(
+        ssh_user="ubuntu",
+        timeout=timeout,
+        port=context.network.port,
+        connection_manager=context.connections,
+    )
+    context.assignment_error = None
+
+    try:
+        if identify:
+            assigner.hostname(DHCP_IP)
+        assigner.assign(
+            dhcp_ip=DHCP_IP,
+            static_ip=STATIC_IP,
+            gateway="127.0.78.1",
+            hostname=hostname,
+            mask=24,
+        )
+    except StaticIPAssignmentError as exc:
+        context.assignment_error = exc
+
+
+@when("the node is moved to its static IP")
+def step_move(context):
+    _move(context)
+
+
+@when("the node is moved to its static IP, waiting at most {seconds:d} second")
+def step_move_with_timeout(context, seconds):
+    _move(context, timeout=seconds)
+
+
+@when('the node is identified and then moved to its static IP as "{hostname}"')
+def step_identify_and_move(context, hostname):
+    _move(context, hostname=hostname, identify=True)
+
+
+@then("the node should have been asked for its hostname {count:d} time")
+def step_hostname_asked(context, count):
+    asked = [host for host, command in context.commands if command == "hostname"]
+    assert len(asked) == count, context.commands
+
+
+@then("only the network configuration should have been changed on the node")
+def step_only_netplan(context):
+    commands = [command for _, command in context.commands if command != "hostname"]
+    assert commands == ["sudo netplan apply || sudo reboot"], commands
+
+
+@then("the static IP assignment should succeed")
+def step_assignment_succeeded(context):
+    assert context.assignment_error is None, context.assignment_error
+
+
+@then("the node should have been authenticated to once at its static IP")
+def step_authenticated_once(context):
+    attempts = context.connects.count(STATIC_IP)
+    assert attempts == 1, context.connects
+
+
+@then('the static IP assignment should fail with "{message}"')
+def step_assignment_failed(context, message):
+    assert context.assignment_error is not None, "The assignment succeeded"
+    assert message in str(context.assignment_error), str(context.assignment_error)
@@ -0,0 +1,112 @@
+from behave import given, when, then
+import threading
+
+from drydock_runner.ssh_session import SSHConnectionManager
+from features.fixtures.fake_ssh_server import FakeSSHServer
+
+
+def _addresses(text):
+    return [ip.strip() for ip in text.split(",")]
+
+
+@given('a fake SSH server at "{address}"')
+def step_fake_ssh_server(context, address):
+    if not hasattr(context, "ssh_servers"):
+        context.ssh_servers = {}
+
+    # Every server listens on the first one's port, as nodes all use 22.
+    port = next((s.port for s in context.ssh_servers.values()), 0)
+    server = FakeSSHServer(address, port=port).start()
+    context.add_cleanup(server.stop)
+    context.ssh_servers[address] = server
+
+
+def _manager(context):
+    if not hasattr(context, "connection_manager"):
+        port = next(iter(context.ssh_servers.values())).port
+        context.connection_manager = SSHConnectionManager(
+            ssh_user="ubuntu", ssh_password="bootstrap", port=port
+        )
+        context.add_cleanup(context.connection_manager.close)
+        context.outputs = []
+    return context.connection_manager
+
+
+def _run(context, host, command):
+    status, output, _ = _manager(context).exec(host, command)
+    assert status == 0, status
+    context.outputs.append(output.strip())
+
+
+@given('"{command}" has been run on "{host}" through a connection manager')
+@given('"{command}" has been run on "{host}" through the same connection manager')
+@when('"{command}" is run on "{host}" through the same connection manager')
+def step_run(context, command, host):
+    _run(context, host, command)
+
+
+@when('"{command}" is run on "{host}" {count:d} times through one connection manager')
+def step_run_times(context, command, host, count):
+    for _ in range(count):
+        _run(context, host, command)
+
+
+@when('{count:d} callers connect to "{host}" at the same time')
+def step_connect_concurrently(context, count, host):
+    manager = _manager(context)
+    start = threading.Barrier(count)
+    clients = []
+
+    def connect():
+        start.wait()
+        clients.append(manager.connect(host))
+
+    threads = [threading.Thread(target=connect) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(clients) == count, clients
+    assert all(client is clients[0] for client in clients), clients
+
+
+@when('"{host}" drops its SSH connections')
+def step_drop(context, host):
+    context.ssh_servers[host].drop()
+    # Wait until the client has noticed, as it would after a reboot.
+    transport = context.connection_manager._clients[host].get_transport()
+    transport.join(5)
+    assert not transport.is_active(), "The client did not notice the drop"
+
+
+@when("the connection manager is closed")
+def step_close(context):
+    context.connection_manager.close()
+
+
+@then('every run should print "{output}"')
+def step_outputs(context, output):
+    assert context.outputs and all(
+        printed == output for printed in context.outputs
+    ), context.outputs
+
+
+@then('"{host}" should have been connected to {count:d} time')
+@then('"{host}" should have been connected to {count:d} times')
+def step_connections(context, host, count):
+    connections = context.ssh_servers[host].connections
+    assert connections == count, connections
+
+
+@then('no SSH connections should be open to "{addresses}"')
+def step_none_open(context, addresses):
+    for address in _addresses(addresses):
+        server = context.ssh_servers[address]
+        assert server.wait_for_active_connections(0), server.active_connections()
+
+
+@then('the connection manager should hold no session to "{addresses}"')
+def step_no_sessions(context, addresses):
+    for address in _addresses(addresses):
+        assert context.connection_manager.get(address) is None, address
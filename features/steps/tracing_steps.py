@@ -0,0 +1,54 @@
+from behave import given, then
+import json
+import os
+import tempfile
+
+from drydock_runner import tracing
+
+
+@given("tracing is started")
+def step_start_tracing(context):
+    context.tracer = tracing.start_tracing()
+    context.add_cleanup(tracing.stop_tracing)
+
+
+def _chrome_events(context):
+    path = os.path.join(tempfile.mkdtemp(prefix="drydock-trace-"), "trace.json")
+    context.tracer.write_chrome_trace(path)
+
+    with open(path) as f:
+        return json.load(f)["traceEvents"]
+
+
+def _event(context, name):
+    return next(e for e in _chrome_events(context) if e["name"] == name)
+
+
+@then('the trace should have a "{category}" span for each of "{names}"')
+def step_trace_has_spans(context, category, names):
+    traced = {e["name"] for e in _chrome_events(context) if e["cat"] == category}
+
+    for name in names.split(", "):
+        assert name in traced, f"No {category} span for {name}: {traced}"
+
+
+@then('the "{later}" span should start after the "{earlier}" span ends')
+def step_span_order(context, later, earlier):
+    first = _event(context, earlier)
+    second = _event(context, later)
+    assert second["ts"] >= first["ts"] + first["dur"], (first, second)
+
+
+@then('the trace summary should list the "{name}" phase')
+def step_summary(context, name):
+    summary = context.tracer.format_summary()
+    assert any(
+        line.startswith(tracing.PHASE) and line.endswith(f"  {name}")
+        for line in summary.splitlines()
+    ), summary
+
+
+@then('the "{name}" span should record the error "{message}"')
+def step_span_error(context, name, message):
+    event = _event(context, name)
+    assert message in event["args"].get("error", ""), event
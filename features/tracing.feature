@@ -0,0 +1,24 @@
+Feature: Bootstrap tracing
+
+  Every bootstrap phase is recorded as a span, so a run can be inspected
+  in a trace viewer and compared with earlier runs.
+
+
+  Background:
+    Given a node that answers at its static IP
+    And a checkpoint store
+    And tracing is started
+
+
+  Scenario: Every phase is written to a Chrome trace
+    When the bootstrap is run
+    Then the bootstrap should succeed
+    And the trace should have a "phase" span for each of "clone, galaxy, network, provision, apply"
+    And the "apply" span should start after the "provision" span ends
+    And the trace summary should list the "provision" phase
+
+
+  Scenario: A failed phase is marked in the trace
+    Given cloning fails with "remote hung up"
+    When the bootstrap is run
+    Then the "clone" span should record the error "remote hung up"